@@ -6,22 +6,38 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from pathlib import Path
+import os
 import tempfile
+import hashlib
+import threading
+import uuid
 from io import BytesIO
 import logging
-from typing import Optional, Dict
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils.dataframe import dataframe_to_rows
+from typing import Optional, Dict, Callable
 
 # Imports locales
-from src.core import DataLoader, Optimizer, ScoreCalculator
-from src.core.optimizer import GroupOptimizer
+# PuLP (optimizadores), openpyxl (exportadores) y plotly se importan dentro
+# de las funciones que los usan: la app y los procesos de trabajo arrancan
+# sin cargarlos (ver scripts/tiempo_importacion.py)
+from src.core import DataLoader, ScoreCalculator
+from src.core.jobs import (
+    JobRunner, ServiceJobRunner, TERMINADOS as TRABAJO_TERMINADO, EN_COLA as TRABAJO_EN_COLA,
+    COMPLETADO as TRABAJO_COMPLETADO, CANCELADO as TRABAJO_CANCELADO, FORK_DISPONIBLE,
+)
+from src.core import debug_info
+from src.core.solve_report import (
+    format_report, ESTADO_ETIQUETAS, ESTADO_INFACTIBLE, solver_metrics, append_metrics_history,
+    load_metrics_history, summarize_metrics, prune_solver_logs,
+)
 from src.utils import setup_logging
+from src.utils.timing import timed, span, collect_timings, format_timings
+from src.utils.memoria import PERFIL_MEMORIA, retained_sizes
+from src.utils.lazy import Lazy, LazyDict
 from src.visualization import (
     render_header, render_upload_section, render_config_section,
     render_results_summary, render_asignaciones_table, render_capacidad_chart,
-    render_demanda_vs_asignacion, render_debug_info
+    render_demanda_vs_asignacion, render_debug_info, render_precios_sombra,
+    render_sensibilidad_pesos, render_metricas_solver,
 )
 from scripts.parse_mapa_practica import get_group_constraints
 
@@ -204,16 +220,7 @@ def map_epp_exigidos(x):
     return np.nan
 
 
-def compute_scores_debug(score_rows: list) -> pd.DataFrame:
-    """Devuelve score por institución y criterios sk para auditoría."""
-    if not score_rows:
-        return pd.DataFrame()
-    df = pd.DataFrame(score_rows)
-    value_cols = [c for c in df.columns if c.startswith("sk_") or c == "score_total"]
-    grouped = df.groupby("ID_Institucion", as_index=False)[value_cols].mean(numeric_only=True)
-    return grouped
-
-
+@timed("exportar_excel")
 def generar_excel_resultados(results: Dict) -> bytes:
     """
     Genera un Excel bonito con múltiples hojas de resultados
@@ -224,6 +231,9 @@ def generar_excel_resultados(results: Dict) -> bytes:
     Returns:
         bytes: Contenido del Excel de descargar
     """
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+
     wb = Workbook()
     
     # Estilos
@@ -301,6 +311,7 @@ def generar_excel_resultados(results: Dict) -> bytes:
         "pares_con_costo": results["debug"].get("pares_con_costo", 0),
         "criterios": results["debug"].get("criterios", 0)
     }
+    report = results.get("solve_report") or {}
     
     # Títulos y valores
     resumen_data = [
@@ -313,6 +324,12 @@ def generar_excel_resultados(results: Dict) -> bytes:
         ("Pares factibles", metrics["pares_factibles"]),
         ("Pares con costo", metrics["pares_con_costo"]),
         ("Criterios activos", metrics["criterios"]),
+        ("Estado del solver", ESTADO_ETIQUETAS.get(report.get("estado"), report.get("estado", ""))),
+        ("Valor objetivo (incumbente)", round(report["objetivo"], 4) if report.get("objetivo") is not None else ""),
+        ("Mejor cota", round(report["cota"], 4) if report.get("cota") is not None else ""),
+        ("Gap relativo (%)", round(report["gap"] * 100, 2) if report.get("gap") is not None else ""),
+        ("Nodos explorados", report.get("nodos") if report.get("nodos") is not None else ""),
+        ("Tiempo de solución (s)", report.get("tiempos", {}).get("total", "")),
     ]
     
     for row_idx, (metrica, valor) in enumerate(resumen_data, start=1):
@@ -377,6 +394,36 @@ def generar_excel_resultados(results: Dict) -> bytes:
         ws_util.column_dimensions["D"].width = 18
         ws_util.column_dimensions["E"].width = 15
     
+    # ============= HOJAS DE ANÁLISIS POST-ÓPTIMO =============
+    def escribir_tabla(titulo, df, anchos_col):
+        ws = wb.create_sheet(titulo)
+        for col_idx, col_name in enumerate(df.columns, start=1):
+            cell = ws.cell(row=1, column=col_idx)
+            cell.value = col_name
+            cell.fill = header_fill
+            cell.font = header_font
+            cell.border = border
+            cell.alignment = center_align
+        for row_idx, (_, row) in enumerate(df.iterrows(), start=2):
+            for col_idx, val in enumerate(row, start=1):
+                cell = ws.cell(row=row_idx, column=col_idx)
+                if isinstance(val, (float, np.floating)):
+                    val = None if pd.isna(val) else round(float(val), 4)
+                cell.value = val
+                cell.border = border
+                cell.alignment = Alignment(horizontal="center", vertical="center")
+        for col_idx in range(1, len(df.columns) + 1):
+            col_letter = ws.cell(row=1, column=col_idx).column_letter
+            ws.column_dimensions[col_letter].width = anchos_col.get(col_idx - 1, ancho_default)
+        ws.freeze_panes = "A2"
+
+    df_precios = results.get("precios_sombra")
+    if df_precios is not None and not df_precios.empty:
+        escribir_tabla("Precios_Sombra", df_precios, {1: 25})
+    df_rangos = results.get("sensibilidad_pesos")
+    if df_rangos is not None and not df_rangos.empty:
+        escribir_tabla("Sensibilidad_Pesos", df_rangos, {0: 40})
+    
     # ============= GUARDAR A BYTES =============
     output = BytesIO()
     wb.save(output)
@@ -384,8 +431,11 @@ def generar_excel_resultados(results: Dict) -> bytes:
     return output.getvalue()
 
 
+@timed("exportar_excel")
 def generar_excel_refinado(results: Dict) -> bytes:
     """Genera Excel profesional multi-semestre con hoja de indicadores de alto impacto visual."""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
     from openpyxl.utils import get_column_letter
 
     wb = Workbook()
@@ -469,12 +519,14 @@ def generar_excel_refinado(results: Dict) -> bytes:
     ws_r = wb.create_sheet("Resumen")
     por_sem = results.get("por_semestre", {})
     res_cols = ["Semestre", "Asignaturas", "Sets aplicados", "Estudiantes",
-                "Asignados", "Grupos", "Tamaño grupos", "Calidad (score)"]
+                "Asignados", "Grupos", "Tamaño grupos", "Calidad (score)",
+                "Estado solver", "Cota", "Gap (%)", "Tiempo (s)"]
     write_header(ws_r, res_cols)
     ri = 2
     for sem in sorted(por_sem.keys()):
         d = por_sem[sem]
         sets_aplicados = ", ".join(sorted(set(d["sets"].values())))
+        rep = d.get("solve_report") or {}
         vals = [
             sem,
             ", ".join(d["asignaturas"]),
@@ -484,6 +536,10 @@ def generar_excel_refinado(results: Dict) -> bytes:
             d["n_grupos"],
             f"{d['min_group']}–{d['max_group']}",
             round(d["obj_value"], 4),
+            ESTADO_ETIQUETAS.get(rep.get("estado"), rep.get("estado", "")),
+            round(rep["cota"], 4) if rep.get("cota") is not None else "",
+            round(rep["gap"] * 100, 2) if rep.get("gap") is not None else "",
+            rep.get("tiempos", {}).get("total", ""),
         ]
         for ci, val in enumerate(vals, start=1):
             cell = ws_r.cell(row=ri, column=ci, value=val)
@@ -496,6 +552,50 @@ def generar_excel_refinado(results: Dict) -> bytes:
     if ri > 2:
         ws_r.auto_filter.ref = f"A1:{get_column_letter(len(res_cols))}{ri - 1}"
 
+    # ---- Planes alternativos (si se pidieron) ----
+    alt_rows = []
+    for sem in sorted(por_sem.keys()):
+        for plan in por_sem[sem].get("alternativas", []):
+            df_p = plan["resultados"].copy()
+            df_p.insert(0, "Plan", plan["plan"])
+            df_p.insert(0, "Semestre", sem)
+            df_p["Calidad_Plan"] = round(plan["calidad"], 4)
+            alt_rows.append(df_p)
+    if alt_rows:
+        ws_alt = wb.create_sheet("Planes_Alternativos")
+        df_alt = pd.concat(alt_rows, ignore_index=True)
+        alt_cols = list(df_alt.columns)
+        write_header(ws_alt, alt_cols)
+        for ri_alt, row in enumerate(df_alt.itertuples(index=False), start=2):
+            for ci, val in enumerate(row, start=1):
+                if isinstance(val, (float, np.floating)):
+                    val = round(float(val), 4)
+                cell = ws_alt.cell(row=ri_alt, column=ci, value=val)
+                cell.border = border
+                cell.alignment = center_align
+                if ri_alt % 2 == 0:
+                    cell.fill = alt_fill
+        autofit(ws_alt, alt_cols)
+        ws_alt.auto_filter.ref = ws_alt.dimensions
+
+    # ---- Precios sombra de cupos ----
+    df_precios = results.get("precios_sombra")
+    if df_precios is not None and not df_precios.empty:
+        ws_ps = wb.create_sheet("Precios_Sombra")
+        ps_cols = list(df_precios.columns)
+        write_header(ws_ps, ps_cols)
+        for ri_ps, row in enumerate(df_precios.itertuples(index=False), start=2):
+            for ci, val in enumerate(row, start=1):
+                if isinstance(val, (float, np.floating)):
+                    val = round(float(val), 4)
+                cell = ws_ps.cell(row=ri_ps, column=ci, value=val)
+                cell.border = border
+                cell.alignment = center_align
+                if ri_ps % 2 == 0:
+                    cell.fill = alt_fill
+        autofit(ws_ps, ps_cols)
+        ws_ps.auto_filter.ref = ws_ps.dimensions
+
     # ===========================================================
     # HOJA 3 — INDICADORES_DEMANDA_OFERTA  (alto impacto visual)
     # ===========================================================
@@ -614,6 +714,14 @@ def generar_excel_refinado(results: Dict) -> bytes:
     return output.getvalue()
 
 
+def _avisar_streamlit(nivel: str, contenido=None) -> None:
+    """Muestra en la página un aviso de procesar_*; los eventos de progreso se ignoran."""
+    if nivel == "dataframe":
+        st.dataframe(contenido, use_container_width=True, hide_index=True)
+    elif nivel in ("error", "warning", "info", "write", "markdown", "success"):
+        getattr(st, nivel)(contenido)
+
+
 def procesar_datos(
     loader: DataLoader,
     set_id: str,
@@ -621,9 +729,19 @@ def procesar_datos(
     total_estudiantes: int,
     programa_manual: str,
     tipo_est_manual: str,
-    tipo_practica_manual: str
+    tipo_practica_manual: str,
+    time_limit: Optional[float] = None,
+    gap_rel: Optional[float] = None,
+    avisar: Optional[Callable] = None,
 ) -> Optional[Dict]:
-    """Procesa datos y ejecuta optimización"""
+    """Procesa datos y ejecuta optimización
+
+    avisar: destino de los mensajes de progreso (ver _avisar_streamlit);
+        en segundo plano los recoge el trabajo (src/core/jobs.py).
+    """
+    from src.core import Optimizer
+
+    avisar = avisar or _avisar_streamlit
     
     try:
         # Validar pesos
@@ -639,7 +757,7 @@ def procesar_datos(
                 f"Los pesos activos del set seleccionado deben sumar 1.0; suma actual={pesos_activos:.6f}"
             )
         
-        st.write(f"✓ {len(weights)} criterios cargados")
+        avisar("write", f"✓ {len(weights)} criterios cargados")
         
         # Preparar cupos
         loader.cupos["Cupo_Estimado_Semestral"] = pd.to_numeric(
@@ -650,7 +768,7 @@ def procesar_datos(
         
         # Si no hay cupos, generar ejemplo
         if cupos_llenos == 0:
-            st.warning("⚠️ Plantilla sin cupos reales - usando datos de EJEMPLO")
+            avisar("warning", "⚠️ Plantilla sin cupos reales - usando datos de EJEMPLO")
             loader.cupos = generate_ejemplo_cupos(semestre)
             loader.costos = generate_ejemplo_costos(semestre)
         
@@ -671,7 +789,7 @@ def procesar_datos(
         if loader.demanda is not None and not loader.demanda.empty and "Semestre" in loader.demanda.columns:
             demanda = loader.demanda[loader.demanda["Semestre"].astype(str) == str(semestre)].copy()
         else:
-            st.info("ℹ️ Usando demanda manual definida en esta pantalla.")
+            avisar("info", "ℹ️ Usando demanda manual definida en esta pantalla.")
             demanda = generate_ejemplo_demanda(
                 semestre=semestre,
                 total_estudiantes=total_estudiantes,
@@ -681,7 +799,7 @@ def procesar_datos(
             )
 
         if demanda.empty:
-            st.warning("⚠️ No se encontró demanda para el semestre seleccionado. Se aplicará demanda manual.")
+            avisar("warning", "⚠️ No se encontró demanda para el semestre seleccionado. Se aplicará demanda manual.")
             demanda = generate_ejemplo_demanda(
                 semestre=semestre,
                 total_estudiantes=total_estudiantes,
@@ -873,8 +991,9 @@ def procesar_datos(
         
         # Normalizar llaves de criterios de forma robusta
         weights_norm = {}
+        limpios = {}
         for k, w in weights.items():
-            key = clean_criterio_codigo(k)
+            key = limpios[k] = clean_criterio_codigo(k)
             weights_norm[key] = weights_norm.get(key, 0.0) + float(w)
 
         # Validación explícita de pesos limpios
@@ -884,32 +1003,6 @@ def procesar_datos(
                 f"La suma de pesos activos (limpios) debe ser 1.0; suma actual={pesos_limpios_sum:.6f}"
             )
 
-        weights_raw_df = pd.DataFrame(
-            {
-                "criterio_raw": list(weights.keys()),
-                "criterio_clean": [clean_criterio_codigo(k) for k in weights.keys()],
-                "peso": list(weights.values()),
-                "tipo": [crit_type.get(k) for k in weights.keys()],
-            }
-        )
-        weights_clean_df = weights_raw_df.groupby("criterio_clean", as_index=False)["peso"].sum()
-
-        criteria_status_rows = []
-        for k in weights_norm.keys():
-            source = "S_norm"
-            if k == "%_Contraprestacion_Matricula":
-                source = "costo_pct"
-            elif k == "Cobro_EPP":
-                source = "costo_cobro_epp"
-            elif k == "EPP_Exigidos":
-                source = "costo_epp_exigidos"
-            elif k == "Admiten_Docentes_Externos":
-                source = "calidad_bool"
-            elif f"{k}_norm" not in S.columns:
-                source = "missing"
-            criteria_status_rows.append({"criterio": k, "source": source})
-        criteria_status_df = pd.DataFrame(criteria_status_rows)
-
         special_criteria = {
             "%_Contraprestacion_Matricula",
             "Cobro_EPP",
@@ -925,9 +1018,10 @@ def procesar_datos(
                 missing_criteria.add(k)
 
         V = {}
+        # Score normalizado por criterio de cada par, para el análisis de pesos
+        V_criterios = {}
         count_factible = 0
         count_asignado = 0
-        pair_score_rows = []
         epp_fallback_pairs = 0
         
         for j in instituciones:
@@ -955,7 +1049,7 @@ def procesar_datos(
                     epp_fallback_pairs += 1
                 
                 score = 0.0
-                score_row = {"ID_Institucion": j}
+                V_criterios[(j, g)] = {}
                 for k, w in weights_norm.items():
                     if w <= 0:
                         continue
@@ -976,19 +1070,30 @@ def procesar_datos(
                             sk = 0.0
                     
                     score += w * float(sk)
-                    score_row[f"sk_{k}"] = float(sk)
+                    V_criterios[(j, g)][k] = float(sk)
                 
                 V[(j, g)] = score
-                score_row["score_total"] = float(score)
-                pair_score_rows.append(score_row)
 
-        score_debug_df = compute_scores_debug(pair_score_rows)
-        
-        st.write(f"✓ Pares (j,g) para optimización: {len(V)}")
+
+        avisar("write", f"✓ Pares (j,g) para optimización: {len(V)}")
         
         # Optimizar
         optimizer = Optimizer(verbose=False)
-        results_df = optimizer.optimize(V, demand_dict, cap_dict, instituciones, groups, semestre)
+        results_df = optimizer.optimize(
+            V, demand_dict, cap_dict, instituciones, groups, semestre,
+            time_limit=time_limit, gap_rel=gap_rel,
+        )
+        solve_report = optimizer.get_solve_report()
+        avisar("write", f"✓ Solver: {format_report(solve_report)}")
+        metricas_solver = solver_metrics({"Agregado": solve_report})
+        append_metrics_history(metricas_solver, modo="agregado")
+        # Calidad marginal por cupo adicional (duales de Cap_{j}_{p}_{n}_{s})
+        precios_sombra = optimizer.capacity_shadow_prices() if not results_df.empty else pd.DataFrame()
+        # Rango de cada peso en el que este plan sigue siendo óptimo
+        sensibilidad_pesos = (
+            optimizer.weight_sensitivity(V_criterios, weights_norm)
+            if not results_df.empty else pd.DataFrame()
+        )
 
         # Agregar nombre de institución a resultados
         if not results_df.empty and "Institucion" in loader.oferta.columns:
@@ -1002,29 +1107,19 @@ def procesar_datos(
                 "Tipo_Practica", "Semestre", "Asignados", "Score_unitario"
             ]
             results_df = results_df[[c for c in cols if c in results_df.columns]]
+            if not precios_sombra.empty:
+                precios_sombra["ID_Institucion"] = precios_sombra["ID_Institucion"].astype(str)
+                precios_sombra = precios_sombra.merge(oferta_names, on="ID_Institucion", how="left")
+                ps_cols = ["ID_Institucion", "Institucion"] + [
+                    c for c in precios_sombra.columns if c not in ("ID_Institucion", "Institucion")
+                ]
+                precios_sombra = precios_sombra[ps_cols]
 
         if not results_df.empty and "Score_unitario" in results_df.columns:
             results_df["Score_unitario"] = pd.to_numeric(results_df["Score_unitario"], errors="coerce").round(4)
         
         obj_val = optimizer.get_objective_value()
 
-        score_consistency = {
-            "max_abs_diff": None,
-            "mean_abs_diff": None,
-        }
-        if not results_df.empty and not score_debug_df.empty:
-            compare = results_df[["ID_Institucion", "Score_unitario"]].copy()
-            compare["ID_Institucion"] = compare["ID_Institucion"].astype(str)
-            score_debug_df["ID_Institucion"] = score_debug_df["ID_Institucion"].astype(str)
-            compare = compare.merge(
-                score_debug_df[["ID_Institucion", "score_total"]],
-                on="ID_Institucion",
-                how="left",
-            )
-            compare["abs_diff"] = (pd.to_numeric(compare["Score_unitario"], errors="coerce") - pd.to_numeric(compare["score_total"], errors="coerce")).abs()
-            score_consistency["max_abs_diff"] = float(compare["abs_diff"].max()) if compare["abs_diff"].notna().any() else None
-            score_consistency["mean_abs_diff"] = float(compare["abs_diff"].mean()) if compare["abs_diff"].notna().any() else None
-        
         # Compilar resultados
         total_demanda = sum(demand_dict.values())
         total_asignado = results_df["Asignados"].sum() if not results_df.empty else 0
@@ -1065,49 +1160,21 @@ def procesar_datos(
         else:
             util = pd.DataFrame()
 
-        base_debug_cols = [
-            "ID_Institucion",
-            "Acceso_Transporte_Publico (1-5)",
-            "MisionVisionProposito_AlineacionDocencia (1-5)",
-            "Evalua_Estudiantes_Profesores (0-5)",
-            "Vinculacion_Planta_Especialistas_%",
-            "Servicios_UCI (0/1)",
-            "Servicios_UCIN (0/1)",
-            "Servicios_UCI_UCIN (0/1)",
-            "Servicios_Pediatricos (0/1)",
-            "Servicios_Obstetricia (0/1)",
-            "Nro_Universidades_Comparten",
-            "Es_Hospital_Universitario",
-            "Escenario_Avalado_Practicas",
-            "Admiten_Docentes_Externos (Sí/No)",
-            "Areas_Bienestar (0/1)",
-            "Areas_Academicas (0/1)",
-        ]
-        base_debug = base_raw[[c for c in base_debug_cols if c in base_raw.columns]].copy()
-
-        costos_debug_cols = [
-            "ID_Institucion",
-            "Programa_Costo",
-            "Tipo_Estudiante_Costo",
-            "Tipo_Practica_Costo",
-            "Semestre_Vigencia (AAAA-S)",
-            "%_Contraprestacion_Matricula (0-100)",
-            "EPP_Exigidos (Sin exigencia/Parcial/Completo + detalle)",
-            "Cobro_EPP (No cobra/Cobra a la Universidad)",
-        ]
-        costos_debug = loader.costos[[c for c in costos_debug_cols if c in loader.costos.columns]].copy()
-        
         return {
             "asignaciones": results_df,
             "summary": summary,
             "util": util,
-            "score_debug": score_debug_df,
             "total_demanda": total_demanda,
             "total_asignado": total_asignado,
             "brecha": brecha,
             "tasa_cobertura": tasa_cobertura,
             "obj_value": obj_val,
-            "debug": {
+            "solve_report": solve_report,
+            "metricas_solver": metricas_solver,
+            "precios_sombra": precios_sombra,
+            "sensibilidad_pesos": sensibilidad_pesos,
+            # Las tablas de auditoría se arman al abrir el panel de debug (src/core/debug_info.py)
+            "debug": LazyDict({
                 "instituciones": len(instituciones),
                 "grupos": len(groups),
                 "pares_factibles": count_factible,
@@ -1115,24 +1182,25 @@ def procesar_datos(
                 "criterios": len(weights_norm),
                 "missing_criteria": sorted(list(missing_criteria)),
                 "epp_exigidos_fallback_pairs": epp_fallback_pairs,
-                "score_consistency": score_consistency,
-                "weights_raw": weights_raw_df,
-                "weights_clean": weights_clean_df,
-                "criteria_status": criteria_status_df,
-                "base_debug": base_debug,
-                "costos_debug": costos_debug,
-                "score_debug": score_debug_df,
+                "score_consistency": Lazy(debug_info.score_consistency, results_df, V, V_criterios),
+                "weights_raw": Lazy(debug_info.weights_raw_table, weights, limpios, crit_type),
+                "weights_clean": Lazy(debug_info.weights_clean_table, weights, limpios, crit_type),
+                "criteria_status": Lazy(debug_info.criteria_status_table, list(weights_norm), list(S.columns)),
+                "base_debug": Lazy(debug_info.base_debug_table, loader.oferta, loader.calidad),
+                "costos_debug": Lazy(debug_info.costos_debug_table, loader.costos),
+                "score_debug": Lazy(debug_info.score_debug_table, V, V_criterios),
                 "instituciones_list": instituciones,
                 "groups_list": groups,
-            }
+            })
         }
     
     except Exception as e:
         logger.error(f"Error procesando datos: {e}")
-        st.error(f"❌ Error: {str(e)}")
+        avisar("error", f"❌ Error: {str(e)}")
         return None
 
 
+@timed("matriz_scores")
 def _prepare_score_matrix(loader: DataLoader) -> pd.DataFrame:
     """Construye la matriz de criterios normalizados S (indexada por ID_Institucion str).
 
@@ -1213,6 +1281,26 @@ def _prepare_score_matrix(loader: DataLoader) -> pd.DataFrame:
     return S
 
 
+def _score_matrix_cached(loader: DataLoader, cache: Optional[Dict]) -> pd.DataFrame:
+    """_prepare_score_matrix, reutilizando la última si sus hojas no cambiaron.
+
+    La clave son las huellas de las hojas de la etapa "matriz_scores" (ver
+    ETAPAS en src/core/data_loader.py), así que una plantilla recargada con
+    cambios solo en otras hojas no la recalcula.
+    """
+    if cache is None:
+        return _prepare_score_matrix(loader)
+    clave = loader.fingerprint_for("matriz_scores")
+    memo = cache.get("matriz_scores")
+    if memo is not None and memo["clave"] == clave:
+        # Columnas auxiliares que _prepare_score_matrix agrega a costos
+        loader.costos = memo["costos"]
+        return memo["S"]
+    S = _prepare_score_matrix(loader)
+    cache["matriz_scores"] = {"clave": clave, "S": S, "costos": loader.costos}
+    return S
+
+
 def _weights_norm_for_set(loader: DataLoader, set_id: str) -> dict:
     """Obtiene y valida los pesos de un set, devolviéndolos limpios y normalizados."""
     loader.validate_pesas(set_id=set_id)
@@ -1229,23 +1317,25 @@ def _weights_norm_for_set(loader: DataLoader, set_id: str) -> dict:
     return weights_norm
 
 
-def _scores_for_set(loader: DataLoader, S: pd.DataFrame, weights_norm: dict, ips_ids: set) -> dict:
-    """Calcula {j: score} para las IPS dadas usando weights_norm sobre la matriz S."""
-    s_ids = S.index.astype(str)
+def _criteria_matrix(loader: DataLoader, S: pd.DataFrame, criterios: list, ips_ids) -> pd.DataFrame:
+    """Matriz IPS × criterio con el score normalizado s_k de cada IPS.
+
+    El score de un set es el producto de esta matriz por su vector de pesos, lo
+    que permite evaluar muchos vectores de pesos a la vez (ver src/core/robustness.py).
+    IPS sin datos en S quedan con fila en cero.
+    """
+    s_ids = set(S.index.astype(str))
     costos = loader.costos.copy()
     costos["ID_Institucion"] = costos["ID_Institucion"].astype(str)
     costos_by_id = {jid: grp for jid, grp in costos.groupby("ID_Institucion")}
 
-    scores = {}
+    ips_ids = sorted(ips_ids)
+    M = pd.DataFrame(0.0, index=ips_ids, columns=list(criterios))
     for j in ips_ids:
-        if j not in set(s_ids):
-            scores[j] = 0.0
+        if j not in s_ids:
             continue
         df_c = costos_by_id.get(j)
-        score = 0.0
-        for k, w in weights_norm.items():
-            if w <= 0:
-                continue
+        for k in criterios:
             if k == "%_Contraprestacion_Matricula":
                 if df_c is not None and len(df_c) > 0:
                     pct = df_c["pct_contra"].iloc[0]
@@ -1270,9 +1360,199 @@ def _scores_for_set(loader: DataLoader, S: pd.DataFrame, weights_norm: dict, ips
                 sk = S.loc[j, col] if col in S.columns else 0.0
                 if pd.isna(sk):
                     sk = 0.0
-            score += w * float(sk)
-        scores[j] = round(score, 4)
-    return scores
+            M.loc[j, k] = float(sk)
+    return M
+
+
+@timed("scores_set")
+def _scores_for_set(loader: DataLoader, S: pd.DataFrame, weights_norm: dict, ips_ids: set) -> dict:
+    """Calcula {j: score} para las IPS dadas usando weights_norm sobre la matriz S."""
+    activos = {k: w for k, w in weights_norm.items() if w > 0}
+    M = _criteria_matrix(loader, S, list(activos.keys()), ips_ids)
+    totales = M.values @ np.array(list(activos.values()), dtype=float)
+    return {j: round(float(v), 4) for j, v in zip(M.index, totales)}
+
+
+def analizar_robustez(
+    loader: DataLoader,
+    results: Dict,
+    sem: int,
+    n_muestras: int,
+    concentracion: float,
+    variacion_cupos: float,
+    time_limit: Optional[float],
+    cache_etapas: Optional[Dict] = None,
+) -> Dict:
+    """Monte Carlo sobre pesos y cupos del semestre `sem` de un resultado refinado.
+
+    `cache_etapas` es el memo de etapas de la sesión (ver _score_matrix_cached).
+    """
+    from src.core.robustness import robustness_analysis
+
+    d = results["por_semestre"][sem]
+    asigs = d["asignaturas"]
+    set_by_asig = d["sets"]
+    cap_dict = loader.get_rotaciones_dict(sem, asigs)
+    ar_dict = loader.get_asignaturas_rotaciones(sem, asigs)
+
+    S = _score_matrix_cached(loader, cache_etapas)
+    weights_by_set = {sid: _weights_norm_for_set(loader, sid) for sid in set(set_by_asig.values())}
+    criterios = sorted({k for w in weights_by_set.values() for k in w})
+    matriz = _criteria_matrix(loader, S, criterios, {j for (a, r, j) in cap_dict})
+
+    df_asig = results["asignaciones"]
+    plan_base = df_asig[df_asig["Semestre"] == sem]
+
+    return robustness_analysis(
+        matriz,
+        weights_by_set,
+        set_by_asig,
+        cap_dict,
+        ar_dict,
+        d["n_estudiantes"],
+        d["min_group"],
+        d["max_group"],
+        n_muestras=n_muestras,
+        concentracion=concentracion,
+        variacion_cupos=variacion_cupos,
+        plan_base=plan_base,
+        time_limit=time_limit,
+    )
+
+
+def analizar_impacto_ips(
+    loader: DataLoader,
+    results: Dict,
+    sem: int,
+    time_limit: Optional[float],
+) -> pd.DataFrame:
+    """Pérdida de calidad y cobertura del semestre `sem` al excluir cada IPS."""
+    from src.core.impact import leave_one_ips_out
+
+    d = results["por_semestre"][sem]
+    asigs = d["asignaturas"]
+    cap_dict = loader.get_rotaciones_dict(sem, asigs)
+    ar_dict = loader.get_asignaturas_rotaciones(sem, asigs)
+    scores = {(a, j): v for (a, j), v in results["scores_aj"].items() if a in asigs}
+
+    df_asig = results["asignaciones"]
+    plan_base = df_asig[df_asig["Semestre"] == sem]
+
+    return leave_one_ips_out(
+        scores,
+        cap_dict,
+        ar_dict,
+        d["n_estudiantes"],
+        d["min_group"],
+        d["max_group"],
+        plan_base=plan_base,
+        calidad_base=d["obj_value"],
+        time_limit=time_limit,
+        mode=results.get("modo_solver", "monolitico"),
+    )
+
+
+def preparar_editor_pesos(
+    loader: DataLoader,
+    results: Dict,
+    sem: int,
+    time_limit: Optional[float],
+    cache_etapas: Optional[Dict] = None,
+) -> Dict:
+    """Construye una vez el modelo del semestre `sem` para el editor de pesos en vivo.
+
+    El modelo se arma sin presolve (la dominancia de IPS depende de los pesos)
+    y arranca desde el plan vigente; luego cada ajuste solo cambia el objetivo
+    (ver GroupOptimizer.update_scores). `cache_etapas` como en analizar_robustez.
+    """
+    from src.core.optimizer import GroupOptimizer
+
+    d = results["por_semestre"][sem]
+    asigs = d["asignaturas"]
+    set_by_asig = d["sets"]
+    cap_dict = loader.get_rotaciones_dict(sem, asigs)
+    ar_dict = loader.get_asignaturas_rotaciones(sem, asigs)
+
+    S = _score_matrix_cached(loader, cache_etapas)
+    pesos_por_set = {sid: _weights_norm_for_set(loader, sid) for sid in sorted(set(set_by_asig.values()))}
+    criterios = sorted({k for w in pesos_por_set.values() for k in w})
+    matriz = _criteria_matrix(loader, S, criterios, {j for (a, r, j) in cap_dict})
+
+    df_asig = results["asignaciones"]
+    plan_base = df_asig[df_asig["Semestre"] == sem]
+    scores = {(a, j): v for (a, j), v in results["scores_aj"].items() if a in asigs}
+
+    optimizer = GroupOptimizer(verbose=False)
+    optimizer.optimize(
+        scores=scores,
+        cap_dict=cap_dict,
+        asignaturas_rotaciones=ar_dict,
+        n_estudiantes=d["n_estudiantes"],
+        min_group=d["min_group"],
+        max_group=d["max_group"],
+        time_limit=time_limit,
+        presolve=False,
+        initial_plan=plan_base,
+    )
+    return {
+        "semestre": sem,
+        "optimizer": optimizer,
+        "matriz": matriz,
+        "set_by_asig": set_by_asig,
+        "pesos_por_set": pesos_por_set,
+        "plan_base": plan_base,
+        # Pesos con los que está resuelto el modelo
+        "aplicado": {sid: dict(w) for sid, w in pesos_por_set.items()},
+    }
+
+
+def scores_desde_pesos(editor: Dict, pesos_por_set: Dict[str, Dict[str, float]]) -> dict:
+    """{(asignatura, IPS): score} con los pesos dados (se normalizan a suma 1 por set)."""
+    matriz = editor["matriz"]
+    por_set = {}
+    for sid, pesos in pesos_por_set.items():
+        total = sum(pesos.values())
+        w = np.array([pesos.get(k, 0.0) / total if total > 0 else 0.0 for k in matriz.columns])
+        por_set[sid] = dict(zip(matriz.index, np.round(matriz.values @ w, 4)))
+    return {
+        (a, j): float(por_set[sid][j])
+        for a, sid in editor["set_by_asig"].items()
+        for j in matriz.index
+    }
+
+
+# Resultados por semestre que se conservan entre corridas (ver procesar_refinado)
+MAX_SEMESTRES_EN_CACHE = 32
+
+
+def _clave_semestre(
+    sem: int,
+    set_by_asig: dict,
+    n_estudiantes: int,
+    min_group: int,
+    max_group: int,
+    cap_dict: dict,
+    ar_dict: dict,
+    scores: dict,
+    opciones: tuple,
+) -> str:
+    """Huella de todo lo que entra al modelo de un semestre.
+
+    Incluye los scores y el tramo de cupos del semestre, no solo los nombres
+    de los sets, para que un cambio en la plantilla también invalide el memo.
+    """
+    partes = (
+        sem,
+        sorted(set_by_asig.items()),
+        n_estudiantes,
+        min_group,
+        max_group,
+        sorted((str(k), int(v)) for k, v in cap_dict.items()),
+        sorted((str(a), sorted(map(str, rots))) for a, rots in ar_dict.items()),
+        sorted((str(k), round(float(v), 6)) for k, v in scores.items()),
+        opciones,
+    )
+    return hashlib.sha1(repr(partes).encode("utf-8")).hexdigest()
 
 
 def procesar_refinado(
@@ -1280,22 +1560,44 @@ def procesar_refinado(
     selecciones: list,
     n_por_semestre: dict,
     semestre_vigencia: str,
+    modo_solver: str = "monolitico",
+    time_limit: Optional[float] = 120,
+    gap_rel: Optional[float] = None,
+    n_alternativas: int = 0,
+    cache: Optional[Dict] = None,
+    cache_etapas: Optional[Dict] = None,
+    avisar: Optional[Callable] = None,
 ) -> Optional[Dict]:
     """Optimización refinada multi-semestre con un set de ponderaciones por asignatura.
 
     Args:
         selecciones: lista de dicts {"semestre": int, "asignatura": str, "set_id": str}.
         n_por_semestre: {semestre: n_estudiantes}.
+        modo_solver: "monolitico", "descomposicion" o "portafolio" (ver GroupOptimizer.optimize).
+        time_limit: presupuesto de reloj por semestre, en segundos.
+        gap_rel: gap relativo objetivo (None = probar optimalidad).
+        n_alternativas: planes distintos adicionales por semestre (0 = solo el óptimo);
+            requiere el MILP único (ver GroupOptimizer.alternative_plans).
+        cache: memo {clave: resultado} por semestre entre corridas; solo se
+            resuelven los semestres cuyas entradas cambiaron (ver _clave_semestre).
+            Guarda hasta MAX_SEMESTRES_EN_CACHE y descarta el usado hace más tiempo.
+        cache_etapas: memo de etapas previas al modelo, por huella de hoja
+            (ver _score_matrix_cached).
+        avisar: destino de los mensajes de progreso (ver _avisar_streamlit). Al
+            terminar cada semestre se emite el nivel "semestre" con su resultado.
     """
+    from src.core.optimizer import GroupOptimizer
+
+    avisar = avisar or _avisar_streamlit
     try:
         if not selecciones:
-            st.error("❌ No hay asignaturas seleccionadas para optimizar.")
+            avisar("error", "❌ No hay asignaturas seleccionadas para optimizar.")
             return None
 
         OFERTA_MAXIMA = 75
 
         # Preparar matriz de criterios una sola vez (común a todos los sets)
-        S = _prepare_score_matrix(loader)
+        S = _score_matrix_cached(loader, cache_etapas)
 
         # Agrupar selecciones por semestre (los estudiantes difieren por semestre)
         por_sem = {}
@@ -1306,6 +1608,7 @@ def procesar_refinado(
         scores_cache: Dict[str, dict] = {}
 
         combined_rows = []
+        precios_rows = []
         por_semestre_detalle = {}
         indicadores = []
         scores_aj_global = {}
@@ -1324,24 +1627,24 @@ def procesar_refinado(
             constraints = get_group_constraints(sem)
             min_g, max_g = constraints["min"], constraints["max"]
 
-            st.markdown(f"**▶ Semestre {sem}** — asignaturas: {asigs} · estudiantes: {n_estudiantes}")
+            avisar("markdown", f"**▶ Semestre {sem}** — asignaturas: {asigs} · estudiantes: {n_estudiantes}")
 
             if n_estudiantes < min_g:
-                st.error(f"Semestre {sem}: se necesitan al menos {min_g} estudiantes para formar un grupo. Omitido.")
+                avisar("error", f"Semestre {sem}: se necesitan al menos {min_g} estudiantes para formar un grupo. Omitido.")
                 continue
 
             cap_dict = loader.get_rotaciones_dict(sem, asigs)
             ar_dict = loader.get_asignaturas_rotaciones(sem, asigs)
 
             if not ar_dict:
-                st.warning(f"⚠️ Semestre {sem}: sin rotaciones válidas para las asignaturas seleccionadas. Omitido.")
+                avisar("warning", f"⚠️ Semestre {sem}: sin rotaciones válidas para las asignaturas seleccionadas. Omitido.")
                 continue
 
             # Rotaciones sin IPS
             for asig, rots in ar_dict.items():
                 for rot in rots:
                     if not any(a == asig and r == rot for (a, r, j) in cap_dict):
-                        st.warning(f"⚠️ Sem {sem} · {asig} / {rot}: sin IPS con cupo disponible.")
+                        avisar("warning", f"⚠️ Sem {sem} · {asig} / {rot}: sin IPS con cupo disponible.")
 
             ips_sem = {j for (a, r, j) in cap_dict}
 
@@ -1364,44 +1667,114 @@ def procesar_refinado(
 
             scores_aj_global.update(scores_aj)
 
-            optimizer = GroupOptimizer(verbose=False)
-            res_df = optimizer.optimize(
-                scores=scores_aj,
-                cap_dict=cap_dict,
-                asignaturas_rotaciones=ar_dict,
-                n_estudiantes=n_estudiantes,
-                min_group=min_g,
-                max_group=max_g,
+            # Memo por semestre: si nada de lo que entra al modelo cambió, se
+            # reutiliza el resultado anterior sin resolver
+            clave = _clave_semestre(
+                sem, set_by_asig, n_estudiantes, min_g, max_g, cap_dict, ar_dict, scores_aj,
+                (modo_solver, time_limit, gap_rel, n_alternativas),
             )
+            memo = cache.get(clave) if cache is not None else None
+            if memo is not None:
+                # Al final del memo: se descarta primero lo usado hace más tiempo (LRU)
+                cache[clave] = cache.pop(clave)
+                res_df = memo["asignaciones"]
+                precios_sem = memo["precios_sombra"]
+                detalle = dict(memo["detalle"], desde_cache=True)
+                avisar("write", f"✓ Semestre {sem}: sin cambios, resultado reutilizado")
+            else:
+                optimizer = GroupOptimizer(verbose=False)
+                res_df = optimizer.optimize(
+                    scores=scores_aj,
+                    cap_dict=cap_dict,
+                    asignaturas_rotaciones=ar_dict,
+                    n_estudiantes=n_estudiantes,
+                    min_group=min_g,
+                    max_group=max_g,
+                    mode=modo_solver,
+                    time_limit=time_limit,
+                    gap_rel=gap_rel,
+                    # Las IPS dominadas también cuentan como alternativas
+                    presolve=n_alternativas == 0,
+                )
+                solve_report = optimizer.get_solve_report()
+
+                precheck = solve_report.get("precheck")
+                if precheck and not precheck["factible"]:
+                    avisar("error", f"❌ Semestre {sem}: demanda imposible de cubrir — {precheck['mensaje']}.")
+                    df_pre = pd.DataFrame(precheck["rotaciones"])
+                    if not df_pre.empty:
+                        avisar("dataframe", df_pre[~df_pre["Factible"]])
+                    continue
 
-            if res_df is None or res_df.empty:
-                st.warning(f"⚠️ Semestre {sem}: el optimizador no encontró asignaciones factibles.")
-                continue
-
-            # Enriquecer
-            res_df["Semestre"] = sem
-            res_df["Set"] = res_df["Asignatura"].map(set_by_asig)
-            res_df["ID_Institucion"] = res_df["ID_Institucion"].astype(str)
-            if oferta_names is not None:
-                res_df = res_df.merge(oferta_names, on="ID_Institucion", how="left")
-            # Grupo etiquetado por semestre para que sea único en la salida combinada
-            res_df["Grupo_ID"] = res_df["Grupo"].map(lambda g: f"S{sem}-G{g}")
+                if res_df is None or res_df.empty:
+                    avisar(
+                        "warning",
+                        f"⚠️ Semestre {sem}: el optimizador no encontró asignaciones factibles "
+                        f"({format_report(solve_report)})."
+                        + (
+                            " El chequeo previo solo verifica cada rotación por separado: "
+                            "los grupos compartidos entre rotaciones pueden no caber en conjunto."
+                            if precheck and solve_report.get("estado") == ESTADO_INFACTIBLE else ""
+                        )
+                    )
+                    continue
+                if not solve_report["optimo_probado"]:
+                    avisar("info", f"ℹ️ Semestre {sem}: {format_report(solve_report)}")
+
+                # Enriquecer
+                res_df["Semestre"] = sem
+                res_df["Set"] = res_df["Asignatura"].map(set_by_asig)
+                res_df["ID_Institucion"] = res_df["ID_Institucion"].astype(str)
+                if oferta_names is not None:
+                    res_df = res_df.merge(oferta_names, on="ID_Institucion", how="left")
+                # Grupo etiquetado por semestre para que sea único en la salida combinada
+                res_df["Grupo_ID"] = res_df["Grupo"].map(lambda g: f"S{sem}-G{g}")
+
+                precios_sem = optimizer.capacity_shadow_prices()
+                if not precios_sem.empty:
+                    precios_sem.insert(0, "Semestre", sem)
+                    precios_sem["ID_Institucion"] = precios_sem["ID_Institucion"].astype(str)
+                    if oferta_names is not None:
+                        precios_sem = precios_sem.merge(oferta_names, on="ID_Institucion", how="left")
+
+                detalle = {
+                    "n_estudiantes": n_estudiantes,
+                    "asignados": int(res_df.groupby("Grupo")["Tamano_Grupo"].first().sum()),
+                    "n_grupos": int(res_df["Grupo"].nunique()),
+                    "min_group": min_g,
+                    "max_group": max_g,
+                    "asignaturas": asigs,
+                    "sets": set_by_asig,
+                    "obj_value": float(optimizer.get_objective_value() or 0.0),
+                    "solve_report": solve_report,
+                }
+                if n_alternativas > 0 and modo_solver != "descomposicion":
+                    planes = optimizer.alternative_plans(n_alternativas + 1, time_limit=time_limit)
+                    detalle["alternativas"] = planes[1:]
+                    avisar("write", f"✓ Semestre {sem}: {len(planes) - 1} plan(es) alternativo(s)")
+
+                if cache is not None:
+                    cache[clave] = {
+                        "asignaciones": res_df, "precios_sombra": precios_sem, "detalle": detalle,
+                    }
+                    while len(cache) > MAX_SEMESTRES_EN_CACHE:
+                        cache.pop(next(iter(cache)))
 
             combined_rows.append(res_df)
-            obj_total += float(optimizer.get_objective_value() or 0.0)
-
-            n_grupos = res_df["Grupo"].nunique()
-            asignados_sem = int(res_df.groupby("Grupo")["Tamano_Grupo"].first().sum())
-            por_semestre_detalle[sem] = {
-                "n_estudiantes": n_estudiantes,
-                "asignados": asignados_sem,
-                "n_grupos": int(n_grupos),
-                "min_group": min_g,
-                "max_group": max_g,
-                "asignaturas": asigs,
-                "sets": set_by_asig,
-                "obj_value": float(optimizer.get_objective_value() or 0.0),
-            }
+            if not precios_sem.empty:
+                precios_rows.append(precios_sem)
+            obj_total += detalle["obj_value"]
+            por_semestre_detalle[sem] = detalle
+            asignados_sem = detalle["asignados"]
+            avisar("semestre", {
+                "semestre": sem,
+                "asignados": detalle["asignados"],
+                "n_grupos": detalle["n_grupos"],
+                "calidad": detalle["obj_value"],
+                "estado": detalle["solve_report"].get("estado"),
+                "desde_cache": detalle.get("desde_cache", False),
+                "asignaciones": res_df,
+            })
 
             # Indicadores por (semestre, asignatura)
             for asig in asigs:
@@ -1417,7 +1790,7 @@ def procesar_refinado(
                 })
 
         if not combined_rows:
-            st.error("❌ No se obtuvieron asignaciones en ningún semestre seleccionado.")
+            avisar("error", "❌ No se obtuvieron asignaciones en ningún semestre seleccionado.")
             return None
 
         df_all = pd.concat(combined_rows, ignore_index=True)
@@ -1434,6 +1807,18 @@ def procesar_refinado(
         for j, vals in tmp.items():
             scores_flat[j] = round(sum(vals) / len(vals), 4)
 
+        # Métricas de CBC por semestre; al historial solo van las resoluciones nuevas
+        metricas_solver = solver_metrics({
+            f"Semestre {s}": d["solve_report"] for s, d in por_semestre_detalle.items()
+        })
+        append_metrics_history(
+            solver_metrics({
+                f"Semestre {s}": d["solve_report"]
+                for s, d in por_semestre_detalle.items() if not d.get("desde_cache")
+            }),
+            modo="refinado", modo_solver=modo_solver,
+        )
+
         return {
             "modo": "refinado_multi",
             "asignaciones": df_all,
@@ -1446,49 +1831,89 @@ def procesar_refinado(
             "scores": scores_flat,
             "scores_aj": scores_aj_global,
             "selecciones": selecciones,
+            "modo_solver": modo_solver,
+            "precios_sombra": (
+                pd.concat(precios_rows, ignore_index=True) if precios_rows else pd.DataFrame()
+            ),
+            "metricas_solver": metricas_solver,
         }
 
     except Exception as e:
         logger.error(f"Error procesando refinado: {e}")
-        st.error(f"❌ Error: {str(e)}")
+        avisar("error", f"❌ Error: {str(e)}")
         return None
 
 
 
-def _render_heatmap_grupo_ips(df_asig, key_suffix=""):
+def _resultado_id(results: Dict) -> str:
+    """Identificador estable del resultado (se asigna la primera vez que se pide)."""
+    return results.setdefault("resultado_id", uuid.uuid4().hex)
+
+
+def _figura(results: Dict, clave: str, construir: Callable):
+    """Figura del resultado construida una sola vez por sesión.
+
+    Se guardan solo las del resultado vigente: al cambiar el resultado se descartan.
+    """
+    rid = _resultado_id(results)
+    figuras = st.session_state.get("figuras")
+    if figuras is None or figuras["resultado_id"] != rid:
+        figuras = st.session_state.figuras = {"resultado_id": rid, "figuras": {}}
+    if clave not in figuras["figuras"]:
+        figuras["figuras"][clave] = construir()
+    return figuras["figuras"][clave]
+
+
+def _render_heatmap_grupo_ips(df_asig, results, key_suffix=""):
     import plotly.express as px
     if "Institucion" not in df_asig.columns or "Score_IPS" not in df_asig.columns:
         return
     if df_asig["Score_IPS"].nunique() <= 1:
         return
-    grupo_col = "Grupo_ID" if "Grupo_ID" in df_asig.columns else "Grupo"
-    pivot = df_asig.pivot_table(
-        values="Score_IPS", index=grupo_col, columns="Institucion", aggfunc="mean"
-    )
-    fig = px.imshow(
-        pivot,
-        color_continuous_scale="RdYlGn",
-        aspect="auto",
-        zmin=0, zmax=1,
-        text_auto=".2f",
-        title="Score promedio por Grupo e IPS",
-    )
-    fig.update_xaxes(tickangle=45)
+
+    def construir():
+        grupo_col = "Grupo_ID" if "Grupo_ID" in df_asig.columns else "Grupo"
+        pivot = df_asig.pivot_table(
+            values="Score_IPS", index=grupo_col, columns="Institucion", aggfunc="mean"
+        )
+        fig = px.imshow(
+            pivot,
+            color_continuous_scale="RdYlGn",
+            aspect="auto",
+            zmin=0, zmax=1,
+            text_auto=".2f",
+            title="Score promedio por Grupo e IPS",
+        )
+        fig.update_xaxes(tickangle=45)
+        return fig
+
+    fig = _figura(results, f"heatmap_score_{key_suffix}", construir)
     st.plotly_chart(fig, use_container_width=True, key=f"heatmap_score_{key_suffix}")
     st.caption("Cada celda muestra el score promedio de la IPS para un grupo. Verde = alto, rojo = bajo. Sirve para detectar si un grupo está cayendo sistemáticamente en IPS de baja calidad.")
 
 
 def _render_quadrant_calidad_costo(df_asig, results, loader, key_suffix=""):
-    import plotly.express as px
     if "scores" not in results or not results["scores"]:
         return
+    fig = _figura(
+        results, f"quadrant_{key_suffix}", lambda: _figura_quadrant_calidad_costo(df_asig, results, loader)
+    )
+    if fig is None:
+        return
+    st.plotly_chart(fig, use_container_width=True, key=f"quadrant_{key_suffix}")
+    st.caption("Cada burbuja es una IPS. Eje X = % de contraprestación que cobra (menor = más barato para el estudiante), eje Y = score multicriterio (mayor = mejor), tamaño = cupos efectivamente asignados. El cuadrante **arriba-izquierda** agrupa la frontera eficiente: alto score y bajo costo. Las líneas punteadas son las medianas de cada eje.")
+
+
+def _figura_quadrant_calidad_costo(df_asig, results, loader):
+    """Figura de _render_quadrant_calidad_costo (None si no hay con qué comparar)."""
+    import plotly.express as px
 
     costos = loader.costos.copy()
     if "ID_Institucion" in costos.columns:
         costos["ID_Institucion"] = costos["ID_Institucion"].astype(str)
 
     if "%_Contraprestacion_Matricula (0-100)" not in costos.columns:
-        return
+        return None
 
     oferta_idx = loader.oferta.copy()
     if "ID_Institucion" in oferta_idx.columns:
@@ -1509,7 +1934,7 @@ def _render_quadrant_calidad_costo(df_asig, results, loader, key_suffix=""):
 
     df_q = pd.DataFrame(rows)
     if df_q.empty or df_q["Score"].nunique() <= 1:
-        return
+        return None
 
     fig = px.scatter(
         df_q, x="Costo_%", y="Score", size="Usados", color="Score",
@@ -1520,19 +1945,461 @@ def _render_quadrant_calidad_costo(df_asig, results, loader, key_suffix=""):
     fig.update_traces(textposition="top center", textfont_size=8)
     fig.add_vline(x=df_q["Costo_%"].median(), line_dash="dot", line_color="gray", opacity=0.5)
     fig.add_hline(y=df_q["Score"].median(), line_dash="dot", line_color="gray", opacity=0.5)
-    st.plotly_chart(fig, use_container_width=True, key=f"quadrant_{key_suffix}")
-    st.caption("Cada burbuja es una IPS. Eje X = % de contraprestación que cobra (menor = más barato para el estudiante), eje Y = score multicriterio (mayor = mejor), tamaño = cupos efectivamente asignados. El cuadrante **arriba-izquierda** agrupa la frontera eficiente: alto score y bajo costo. Las líneas punteadas son las medianas de cada eje.")
+    return fig
+
+
+@st.fragment
+def _fragmento_semestre(results: Dict, sem: int) -> None:
+    """Pestaña de un semestre del modo refinado."""
+    import plotly.express as px
+
+    d = results["por_semestre"][sem]
+    df_asig = results["asignaciones"]
+    df_s = df_asig[df_asig["Semestre"] == sem].copy()
+
+    cA, cB, cC, cD = st.columns(4)
+    cA.metric("Estudiantes", d["n_estudiantes"])
+    cB.metric("Asignados", d["asignados"])
+    cC.metric("Grupos", d["n_grupos"])
+    cD.metric("Asignaturas", len(d["asignaturas"]))
+    st.caption(f"Solver: {format_report(d.get('solve_report'))}")
+    precios = results.get("precios_sombra")
+    if precios is not None and not precios.empty:
+        render_precios_sombra(
+            precios[precios["Semestre"] == sem].drop(columns="Semestre"),
+            key=f"precios_sombra_s{sem}",
+        )
+
+    for plan in d.get("alternativas", []):
+        perdida = d["obj_value"] - plan["calidad"]
+        with st.expander(
+            f"Plan alternativo {plan['plan']} · calidad {plan['calidad']:.4f} "
+            f"(−{perdida:.4f}) · {plan['grupos']} grupos"
+        ):
+            st.dataframe(plan["resultados"], use_container_width=True, hide_index=True)
+
+    display_cols = ["Grupo_ID", "Tamano_Grupo", "Asignatura", "Set", "Rotacion",
+                    "ID_Institucion", "Institucion", "Estudiantes", "Score_IPS"]
+    display_cols = [c for c in display_cols if c in df_s.columns]
+    st.dataframe(df_s[display_cols], use_container_width=True, hide_index=True)
+
+    # Distribución por asignatura del semestre
+    for asig in d["asignaturas"]:
+        df_a = df_s[df_s["Asignatura"] == asig]
+        if df_a.empty:
+            continue
+
+        def _barras(df_a=df_a, asig=asig):
+            label_col = "Institucion" if "Institucion" in df_a.columns else "ID_Institucion"
+            fig = px.bar(
+                df_a, x=label_col, y="Estudiantes", color="Grupo_ID",
+                barmode="stack", title=f"📊 {asig}",
+            )
+            fig.update_xaxes(tickangle=45)
+            return fig
+
+        st.plotly_chart(
+            _figura(results, f"dist_s{sem}_{asig}", _barras),
+            use_container_width=True, key=f"dist_s{sem}_{asig}",
+        )
+
+
+@st.fragment
+def _fragmento_robustez(results: Dict) -> None:
+    """Robustez Monte Carlo del plan (bajo demanda, puede tardar)."""
+    import plotly.express as px
+
+    por_sem = results.get("por_semestre", {})
+    df_asig = results["asignaciones"]
+    with st.expander("🎲 Robustez del plan (Monte Carlo sobre pesos y cupos)"):
+        with st.form("form_robustez"):
+            c1, c2, c3, c4, c5 = st.columns(5)
+            sem_rob = c1.selectbox("Semestre", sorted(por_sem.keys()))
+            n_muestras = c2.number_input("Muestras", min_value=10, max_value=1000, value=100, step=10)
+            var_cupos = c3.slider("Variación de cupos (±%)", 0, 50, 20) / 100.0
+            concentracion = c4.number_input(
+                "Concentración de pesos", min_value=5.0, max_value=500.0, value=50.0, step=5.0,
+                help="Mayor = pesos muestreados más cerca de los del set.",
+            )
+            tl_muestra = c5.number_input("Tiempo por muestra (s)", min_value=1, value=5, step=1)
+            lanzar = st.form_submit_button("Ejecutar análisis")
+        if lanzar:
+            with st.spinner(f"Resolviendo {int(n_muestras)} muestras..."):
+                st.session_state.robustez = {
+                    "semestre": sem_rob,
+                    **analizar_robustez(
+                        st.session_state.loader, results, sem_rob, int(n_muestras),
+                        float(concentracion), var_cupos, float(tl_muestra),
+                        cache_etapas=st.session_state.setdefault("cache_etapas", {}),
+                    ),
+                }
+        rob = st.session_state.get("robustez")
+        if rob:
+            res_rob = rob["resumen"]
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Muestras con solución", f"{res_rob['con_solucion']}/{res_rob['muestras']}")
+            if res_rob["calidad_media"] is not None:
+                c2.metric("Calidad media", f"{res_rob['calidad_media']:.2f}")
+                c3.metric("Calidad p5–p95", f"{res_rob['calidad_p05']:.2f} – {res_rob['calidad_p95']:.2f}")
+            frec = rob["frecuencias"]
+            if not frec.empty:
+                frec = frec.copy()
+                if "Institucion" in df_asig.columns:
+                    nombres = df_asig.drop_duplicates("ID_Institucion").set_index("ID_Institucion")["Institucion"]
+                    frec["Institucion"] = frec["ID_Institucion"].map(nombres).fillna(frec["ID_Institucion"])
+                else:
+                    frec["Institucion"] = frec["ID_Institucion"]
+                pivot = frec.pivot_table(
+                    index="Asignatura", columns="Institucion", values="Frecuencia", fill_value=0.0
+                )
+                fig = px.imshow(
+                    pivot, color_continuous_scale="Blues", zmin=0, zmax=1, aspect="auto",
+                    title=f"Frecuencia de asignación por (asignatura, IPS) — semestre {rob['semestre']}",
+                )
+                st.plotly_chart(fig, use_container_width=True, key="robustez_heatmap")
+                st.dataframe(frec.round(3), use_container_width=True, hide_index=True)
+
+
+@st.fragment
+def _fragmento_editor_pesos(results: Dict) -> None:
+    """Editor de pesos en vivo: el modelo se construye una vez y cada ajuste
+    solo cambia el objetivo y re-optimiza en caliente."""
+    por_sem = results.get("por_semestre", {})
+    df_asig = results["asignaciones"]
+    with st.expander("🎚️ Editor de pesos en vivo"):
+        c1, c2, c3 = st.columns(3)
+        sem_ed = c1.selectbox("Semestre", sorted(por_sem.keys()), key="sem_editor")
+        tl_ajuste = c2.number_input(
+            "Tiempo por ajuste (s)", min_value=0.5, value=1.0, step=0.5,
+            help="Si no alcanza para probar el óptimo se muestra el mejor plan encontrado.",
+        )
+        editor = st.session_state.get("editor_pesos")
+        if c3.button("Preparar editor", key="preparar_editor") or (
+            editor is not None and editor["semestre"] != sem_ed
+        ):
+            with st.spinner("Construyendo el modelo del semestre..."):
+                st.session_state.editor_pesos = editor = preparar_editor_pesos(
+                    st.session_state.loader, results, sem_ed, time_limit=60,
+                    cache_etapas=st.session_state.setdefault("cache_etapas", {}),
+                )
+        if editor is not None:
+            pesos_ui = {}
+            for sid, pesos in editor["pesos_por_set"].items():
+                st.markdown(f"**{sid}** (los pesos se normalizan a suma 1)")
+                cols = st.columns(3)
+                pesos_ui[sid] = {
+                    k: cols[i % 3].slider(
+                        k, 0.0, 1.0, float(w), step=0.01, key=f"peso_{sem_ed}_{sid}_{k}"
+                    )
+                    for i, (k, w) in enumerate(pesos.items())
+                }
+            opt_ed = editor["optimizer"]
+            if editor["aplicado"] != pesos_ui and opt_ed.results is not None and not opt_ed.results.empty:
+                opt_ed.update_scores(scores_desde_pesos(editor, pesos_ui), time_limit=float(tl_ajuste))
+                editor["aplicado"] = pesos_ui
+            rep_ed = opt_ed.get_solve_report() or {}
+            plan_ed = opt_ed.results
+            if plan_ed is None or plan_ed.empty:
+                st.warning(f"Sin plan para estos pesos ({format_report(rep_ed)}).")
+            else:
+                c1, c2, c3 = st.columns(3)
+                c1.metric("Calidad (pesos editados)", f"{opt_ed.get_objective_value():.2f}")
+                c2.metric("Grupos", int(plan_ed["Grupo"].nunique()))
+                c3.metric("Tiempo del ajuste", f"{rep_ed.get('tiempos', {}).get('total', 0):.2f}s")
+                st.caption(f"Solver: {format_report(rep_ed)}")
+                antes = editor["plan_base"].groupby(["Asignatura", "ID_Institucion"])["Estudiantes"].sum()
+                plan_ed = plan_ed.assign(ID_Institucion=plan_ed["ID_Institucion"].astype(str))
+                ahora = plan_ed.groupby(["Asignatura", "ID_Institucion"])["Estudiantes"].sum()
+                comp = pd.concat(
+                    [antes.rename("Plan_Vigente"), ahora.rename("Pesos_Editados")], axis=1
+                ).fillna(0).astype(int).reset_index()
+                comp["Diferencia"] = comp["Pesos_Editados"] - comp["Plan_Vigente"]
+                if "Institucion" in df_asig.columns:
+                    nombres = df_asig.drop_duplicates("ID_Institucion").set_index("ID_Institucion")["Institucion"]
+                    comp.insert(2, "Institucion", comp["ID_Institucion"].map(nombres))
+                st.dataframe(comp, use_container_width=True, hide_index=True)
+
+
+@st.fragment
+def _fragmento_impacto_ips(results: Dict) -> None:
+    """Impacto de perder cada IPS (bajo demanda, una corrida por IPS)."""
+    por_sem = results.get("por_semestre", {})
+    df_asig = results["asignaciones"]
+    with st.expander("🏥 Impacto de perder cada IPS (riesgo de convenios)"):
+        with st.form("form_impacto_ips"):
+            c1, c2 = st.columns(2)
+            sem_imp = c1.selectbox("Semestre", sorted(por_sem.keys()), key="sem_impacto")
+            tl_ips = c2.number_input("Tiempo por IPS (s)", min_value=1, value=60, step=5)
+            lanzar_imp = st.form_submit_button("Evaluar todas las IPS")
+        if lanzar_imp:
+            with st.spinner("Re-optimizando sin cada IPS..."):
+                st.session_state.impacto_ips = {
+                    "semestre": sem_imp,
+                    "tabla": analizar_impacto_ips(
+                        st.session_state.loader, results, sem_imp, float(tl_ips),
+                    ),
+                }
+        imp = st.session_state.get("impacto_ips")
+        if imp and not imp["tabla"].empty:
+            tabla = imp["tabla"].copy()
+            if "Institucion" in df_asig.columns:
+                nombres = df_asig.drop_duplicates("ID_Institucion").set_index("ID_Institucion")["Institucion"]
+                tabla.insert(1, "Institucion", tabla["ID_Institucion"].map(nombres))
+            criticas = int((tabla["Perdida_Cobertura"] > 0).sum())
+            c1, c2 = st.columns(2)
+            c1.metric("IPS evaluadas", len(tabla))
+            c2.metric(
+                "IPS sin reemplazo (pérdida de cobertura)", criticas,
+                help="IPS sin las que alguna rotación ya no aloja a todos: la corrida es infactible",
+            )
+            st.dataframe(
+                tabla.round(4), use_container_width=True, hide_index=True,
+                column_config={
+                    "Estudiantes_Alojables": st.column_config.NumberColumn(
+                        help="Cota superior: lo que cada rotación aloja por separado sin la IPS "
+                             "(el mínimo entre rotaciones). El plan conjunto puede alojar menos.",
+                    ),
+                    "Perdida_Cobertura": st.column_config.NumberColumn(
+                        help="Pérdida mínima de cobertura (estudiantes − cota de alojables), no "
+                             "exacta: con 0 la corrida aún puede ser infactible (ver Estado).",
+                    ),
+                },
+            )
+            st.download_button(
+                "📥 Descargar CSV",
+                data=tabla.to_csv(index=False).encode("utf-8"),
+                file_name=f"impacto_ips_semestre_{imp['semestre']}.csv",
+                mime="text/csv",
+                key="descarga_impacto_ips",
+            )
+
+
+@st.fragment
+def _fragmento_debug(results: Dict) -> None:
+    """Panel de debug (su selectbox y su toggle no re-ejecutan la página)."""
+    _perfil_memoria_sesion(results)
+    render_debug_info(results.get("debug"))
+
+
+@st.fragment
+def _fragmento_precios_sombra(df_precios) -> None:
+    """Precios sombra del modo agregado (su filtro no re-ejecuta la página)."""
+    render_precios_sombra(df_precios)
+
+
+# Optimizaciones simultáneas en el servidor (todas las sesiones)
+TRABAJOS_SIMULTANEOS = 2
+
+
+# Con esta variable (p. ej. http://localhost:8600) las optimizaciones se
+# envían al servicio local (servicio.py) en vez de correr en la app
+SERVICIO_URL = os.environ.get("OPTIMIZACION_SERVICIO_URL")
+
+
+@st.cache_resource
+def _podar_logs_solver() -> int:
+    """Retención de los logs de CBC: una vez por proceso del servidor."""
+    return prune_solver_logs()
+
+
+@st.cache_resource
+def _job_runner():
+    """Cola de trabajos compartida por todas las sesiones del servidor."""
+    if SERVICIO_URL:
+        return ServiceJobRunner(SERVICIO_URL)
+    return JobRunner(max_workers=TRABAJOS_SIMULTANEOS)
+
+
+# Excel exportados que se conservan en memoria (ver _excel_descarga)
+MAX_EXPORTES_EN_CACHE = 8
+
+
+@st.cache_resource
+def _exportes_cache() -> Dict:
+    """Bytes de los Excel ya generados, por (resultado_id, exportador); compartido por las sesiones."""
+    return {"lock": threading.Lock(), "bytes": {}}
+
+
+def _excel_descarga(results: Dict, generar: Callable[[Dict], bytes]) -> Callable[[], bytes]:
+    """Contenido diferido para st.download_button.
+
+    El Excel se genera recién al hacer clic (Streamlit llama a la función en
+    otro hilo) y queda memoizado por resultado, así que los reruns de la
+    página no vuelven a exportar. El tiempo de exportación se suma a
+    results["debug"]["tiempos"].
+    """
+    clave = (_resultado_id(results), generar.__name__)
+    cache = _exportes_cache()
+
+    def contenido() -> bytes:
+        with cache["lock"]:
+            datos = cache["bytes"].get(clave)
+        if datos is None:
+            with collect_timings() as tiempos_excel:
+                datos = generar(results)
+            results.setdefault("debug", {}).setdefault("tiempos", {}).update(tiempos_excel)
+            with cache["lock"]:
+                cache["bytes"][clave] = datos
+                while len(cache["bytes"]) > MAX_EXPORTES_EN_CACHE:
+                    cache["bytes"].pop(next(iter(cache["bytes"])))
+        return datos
+
+    return contenido
+
+
+def _trabajo_optimizacion(
+    modo_resultado: str,
+    loader: DataLoader,
+    params: Dict,
+    cache: Dict,
+    cache_etapas: Dict,
+    avisar: Callable,
+    tiempos: Optional[Dict] = None,
+) -> Dict:
+    """Ejecuta procesar_refinado / procesar_datos y empaqueta lo que la sesión debe recibir.
+
+    En segundo plano corre en otro proceso, así que además del resultado
+    devuelve los memos y los costos con columnas auxiliares (ver
+    _prepare_score_matrix), que el proceso de la app no ve.
+
+    Los tiempos por etapa (src/utils/timing.py) quedan en resultado["debug"]["tiempos"],
+    sumados a `tiempos` (p. ej. la carga del Excel, medida antes). Con
+    PERFIL_MEMORIA, resultado["debug"]["memoria"] trae lo retenido por el resultado.
+    """
+    with collect_timings(dict(tiempos or {})) as registro:
+        with span("optimizacion"):
+            if modo_resultado == "refinado":
+                resultado = procesar_refinado(
+                    loader, **params, cache=cache, cache_etapas=cache_etapas, avisar=avisar,
+                )
+            else:
+                resultado = procesar_datos(loader, **params, avisar=avisar)
+    logger.info(f"Tiempos por etapa ({modo_resultado}): {format_timings(registro)}")
+    if resultado is not None:
+        resultado.setdefault("debug", {})["tiempos"] = registro
+        if PERFIL_MEMORIA:
+            resultado["debug"]["memoria"] = retained_sizes(resultado)
+    return {
+        "modo_resultado": modo_resultado,
+        "resultado": resultado,
+        "cache": cache,
+        "cache_etapas": cache_etapas,
+        "costos": loader.costos,
+    }
+
+
+def _perfil_memoria_sesion(results: Dict) -> None:
+    """Con PERFIL_MEMORIA, deja en results["debug"]["memoria_sesion"] lo que retiene la sesión."""
+    if not PERFIL_MEMORIA or not results:
+        return
+    results.setdefault("debug", {})["memoria_sesion"] = retained_sizes(
+        {k: st.session_state[k] for k in st.session_state.keys()}, expandir=()
+    )
+
+
+def _aplicar_resultado(salida: Dict) -> None:
+    """Lleva la salida de _trabajo_optimizacion al estado de la sesión."""
+    st.session_state.results = salida["resultado"]
+    st.session_state.modo_resultado = salida["modo_resultado"]
+    st.session_state.cache_semestres = salida["cache"]
+    st.session_state.cache_etapas = salida["cache_etapas"]
+    if st.session_state.get("loader") is not None:
+        st.session_state.loader.costos = salida["costos"]
+    # El modelo del editor de pesos corresponde a la corrida anterior
+    st.session_state.pop("editor_pesos", None)
+
+
+def _render_trabajo(runner) -> bool:
+    """Progreso del trabajo en segundo plano de la sesión. Devuelve True si sigue en curso."""
+    job_id = st.session_state.get("job_id")
+    job = runner.get(job_id) if job_id else None
+    if job is None:
+        return False
+
+    en_curso = job["estado"] not in TRABAJO_TERMINADO
+    if en_curso:
+        etiqueta = "⏳ En cola" if job["estado"] == TRABAJO_EN_COLA else "⏳ Optimizando en segundo plano"
+    else:
+        etiqueta = {
+            TRABAJO_COMPLETADO: "✅ Optimización completada",
+            TRABAJO_CANCELADO: "⛔ Optimización cancelada",
+        }.get(job["estado"], "❌ La optimización falló")
+    with st.status(etiqueta, expanded=en_curso, state="running" if en_curso else (
+        "complete" if job["estado"] == TRABAJO_COMPLETADO else "error"
+    )):
+        for nivel, contenido in job["avisos"]:
+            _avisar_streamlit(nivel, contenido)
+        if job["parciales"]:
+            st.dataframe(
+                pd.DataFrame([
+                    {k: v for k, v in p.items() if k != "asignaciones"}
+                    for _, p in sorted(job["parciales"].items())
+                ]),
+                use_container_width=True,
+                hide_index=True,
+            )
+        if job["error"]:
+            st.error(job["error"])
+
+    if en_curso:
+        if st.button("⛔ Cancelar optimización", key=f"cancelar_{job_id}"):
+            runner.cancel(job_id)
+            st.rerun()
+    elif not st.session_state.get("job_aplicado", True):
+        st.session_state.job_aplicado = True
+        if job["estado"] == TRABAJO_COMPLETADO:
+            _aplicar_resultado(job["resultado"])
+    return en_curso
+
+
+def _seguir_trabajo(runner) -> None:
+    """Muestra el trabajo de la sesión; mientras sigue en curso solo este
+    fragmento se refresca (cada segundo) y al terminar se recarga la página
+    para mostrar el resultado."""
+    job_id = st.session_state.get("job_id")
+    job = runner.get(job_id) if job_id else None
+    if job is None:
+        return
+    en_curso = job["estado"] not in TRABAJO_TERMINADO
+
+    @st.fragment(run_every=1.0 if en_curso else None)
+    def progreso():
+        if not _render_trabajo(runner) and en_curso:
+            st.rerun()
+
+    progreso()
 
 
 def main():
     """Función principal"""
     render_header()
+    _podar_logs_solver()
 
     # Sidebar simplificado
     with st.sidebar:
         st.header("🎯 Opciones")
         st.caption("La página muestra Entrada + Resultados en un solo flujo.")
 
+        st.subheader("⏱️ Solver")
+        time_limit = st.number_input(
+            "Presupuesto de tiempo (s)",
+            min_value=5,
+            max_value=1800,
+            value=120,
+            step=5,
+            help="Tiempo máximo de reloj por corrida (por semestre en el modo refinado). "
+                 "Al agotarse se devuelve el mejor plan encontrado y se informa el gap.",
+        )
+        gap_pct = st.number_input(
+            "Gap relativo objetivo (%)",
+            min_value=0.0,
+            max_value=50.0,
+            value=0.0,
+            step=0.5,
+            help="0 = probar el óptimo. Con un valor > 0 el solver se detiene al garantizar esa distancia al óptimo.",
+        )
+        gap_rel = gap_pct / 100.0 if gap_pct > 0 else None
+
     # Entrada
     uploaded_file = render_upload_section()
 
@@ -1577,6 +2444,8 @@ def main():
 
     selecciones_refinado = []
     n_por_semestre = {}
+    modo_solver = "monolitico"
+    n_alternativas = 0
 
     if modo == "Refinado por semestre":
         st.subheader("⚙️ Configuración Refinada (multi-semestre)")
@@ -1653,6 +2522,38 @@ def main():
                             key=f"n_estudiantes_sem_{sem}",
                         )
 
+                estrategias = {
+                    "MILP único (monolítico)": "monolitico",
+                    "Descomposición por rotación (paralela)": "descomposicion",
+                    "Portafolio de solvers (carrera)": "portafolio",
+                }
+                estrategia = st.radio(
+                    "Estrategia de solución",
+                    list(estrategias.keys()),
+                    horizontal=True,
+                    help=(
+                        "La descomposición fija primero los tamaños de grupo y resuelve cada "
+                        "(asignatura, rotación) por separado en paralelo. Útil en semestres con muchas rotaciones. "
+                        "El portafolio resuelve el MILP único con varias configuraciones de solver en procesos "
+                        "paralelos y se queda con la primera que prueba el óptimo."
+                    ),
+                    key="estrategia_solver",
+                )
+                modo_solver = estrategias[estrategia]
+                n_alternativas = st.number_input(
+                    "Planes alternativos por semestre",
+                    min_value=0,
+                    max_value=10,
+                    value=0,
+                    step=1,
+                    disabled=modo_solver == "descomposicion",
+                    help=(
+                        "Además del óptimo, busca los siguientes mejores planes que usan un conjunto "
+                        "distinto de IPS en alguna rotación. No disponible en modo descomposición."
+                    ),
+                    key="n_alternativas",
+                )
+
     else:
         capacidad_total = preview_capacidad(uploaded_file)
         c1, c2, c3 = st.columns(3)
@@ -1672,11 +2573,25 @@ def main():
     if modo == "Refinado por semestre" and not selecciones_refinado:
         _puede_ejecutar = False
 
+    runner = _job_runner()
+    trabajo = runner.get(st.session_state.get("job_id") or "")
+    trabajo_en_curso = trabajo is not None and trabajo["estado"] not in TRABAJO_TERMINADO
+
+    # Sin fork (Windows) los trabajos locales no pueden correr aparte; el servicio sí
+    segundo_plano_disponible = bool(SERVICIO_URL) or FORK_DISPONIBLE
+    en_segundo_plano = st.checkbox(
+        "Ejecutar en segundo plano",
+        value=segundo_plano_disponible,
+        disabled=not segundo_plano_disponible,
+        help="La página sigue respondiendo durante la optimización; el progreso y los "
+             "semestres terminados se muestran a medida que llegan y se puede cancelar.",
+    )
+
     if st.button(
         "🚀 Ejecutar Optimización",
         use_container_width=True,
         type="primary",
-        disabled=not _puede_ejecutar,
+        disabled=not _puede_ejecutar or trabajo_en_curso,
     ):
         with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
             tmp.write(uploaded_file.getbuffer())
@@ -1688,38 +2603,74 @@ def main():
                     selecciones_refinado[0]["set_id"] if selecciones_refinado else set_id
                 )
                 loader = DataLoader(tmp_path, set_id_to_use, semestre)
-                loader.load_all()
+                with collect_timings() as tiempos_carga:
+                    loader.load_all()
+                previo = st.session_state.get("loader")
+                if previo is not None and previo.huellas:
+                    cambiadas = loader.changed_sheets(previo)
+                    if cambiadas:
+                        st.caption(
+                            f"Hojas modificadas desde la carga anterior: {', '.join(sorted(cambiadas))} · "
+                            f"etapas a recalcular: {', '.join(sorted(loader.stale_stages(previo))) or 'ninguna'}"
+                        )
+                    else:
+                        st.caption("Plantilla sin cambios desde la carga anterior: se reutilizan las etapas en caché")
                 st.session_state.loader = loader
 
-                if modo == "Refinado por semestre":
-                    if loader.rotaciones is None or loader.rotaciones.empty:
-                        st.error("❌ El archivo no contiene la hoja '06_Rotaciones'. Usa Plantilla_V4_Refinada.xlsx")
-                        st.session_state.results = None
+                if modo == "Refinado por semestre" and (loader.rotaciones is None or loader.rotaciones.empty):
+                    st.error("❌ El archivo no contiene la hoja '06_Rotaciones'. Usa Plantilla_V4_Refinada.xlsx")
+                    st.session_state.results = None
+                else:
+                    if modo == "Refinado por semestre":
+                        modo_resultado = "refinado"
+                        params = dict(
+                            selecciones=selecciones_refinado,
+                            n_por_semestre=n_por_semestre,
+                            semestre_vigencia=semestre,
+                            modo_solver=modo_solver,
+                            time_limit=time_limit,
+                            gap_rel=gap_rel,
+                            n_alternativas=int(n_alternativas),
+                        )
                     else:
-                        st.session_state.results = procesar_refinado(
-                            loader,
-                            selecciones_refinado,
-                            n_por_semestre,
-                            semestre,
+                        modo_resultado = "agregado"
+                        params = dict(
+                            set_id=set_id,
+                            semestre=semestre,
+                            total_estudiantes=total_estudiantes,
+                            programa_manual=programa_manual,
+                            tipo_est_manual=tipo_est_manual,
+                            tipo_practica_manual=tipo_practica_manual,
+                            time_limit=time_limit,
+                            gap_rel=gap_rel,
                         )
-                        st.session_state.modo_resultado = "refinado"
-                else:
-                    st.session_state.results = procesar_datos(
-                        loader,
-                        set_id,
-                        semestre,
-                        total_estudiantes,
-                        programa_manual,
-                        tipo_est_manual,
-                        tipo_practica_manual,
+                    args = (
+                        modo_resultado, loader, params,
+                        st.session_state.setdefault("cache_semestres", {}),
+                        st.session_state.setdefault("cache_etapas", {}),
                     )
-                    st.session_state.modo_resultado = "agregado"
-
-            if st.session_state.results:
-                st.success("✅ Optimización completada")
+                    kwargs = {"tiempos": tiempos_carga}
+                    if en_segundo_plano and SERVICIO_URL:
+                        try:
+                            st.session_state.job_id = runner.submit_optimizacion(
+                                bytes(uploaded_file.getbuffer()), set_id_to_use, semestre,
+                                modo_resultado, params,
+                            )
+                            st.session_state.job_aplicado = False
+                        except (ConnectionError, RuntimeError) as e:
+                            st.error(f"❌ {e}")
+                    elif en_segundo_plano:
+                        st.session_state.job_id = runner.submit(_trabajo_optimizacion, *args, **kwargs)
+                        st.session_state.job_aplicado = False
+                    else:
+                        _aplicar_resultado(_trabajo_optimizacion(*args, avisar=_avisar_streamlit, **kwargs))
+                        if st.session_state.results:
+                            st.success("✅ Optimización completada")
         finally:
             Path(tmp_path).unlink()
 
+    _seguir_trabajo(runner)
+
     # Resultados en la misma página
     if st.session_state.results:
         st.markdown("---")
@@ -1739,14 +2690,14 @@ def main():
             col3.metric("Estudiantes", results["total_estudiantes"])
             col4.metric("Grupos formados", results["n_grupos_total"])
 
-            # Descarga (Excel completo)
-            excel_refinado_bytes = generar_excel_refinado(results)
+            # Descarga (Excel completo): se genera al hacer clic
             st.download_button(
                 label="📥 Descargar Excel completo (Asignaciones + Indicadores)",
-                data=excel_refinado_bytes,
+                data=_excel_descarga(results, generar_excel_refinado),
                 file_name="asignaciones_refinado_multisemestre.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 key="download_asignaciones_refinado",
+                on_click="ignore",
             )
 
             # Indicadores demanda/oferta (vista rápida)
@@ -1771,52 +2722,32 @@ def main():
                     },
                 )
 
-            import plotly.express as px
-
-            # Detalle por semestre (organizado en pestañas)
+            # Cada bloque es un fragmento: sus widgets solo re-ejecutan ese bloque
             if por_sem:
                 st.subheader("🗂️ Detalle por semestre")
                 tabs = st.tabs([f"Semestre {s}" for s in sorted(por_sem.keys())])
                 for tab, sem in zip(tabs, sorted(por_sem.keys())):
                     with tab:
-                        d = por_sem[sem]
-                        df_s = df_asig[df_asig["Semestre"] == sem].copy()
-
-                        cA, cB, cC, cD = st.columns(4)
-                        cA.metric("Estudiantes", d["n_estudiantes"])
-                        cB.metric("Asignados", d["asignados"])
-                        cC.metric("Grupos", d["n_grupos"])
-                        cD.metric("Asignaturas", len(d["asignaturas"]))
-
-                        display_cols = ["Grupo_ID", "Tamano_Grupo", "Asignatura", "Set", "Rotacion",
-                                        "ID_Institucion", "Institucion", "Estudiantes", "Score_IPS"]
-                        display_cols = [c for c in display_cols if c in df_s.columns]
-                        st.dataframe(df_s[display_cols], use_container_width=True, hide_index=True)
-
-                        # Distribución por asignatura del semestre
-                        for asig in d["asignaturas"]:
-                            df_a = df_s[df_s["Asignatura"] == asig]
-                            if df_a.empty:
-                                continue
-                            label_col = "Institucion" if "Institucion" in df_a.columns else "ID_Institucion"
-                            fig = px.bar(
-                                df_a, x=label_col, y="Estudiantes", color="Grupo_ID",
-                                barmode="stack", title=f"📊 {asig}",
-                            )
-                            fig.update_xaxes(tickangle=45)
-                            st.plotly_chart(fig, use_container_width=True, key=f"dist_s{sem}_{asig}")
+                        _fragmento_semestre(results, sem)
+
+                _fragmento_robustez(results)
+                _fragmento_editor_pesos(results)
+                _fragmento_impacto_ips(results)
 
             # Análisis avanzado global
             if not df_asig.empty:
                 st.subheader("📈 Análisis Avanzado (global)")
                 _key = "multi_" + "_".join(str(s) for s in sorted(por_sem.keys()))
-                _render_heatmap_grupo_ips(df_asig, key_suffix=_key)
+                _render_heatmap_grupo_ips(df_asig, results, key_suffix=_key)
                 _render_quadrant_calidad_costo(df_asig, results, st.session_state.loader, key_suffix=_key)
             else:
                 st.warning("No se encontraron asignaciones factibles.")
+            render_metricas_solver(results.get("metricas_solver"), summarize_metrics(load_metrics_history()))
+            _fragmento_debug(results)
         else:
             st.header("📊 Resultados")
             render_results_summary(results)
+            st.caption(f"Solver: {format_report(results.get('solve_report'))}")
 
             if results["asignaciones"].empty:
                 st.error("❌ No hubo asignaciones en esta corrida.")
@@ -1834,16 +2765,19 @@ def main():
                 render_demanda_vs_asignacion(results["summary"])
 
             render_capacidad_chart(results["util"])
-            render_debug_info(results["debug"])
+            _fragmento_precios_sombra(results.get("precios_sombra"))
+            render_sensibilidad_pesos(results.get("sensibilidad_pesos"))
+            render_metricas_solver(results.get("metricas_solver"), summarize_metrics(load_metrics_history()))
 
             st.header("📥 Descargar Resultados")
-            excel_bytes = generar_excel_resultados(results)
             st.download_button(
                 label="📊 Descargar resultados (Excel)",
-                data=excel_bytes,
+                data=_excel_descarga(results, generar_excel_resultados),
                 file_name="asignaciones_optimizacion.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                on_click="ignore",
             )
+            _fragmento_debug(results)
 
     # Ayuda siempre disponible abajo
     st.markdown("---")
@@ -1959,5 +2893,7 @@ def main():
         ]
         for c in criteria:
             st.write(f"• {c}")
+
+
 if __name__ == "__main__":
     main()
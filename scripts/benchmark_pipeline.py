@@ -0,0 +1,231 @@
+"""
+Benchmark del pipeline completo sobre plantillas sintéticas.
+
+Para cada punto de la grilla (IPS × asignaturas × rotaciones × estudiantes)
+genera una plantilla con generar_plantilla_sintetica y mide cada etapa:
+
+    generacion     escritura del libro sintético
+    carga          DataLoader.load_all
+    matriz_scores  _prepare_score_matrix
+    optimizacion   procesar_refinado (todos los semestres), con el desglose de
+                   construcción / fase 1 / fase 2 de GroupOptimizer
+    exportacion    generar_excel_refinado
+
+Los resultados quedan en un archivo JSON (o CSV si la salida termina en .csv)
+con una fila por punto y repetición. Un punto que falla queda con su error y
+la grilla sigue.
+
+Con --perfil-memoria cada etapa agrega su pico de memoria (mb_<etapa>, ver
+src/utils/memoria.py), el RSS máximo del proceso y lo retenido por el
+resultado y el loader (mb_resultado, mb_loader). tracemalloc infla los
+tiempos: no mezclar esas corridas con las de tiempo.
+
+En la salida JSON, meta["importacion"] guarda el tiempo de `import app` en un
+proceso nuevo (scripts/tiempo_importacion.py) y los imports que lo dominan.
+
+Uso:
+    python scripts/benchmark_pipeline.py --ips 30 100 300 --asignaturas 2 4 \
+        --estudiantes 60 120 --time-limit 30
+"""
+
+import sys
+sys.path.insert(0, ".")
+
+import os
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import itertools
+from datetime import datetime
+from typing import Dict, List
+
+import pandas as pd
+import pulp
+
+from scripts.generar_plantilla_sintetica import generar_plantilla_sintetica
+from scripts.tiempo_importacion import import_report
+from src.utils.timing import span, collect_timings
+from src.utils.memoria import deep_sizeof, rss_max_mb, MB
+
+
+def _medir(tiempos: Dict, etapa: str, fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    with span(etapa):
+        salida = fn(*args, **kwargs)
+    tiempos[f"t_{etapa}"] = round(time.perf_counter() - t0, 4)
+    return salida
+
+
+def run_point(
+    app_mod,
+    ruta: str,
+    n_ips: int,
+    n_asignaturas: int,
+    rotaciones: int,
+    n_estudiantes: int,
+    ips_por_rotacion: int,
+    semestres: List[int],
+    modo_solver: str,
+    time_limit: float,
+    semilla: int,
+    perfil_memoria: bool = False,
+) -> Dict:
+    """Corre todas las etapas sobre una plantilla sintética y devuelve su fila de resultados."""
+    fila: Dict = {}
+    with collect_timings(memoria=perfil_memoria) as registro:
+        resultado, loader = _run_stages(
+            fila, app_mod, ruta, n_ips, n_asignaturas, rotaciones, n_estudiantes,
+            ips_por_rotacion, semestres, modo_solver, time_limit, semilla,
+        )
+    if perfil_memoria:
+        for etapa, entrada in registro.items():
+            if "/" not in etapa:
+                fila[f"mb_{etapa}"] = entrada.get("pico_mb")
+        fila["rss_max_mb"] = rss_max_mb()
+        fila["mb_resultado"] = round(deep_sizeof(resultado) / MB, 3)
+        fila["mb_loader"] = round(deep_sizeof(loader) / MB, 3)
+    return fila
+
+
+def _run_stages(
+    fila: Dict,
+    app_mod,
+    ruta: str,
+    n_ips: int,
+    n_asignaturas: int,
+    rotaciones: int,
+    n_estudiantes: int,
+    ips_por_rotacion: int,
+    semestres: List[int],
+    modo_solver: str,
+    time_limit: float,
+    semilla: int,
+):
+    """Etapas de run_point; llena `fila` y devuelve (resultado, loader)."""
+    from src.core import DataLoader
+
+    info = _medir(
+        fila, "generacion", generar_plantilla_sintetica, ruta,
+        n_ips=n_ips, n_asignaturas=n_asignaturas, rotaciones_por_asignatura=rotaciones,
+        ips_por_rotacion=ips_por_rotacion, n_estudiantes=n_estudiantes,
+        semestres=semestres, semilla=semilla,
+    )
+    fila["filas_rotaciones"] = info["filas"]["06_Rotaciones"]
+
+    loader = DataLoader(ruta, info["set_id"], info["semestre_vigencia"])
+    _medir(fila, "carga", loader.load_all)
+    cache_etapas: Dict = {}
+    _medir(fila, "matriz_scores", app_mod._score_matrix_cached, loader, cache_etapas)
+
+    avisos = []
+    resultado = _medir(
+        fila, "optimizacion", app_mod.procesar_refinado,
+        loader, info["selecciones"], info["n_por_semestre"], info["semestre_vigencia"],
+        modo_solver=modo_solver, time_limit=time_limit, cache_etapas=cache_etapas,
+        avisar=lambda nivel, contenido=None: avisos.append((nivel, contenido)),
+    )
+    if resultado is None:
+        errores = [str(c) for nivel, c in avisos if nivel == "error"]
+        raise RuntimeError(errores[-1] if errores else "procesar_refinado no devolvió resultado")
+
+    reportes = {s: d["solve_report"] for s, d in resultado["por_semestre"].items()}
+    for fase in ("construccion", "fase1", "fase2"):
+        fila[f"t_{fase}"] = round(sum(r["tiempos"].get(fase, 0.0) for r in reportes.values()), 4)
+    fila["estados"] = ";".join(f"{s}:{r['estado']}" for s, r in sorted(reportes.items()))
+    fila["objetivo"] = round(float(resultado["obj_value"]), 4)
+    fila["grupos"] = int(resultado["n_grupos_total"])
+    fila["asignados"] = int(resultado["total_asignado"])
+
+    excel = _medir(fila, "exportacion", app_mod.generar_excel_refinado, resultado)
+    fila["bytes_excel"] = len(excel)
+    return resultado, loader
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline sobre plantillas sintéticas")
+    parser.add_argument("--ips", type=int, nargs="+", default=[30, 100])
+    parser.add_argument("--asignaturas", type=int, nargs="+", default=[2], help="Asignaturas por semestre")
+    parser.add_argument("--rotaciones", type=int, nargs="+", default=[2], help="Rotaciones por asignatura")
+    parser.add_argument("--estudiantes", type=int, nargs="+", default=[60], help="Demanda por semestre")
+    parser.add_argument("--ips-por-rotacion", type=int, default=6)
+    parser.add_argument("--semestres", type=int, nargs="+", default=[5, 7, 9])
+    parser.add_argument("--modo-solver", default="monolitico",
+                        choices=["monolitico", "descomposicion", "portafolio"])
+    parser.add_argument("--time-limit", type=float, default=30, help="Presupuesto por semestre (s)")
+    parser.add_argument("--repeticiones", type=int, default=1)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--perfil-memoria", action="store_true",
+                        help="Registrar picos de memoria por etapa y tamaños retenidos")
+    parser.add_argument("--salida", default=None,
+                        help="Archivo .json o .csv (por defecto data/outputs/benchmark_<fecha>.json)")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    # Antes de importar app aquí: el arranque se mide en un proceso limpio
+    importacion = import_report("app", top=5)
+    print(f"import app: {importacion['total_ms']:.0f} ms")
+    # app.py es el dueño del pipeline (scores, procesar_refinado, exportadores)
+    import app as app_mod
+
+    salida = args.salida or f"data/outputs/benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    os.makedirs(os.path.dirname(salida) or ".", exist_ok=True)
+
+    filas = []
+    grilla = list(itertools.product(args.ips, args.asignaturas, args.rotaciones, args.estudiantes))
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, (n_ips, n_asig, n_rot, n_est) in enumerate(grilla, 1):
+            for rep in range(args.repeticiones):
+                fila = {
+                    "ips": n_ips, "asignaturas": n_asig, "rotaciones": n_rot,
+                    "estudiantes": n_est, "ips_por_rotacion": args.ips_por_rotacion,
+                    "semestres": len(args.semestres), "repeticion": rep, "error": None,
+                }
+                t0 = time.perf_counter()
+                try:
+                    fila.update(run_point(
+                        app_mod, os.path.join(tmp, "plantilla.xlsx"), n_ips, n_asig, n_rot, n_est,
+                        args.ips_por_rotacion, args.semestres, args.modo_solver, args.time_limit,
+                        args.semilla + rep, args.perfil_memoria,
+                    ))
+                except Exception as e:
+                    fila["error"] = f"{type(e).__name__}: {e}"
+                fila["t_total"] = round(time.perf_counter() - t0, 4)
+                filas.append(fila)
+                print(
+                    f"[{i}/{len(grilla)}] ips={n_ips} asig={n_asig} rot={n_rot} est={n_est} "
+                    f"rep={rep}: {fila['t_total']:.2f}s "
+                    + (f"ERROR {fila['error']}" if fila["error"] else fila.get("estados", ""))
+                )
+
+    df = pd.DataFrame(filas)
+    if salida.endswith(".csv"):
+        df.to_csv(salida, index=False)
+    else:
+        meta = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pulp": pulp.__version__,
+            "cpus": os.cpu_count(),
+            "modo_solver": args.modo_solver,
+            "time_limit": args.time_limit,
+            "semestres": args.semestres,
+            "perfil_memoria": args.perfil_memoria,
+            "importacion": importacion,
+        }
+        with open(salida, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "resultados": filas}, f, indent=2, ensure_ascii=False)
+
+    columnas = [c for c in [
+        "ips", "asignaturas", "rotaciones", "estudiantes", "t_carga", "t_matriz_scores",
+        "t_optimizacion", "t_fase1", "t_fase2", "t_exportacion", "grupos",
+        "mb_optimizacion", "rss_max_mb", "mb_resultado", "error",
+    ] if c in df.columns]
+    print("\n" + df[columnas].to_string(index=False))
+    print(f"\n✅ Resultados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
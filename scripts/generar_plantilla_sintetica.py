@@ -0,0 +1,276 @@
+"""
+Genera plantillas V4 sintéticas (hojas 01–07) de tamaño configurable.
+
+Sirven para medir cómo escala el pipeline (carga, scores, modelo por grupos,
+exportación) más allá de las plantillas reales de data/. Las columnas son las
+de Plantilla_V4_Refinada.xlsx y los valores se sortean con una semilla fija,
+así que la misma configuración produce siempre el mismo libro.
+
+Uso:
+    python scripts/generar_plantilla_sintetica.py --ips 100 --asignaturas 4 \
+        --rotaciones 3 --estudiantes 120 --salida data/outputs/sintetica.xlsx
+"""
+
+import sys
+sys.path.insert(0, ".")
+
+import argparse
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+from scripts.parse_mapa_practica import get_group_constraints
+
+SET_ID = "SET-SINTETICO"
+
+# Criterios del set sintético (los mismos de los sets de generar_plantilla_v4.py)
+CRITERIOS = [
+    "Es_Hospital_Universitario",
+    "Escenario_Avalado_Practicas",
+    "Servicios_Pediatricos (0/1)",
+    "Servicios_Obstetricia (0/1)",
+    "MisionVisionProposito_AlineacionDocencia (1-5)",
+    "Admiten_Docentes_Externos (Sí/No)",
+    "Areas_Bienestar (0/1)",
+    "Areas_Academicas (0/1)",
+    "%_Contraprestacion_Matricula (0-100)",
+    "EPP_Exigidos (Sin exigencia/Parcial/Completo + detalle)",
+]
+
+_SERVICIOS = [
+    "Servicios_Ambulatorios_PyP (0/1)", "Servicios_Urgencias (0/1)",
+    "Servicios_Hospitalizacion (0/1)", "Servicios_Quirurgicos (0/1)", "Servicios_UCI (0/1)",
+    "Servicios_UCIN (0/1)", "Servicios_Pediatricos (0/1)", "Servicios_Obstetricia (0/1)",
+    "Procedimientos_Menores (0/1)",
+]
+
+
+def _si_no(rng: np.random.Generator, n: int, p: float = 0.5) -> list:
+    return ["Sí" if v else "No" for v in rng.random(n) < p]
+
+
+def generar_plantilla_sintetica(
+    salida: str,
+    n_ips: int = 30,
+    n_asignaturas: int = 2,
+    rotaciones_por_asignatura: int = 2,
+    ips_por_rotacion: int = 6,
+    n_estudiantes: int = 60,
+    semestres: Sequence[int] = (5, 7, 9),
+    cupo_min: int = 5,
+    cupo_max: int = 30,
+    semestre_vigencia: str = "2026-1",
+    semilla: int = 0,
+) -> Dict:
+    """Escribe en `salida` una plantilla V4 sintética.
+
+    Parameters:
+    -----------
+    n_ips : instituciones en 01_Oferta (y en 02–04)
+    n_asignaturas : asignaturas por semestre del plan
+    rotaciones_por_asignatura : rotaciones de cada asignatura
+    ips_por_rotacion : IPS con cupo en cada rotación (acotado por n_ips)
+    n_estudiantes : demanda de cada semestre en 07_Demanda_Semestres
+    semestres : semestres del plan (5–12, con los límites de grupo de
+        get_group_constraints)
+    cupo_min, cupo_max : rango de Cupo_Maximo por (rotación, IPS); si los
+        cupos de una rotación no alcanzan para n_estudiantes se amplían para
+        que el modelo sea factible
+    semilla : semilla del sorteo
+
+    Returns:
+    --------
+    Resumen del libro: set de ponderaciones, selecciones para
+    procesar_refinado, estudiantes por semestre y filas de cada hoja.
+    """
+    rng = np.random.default_rng(semilla)
+    ids = [str(7600100000 + i) for i in rng.choice(99999, size=n_ips, replace=False)]
+    nombres = [f"IPS SINTÉTICA {i + 1:04d}" for i in range(n_ips)]
+
+    oferta = pd.DataFrame({
+        "ID_Institucion": [int(j) for j in ids],
+        "Institucion": nombres,
+        "Naturaleza_Juridica": rng.choice(["Pública", "Privada", "Mixta"], n_ips),
+        "Nivel_de_Complejidad": rng.choice(["BAJA", "MEDIANA", "ALTA"], n_ips),
+        "Es_Hospital_Universitario": _si_no(rng, n_ips, 0.3),
+        "Escenario_Avalado_Practicas": _si_no(rng, n_ips, 0.7),
+        "Tipo_Estudiante": "Pregrado",
+        "Programas_Aceptados (separar por ;)": "Medicina",
+        **{c: rng.integers(0, 2, n_ips) for c in _SERVICIOS},
+        "Camas": rng.integers(0, 400, n_ips),
+        "Salas_Procedimientos": rng.integers(0, 20, n_ips),
+        "Consultorios": rng.integers(1, 60, n_ips),
+        "Quirofanos": rng.integers(0, 15, n_ips),
+        "Nro_Universidades_Comparten": rng.integers(0, 6, n_ips),
+        "Acceso_Transporte_Publico (1-5)": rng.integers(1, 6, n_ips),
+        "Estabilidad_Financiera (1-5)": rng.integers(1, 6, n_ips),
+        "Observaciones_Oferta": "",
+        "Fecha_Corte_Datos (YYYY-MM-DD)": "2025-12-01",
+    })
+
+    cupos = pd.DataFrame({
+        "ID_Institucion": oferta["ID_Institucion"],
+        "Institucion": nombres,
+        "Programa": "Medicina",
+        "Tipo_Estudiante (Pregrado/Posgrado)": "Pregrado",
+        "Semestre (AAAA-S)": semestre_vigencia,
+        "Cupo_Estimado_Semestral": rng.integers(cupo_min, cupo_max + 1, n_ips),
+        "Observaciones": "",
+    })
+
+    calidad = pd.DataFrame({
+        "ID_Institucion": oferta["ID_Institucion"],
+        "Institucion": nombres,
+        "MisionVisionProposito_AlineacionDocencia (1-5)": rng.integers(1, 6, n_ips),
+        "Admiten_Docentes_Externos (Sí/No)": _si_no(rng, n_ips),
+        "Condiciones_Externos": "",
+        "Evalua_Estudiantes_Profesores (0-5)": rng.integers(0, 6, n_ips),
+        "Periodicidad_Evaluacion": rng.choice(["Semestral", "Anual", "Por rotación"], n_ips),
+        "Areas_Bienestar (0/1)": rng.integers(0, 2, n_ips),
+        "Tipos_Bienestar (selección múltiple con ;)": "",
+        "Areas_Academicas (0/1)": rng.integers(0, 2, n_ips),
+        "Tipos_Academicos (selección múltiple con ;)": "",
+        "Vinculacion_Planta_Enfermeria_%": rng.integers(0, 101, n_ips),
+        "Vinculacion_Planta_Apoyo_%": rng.integers(0, 101, n_ips),
+        "Vinculacion_Planta_Medicos_%": rng.integers(0, 101, n_ips),
+        "Vinculacion_Planta_Especialistas_%": rng.integers(0, 101, n_ips),
+        "Observaciones_Calidad": "",
+        "Fecha_Corte_Datos (YYYY-MM-DD)": "2025-12-01",
+        "Fuente_Verificacion": "Sintética",
+        "Responsable_Captura": "",
+        "Ultima_Actualizacion (YYYY-MM-DD)": "2025-12-01",
+    })
+
+    costos = pd.DataFrame({
+        "ID_Institucion": oferta["ID_Institucion"],
+        "Institucion": nombres,
+        "Programa_Costo": "Medicina",
+        "Tipo_Estudiante_Costo": "Pregrado",
+        "Tipo_Practica_Costo": "Rotación pregrado",
+        "Semestre_Vigencia (AAAA-S)": semestre_vigencia,
+        "%_Contraprestacion_Matricula (0-100)": rng.integers(0, 31, n_ips),
+        "EPP_Exigidos (Sin exigencia/Parcial/Completo + detalle)": rng.choice(
+            ["Sin exigencia", "Parcial", "Completo"], n_ips
+        ),
+        "Cobro_EPP (No cobra/Cobra a la Universidad)": rng.choice(
+            ["No cobra EPP", "Cobra EPP a la Universidad"], n_ips, p=[0.8, 0.2]
+        ),
+        "Observaciones_Costo": "",
+        "Fecha_Corte_Datos (YYYY-MM-DD)": "2025-12-01",
+    })
+
+    # Pesos iguales que suman exactamente 1
+    pesos = [round(1.0 / len(CRITERIOS), 6)] * len(CRITERIOS)
+    pesos[-1] = round(1.0 - sum(pesos[:-1]), 6)
+    ponderaciones = pd.DataFrame([
+        {
+            "Set_ID": SET_ID,
+            "Nombre_Set": "Set sintético (pesos iguales)",
+            "Semestre_Vigencia (AAAA-S)": semestre_vigencia,
+            "Programa (o GLOBAL)": "Medicina",
+            "Tipo_Estudiante (opcional)": "Pregrado",
+            "Tipo_Practica (opcional)": "",
+            "Criterio_Codigo": criterio,
+            "Tipo (Beneficio/Costo)": (
+                "Costo" if "Contraprestacion" in criterio or "EPP_Exigidos" in criterio else "Beneficio"
+            ),
+            "Peso (0-1)": peso,
+            "Activo (0/1)": 1.0,
+            "Notas": "",
+            "Suma_Pesos_Activos_del_Set (auto)": "",
+        }
+        for criterio, peso in zip(CRITERIOS, pesos)
+    ])
+
+    por_ips = min(ips_por_rotacion, n_ips)
+    filas_rot = []
+    selecciones = []
+    demanda = []
+    for sem in semestres:
+        lim = get_group_constraints(sem)
+        demanda.append({
+            "Semestre_Plan": sem, "Programa": "Medicina", "Tipo_Estudiante": "Pregrado",
+            "Demanda_Estudiantes": n_estudiantes, "Grupo_Min": lim["min"],
+            "Grupo_Max": lim["max"], "Techo_Max": max(75, n_estudiantes), "Observaciones": "",
+        })
+        for a in range(n_asignaturas):
+            asignatura = f"Asignatura S{sem}-{a + 1:02d}"
+            selecciones.append({"semestre": sem, "asignatura": asignatura, "set_id": SET_ID})
+            for r in range(rotaciones_por_asignatura):
+                elegidas = rng.choice(n_ips, size=por_ips, replace=False)
+                cupo = rng.integers(max(cupo_min, lim["max"]), max(cupo_min, lim["max"], cupo_max) + 1, por_ips)
+                # Holgura para que la rotación pueda alojar a toda la demanda en grupos
+                faltante = int(np.ceil(n_estudiantes * 1.25)) - int(cupo.sum())
+                if faltante > 0:
+                    cupo = cupo + int(np.ceil(faltante / por_ips))
+                for k, c in zip(elegidas, cupo):
+                    filas_rot.append({
+                        "Semestre_Plan": sem,
+                        "Asignatura": asignatura,
+                        "Rotacion": f"Práctica {r + 1}",
+                        "ID_Institucion": int(ids[k]),
+                        "Institucion": nombres[k],
+                        "Sede": "Sede principal",
+                        "Cupo_Maximo": int(c),
+                    })
+    rotaciones = pd.DataFrame(filas_rot)
+    demanda = pd.DataFrame(demanda)
+
+    with pd.ExcelWriter(salida, engine="openpyxl") as writer:
+        oferta.to_excel(writer, sheet_name="01_Oferta", index=False)
+        cupos.to_excel(writer, sheet_name="02_Oferta_x_Programa", index=False)
+        calidad.to_excel(writer, sheet_name="03_Calidad", index=False)
+        costos.to_excel(writer, sheet_name="04_Costo_del_Sitio", index=False)
+        ponderaciones.to_excel(writer, sheet_name="05_Ponderaciones", index=False, startrow=4)
+        rotaciones.to_excel(writer, sheet_name="06_Rotaciones", index=False)
+        demanda.to_excel(writer, sheet_name="07_Demanda_Semestres", index=False)
+
+    return {
+        "salida": salida,
+        "set_id": SET_ID,
+        "semestre_vigencia": semestre_vigencia,
+        "selecciones": selecciones,
+        "n_por_semestre": {int(s): n_estudiantes for s in semestres},
+        "filas": {
+            "01_Oferta": len(oferta),
+            "05_Ponderaciones": len(ponderaciones),
+            "06_Rotaciones": len(rotaciones),
+            "07_Demanda_Semestres": len(demanda),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera una plantilla V4 sintética")
+    parser.add_argument("--ips", type=int, default=30)
+    parser.add_argument("--asignaturas", type=int, default=2, help="Asignaturas por semestre")
+    parser.add_argument("--rotaciones", type=int, default=2, help="Rotaciones por asignatura")
+    parser.add_argument("--ips-por-rotacion", type=int, default=6)
+    parser.add_argument("--estudiantes", type=int, default=60, help="Demanda por semestre")
+    parser.add_argument("--semestres", type=int, nargs="+", default=[5, 7, 9])
+    parser.add_argument("--cupo-min", type=int, default=5)
+    parser.add_argument("--cupo-max", type=int, default=30)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", default="data/outputs/Plantilla_V4_Sintetica.xlsx")
+    args = parser.parse_args()
+
+    info = generar_plantilla_sintetica(
+        args.salida,
+        n_ips=args.ips,
+        n_asignaturas=args.asignaturas,
+        rotaciones_por_asignatura=args.rotaciones,
+        ips_por_rotacion=args.ips_por_rotacion,
+        n_estudiantes=args.estudiantes,
+        semestres=args.semestres,
+        cupo_min=args.cupo_min,
+        cupo_max=args.cupo_max,
+        semilla=args.semilla,
+    )
+    print(f"✅ Archivo generado: {info['salida']}")
+    for hoja, n in info["filas"].items():
+        print(f"  {hoja}: {n} filas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Regresiones de tiempo y de resultado de GroupOptimizer contra una línea base.
+
+Corre un corpus fijo de instancias (semestres de Plantilla_V4_Refinada.xlsx y
+plantillas sintéticas de generar_plantilla_sintetica con semilla fija), mide
+construcción, fase 1, fase 2 y total del modelo, y el objetivo y los grupos
+del plan, y los compara con data/baselines/regresion_solver.json.
+
+Se marca regresión cuando:
+  - un tiempo supera la base en más de --umbral (relativo) y en más de
+    --piso-segundos (absoluto, para no reaccionar al ruido de instancias de
+    milisegundos);
+  - cambia el estado, el objetivo (más allá de 1e-6 relativo) o el número de
+    grupos: en instancias que se resuelven al óptimo eso indica un cambio de
+    formulación, no de rendimiento.
+
+Los tiempos de la base dependen de la máquina: regenerarla (--actualizar) en
+la misma máquina donde se compara. Sale con código 1 si hay regresiones.
+
+Uso:
+    python scripts/regresion_solver.py                 # comparar
+    python scripts/regresion_solver.py --actualizar    # reescribir la base
+"""
+
+import sys
+sys.path.insert(0, ".")
+
+import os
+import json
+import logging
+import argparse
+import platform
+import statistics
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pulp
+
+from src.core import DataLoader
+from src.core.optimizer import GroupOptimizer
+from scripts.parse_mapa_practica import get_group_constraints
+from scripts.generar_plantilla_sintetica import generar_plantilla_sintetica, SET_ID as SET_SINTETICO
+
+BASELINE = "data/baselines/regresion_solver.json"
+PLANTILLA_V4 = "data/Plantilla_V4_Refinada.xlsx"
+
+# Todas se resuelven al óptimo en pocos segundos; así los tiempos miden la
+# formulación y no el límite de tiempo
+CORPUS: List[Dict] = [
+    {"nombre": "v4-s5-salud-publica", "plantilla": PLANTILLA_V4, "set_id": "SET-SEM5-SaludPublica",
+     "semestre": 5, "asignaturas": ["Salud Pública III"], "estudiantes": 40},
+    {"nombre": "v4-s6-medicina-interna", "plantilla": PLANTILLA_V4, "set_id": "SET-SEM6-Psiquiatria",
+     "semestre": 6, "asignaturas": ["Medicina Interna I"], "estudiantes": 30},
+    {"nombre": "v4-s7-medicina-interna", "plantilla": PLANTILLA_V4, "set_id": "SET-SEM7-MedicinaInterna",
+     "semestre": 7, "asignaturas": ["Medicina Interna II"], "estudiantes": 24},
+    {"nombre": "v4-s8-pediatria", "plantilla": PLANTILLA_V4, "set_id": "SET-SEM8-Pediatria",
+     "semestre": 8, "asignaturas": ["Pediatría"], "estudiantes": 28},
+    {"nombre": "v4-s9-anestesia", "plantilla": PLANTILLA_V4, "set_id": "SET-SEM9-Gineco",
+     "semestre": 9, "asignaturas": ["Anestesia"], "estudiantes": 57},
+    {"nombre": "v4-s9-anestesia-gineco", "plantilla": PLANTILLA_V4, "set_id": "SET-SEM9-Gineco",
+     "semestre": 9, "asignaturas": ["Anestesia", "Ginecobstetricia"], "estudiantes": 30},
+    {"nombre": "v4-s10-completo", "plantilla": PLANTILLA_V4, "set_id": "SET-SEM10-Cirugia",
+     "semestre": 10, "asignaturas": None, "estudiantes": 36},
+    {"nombre": "sint-12ips-s5", "semestre": 5, "estudiantes": 20,
+     "sintetica": {"n_ips": 12, "n_asignaturas": 1, "rotaciones_por_asignatura": 1,
+                   "ips_por_rotacion": 4, "n_estudiantes": 20, "semestres": [5]}},
+    {"nombre": "sint-20ips-2rot-s5", "semestre": 5, "estudiantes": 24,
+     "sintetica": {"n_ips": 20, "n_asignaturas": 1, "rotaciones_por_asignatura": 2,
+                   "ips_por_rotacion": 4, "n_estudiantes": 24, "semestres": [5, 9]}},
+    {"nombre": "sint-20ips-2rot-s9", "semestre": 9, "estudiantes": 24,
+     "sintetica": {"n_ips": 20, "n_asignaturas": 1, "rotaciones_por_asignatura": 2,
+                   "ips_por_rotacion": 4, "n_estudiantes": 24, "semestres": [5, 9]}},
+]
+
+TIEMPOS = ("construccion", "fase1", "fase2", "total")
+
+
+def _cargar(ruta: str, set_id: str, cargadas: Dict) -> Dict:
+    """Loader y matriz de scores de una plantilla, una sola vez por corrida."""
+    import app
+
+    if ruta not in cargadas:
+        loader = DataLoader(ruta, set_id, "2026-1")
+        loader.load_all()
+        cargadas[ruta] = {"loader": loader, "S": app._prepare_score_matrix(loader)}
+    return cargadas[ruta]
+
+
+def build_instance(caso: Dict, cargadas: Dict, tmp: str) -> Dict:
+    """Argumentos de GroupOptimizer.optimize para un caso del corpus."""
+    import app
+
+    if "sintetica" in caso:
+        cfg = caso["sintetica"]
+        ruta = os.path.join(tmp, "sint_" + "_".join(f"{k}{v}" for k, v in sorted(cfg.items())) + ".xlsx")
+        if not os.path.exists(ruta):
+            generar_plantilla_sintetica(ruta, **cfg)
+        set_id = SET_SINTETICO
+    else:
+        ruta, set_id = caso["plantilla"], caso["set_id"]
+    datos = _cargar(ruta, set_id, cargadas)
+    loader, S = datos["loader"], datos["S"]
+
+    sem = caso["semestre"]
+    asigs = caso.get("asignaturas") or loader.get_asignaturas_por_semestre(sem)
+    cap_dict = loader.get_rotaciones_dict(sem, asigs)
+    ips = {j for (_, _, j) in cap_dict}
+    scores_ips = app._scores_for_set(loader, S, app._weights_norm_for_set(loader, set_id), ips)
+    lim = get_group_constraints(sem)
+    return dict(
+        scores={(a, j): scores_ips.get(j, 0.0) for a in asigs for j in ips},
+        cap_dict=cap_dict,
+        asignaturas_rotaciones=loader.get_asignaturas_rotaciones(sem, asigs),
+        n_estudiantes=caso["estudiantes"],
+        min_group=lim["min"],
+        max_group=lim["max"],
+    )
+
+
+def measure(kwargs: Dict, repeticiones: int, time_limit: float) -> Dict:
+    """Mediana de los tiempos de `repeticiones` corridas, con objetivo y grupos de la última."""
+    tiempos = {t: [] for t in TIEMPOS}
+    for _ in range(repeticiones):
+        opt = GroupOptimizer(verbose=False)
+        res = opt.optimize(**kwargs, time_limit=time_limit)
+        rep = opt.get_solve_report() or {}
+        for t in TIEMPOS:
+            tiempos[t].append(float(rep.get("tiempos", {}).get(t, 0.0)))
+    objetivo = opt.get_objective_value()
+    return {
+        **{f"t_{t}": round(statistics.median(v), 4) for t, v in tiempos.items()},
+        "estado": rep.get("estado"),
+        "objetivo": round(float(objetivo), 6) if objetivo is not None else None,
+        "grupos": int(res["Grupo"].nunique()) if res is not None and not res.empty else 0,
+        "nodos": (rep.get("fases", {}).get("fase1") or {}).get("nodos"),
+    }
+
+
+def compare(actual: Dict, base: Optional[Dict], umbral: float, piso: float) -> List[str]:
+    """Regresiones de `actual` respecto de `base` (lista vacía si no hay)."""
+    if base is None:
+        return []
+    problemas = []
+    if actual["estado"] != base["estado"]:
+        problemas.append(f"estado {base['estado']} → {actual['estado']}")
+    if base["objetivo"] is not None and actual["objetivo"] is not None:
+        if abs(actual["objetivo"] - base["objetivo"]) > 1e-6 * max(1.0, abs(base["objetivo"])):
+            problemas.append(f"objetivo {base['objetivo']} → {actual['objetivo']}")
+    elif base["objetivo"] != actual["objetivo"]:
+        problemas.append(f"objetivo {base['objetivo']} → {actual['objetivo']}")
+    if actual["grupos"] != base["grupos"]:
+        problemas.append(f"grupos {base['grupos']} → {actual['grupos']}")
+    for t in TIEMPOS:
+        b, a = base.get(f"t_{t}", 0.0), actual[f"t_{t}"]
+        if a > b * (1 + umbral) and a - b > piso:
+            problemas.append(f"{t} {b:.3f}s → {a:.3f}s (+{(a / b - 1) * 100 if b else float('inf'):.0f}%)")
+    return problemas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regresiones de GroupOptimizer contra la línea base")
+    parser.add_argument("--actualizar", action="store_true", help="Reescribir la línea base con esta corrida")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--umbral", type=float, default=0.5,
+                        help="Aumento relativo de tiempo tolerado (0.5 = +50%%)")
+    parser.add_argument("--piso-segundos", type=float, default=0.25,
+                        help="Aumento absoluto mínimo para contar como regresión")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--time-limit", type=float, default=60)
+    parser.add_argument("--solo", nargs="+", default=None, help="Casos del corpus a correr")
+    parser.add_argument("--salida", default=None, help="Reporte JSON de esta corrida")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    base_casos: Dict = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            base_casos = json.load(f).get("casos", {})
+    elif not args.actualizar:
+        print(f"⚠ No hay línea base en {args.baseline}; correr con --actualizar para crearla")
+
+    corpus = [c for c in CORPUS if not args.solo or c["nombre"] in args.solo]
+    filas = []
+    cargadas: Dict = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for caso in corpus:
+            actual = measure(build_instance(caso, cargadas, tmp), args.repeticiones, args.time_limit)
+            problemas = [] if args.actualizar else compare(
+                actual, base_casos.get(caso["nombre"]), args.umbral, args.piso_segundos
+            )
+            filas.append({"caso": caso["nombre"], **actual, "regresiones": problemas})
+            marca = "❌" if problemas else "✓"
+            print(
+                f"{marca} {caso['nombre']}: {actual['estado']} obj={actual['objetivo']} "
+                f"grupos={actual['grupos']} total={actual['t_total']:.3f}s"
+                + (f" | {'; '.join(problemas)}" if problemas else "")
+            )
+
+    meta = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pulp": pulp.__version__,
+        "cpus": os.cpu_count(),
+        "repeticiones": args.repeticiones,
+    }
+    if args.actualizar:
+        casos = dict(base_casos)
+        casos.update({
+            f["caso"]: {k: v for k, v in f.items() if k not in ("caso", "regresiones")} for f in filas
+        })
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "casos": casos}, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ Línea base actualizada: {args.baseline} ({len(filas)} casos)")
+        return
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "umbral": args.umbral, "resultados": filas}, f, indent=2, ensure_ascii=False)
+
+    n_reg = sum(1 for f in filas if f["regresiones"])
+    sin_base = [f["caso"] for f in filas if f["caso"] not in base_casos]
+    if sin_base:
+        print(f"\nℹ Casos sin línea base: {', '.join(sin_base)}")
+    if n_reg:
+        print(f"\n❌ {n_reg} caso(s) con regresiones (umbral +{args.umbral:.0%}, piso {args.piso_segundos}s)")
+        sys.exit(1)
+    print(f"\n✅ Sin regresiones en {len(filas)} casos")
+
+
+if __name__ == "__main__":
+    main()
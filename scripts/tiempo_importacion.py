@@ -0,0 +1,144 @@
+"""
+Tiempo de importación de la app (arranque en frío).
+
+Corre `python -X importtime -c "import <modulo>"` en un proceso nuevo y
+resume la salida: total, módulos de primer nivel más caros (tiempo acumulado)
+y módulos más caros por sí mismos. Falla (código 1) si el código del proyecto
+(app, src, scripts) importa directamente alguno de los módulos que deben
+cargarse en diferido:
+
+    pulp       optimizadores (src/core/optimizer.py, solve_report.solve_cbc)
+    plotly     gráficos (src/visualization, helpers de figuras de app.py)
+    openpyxl   exportadores a Excel
+
+Que un tercero los cargue no cuenta (streamlit importa plotly.graph_objects
+para st.plotly_chart). Streamlit y pandas se importan siempre y son la mayor
+parte del arranque que queda; este script vigila que no vuelva a crecer por
+lo demás.
+
+Uso:
+    python scripts/tiempo_importacion.py
+    python scripts/tiempo_importacion.py --modulo src.core --top 15 --salida tiempos.json
+"""
+
+import sys
+sys.path.insert(0, ".")
+
+import os
+import re
+import json
+import argparse
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+DIFERIDOS = ("pulp", "plotly", "openpyxl")
+PROYECTO = ("app", "src", "scripts")
+
+_LINEA = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+
+def parse_importtime(texto: str) -> List[Dict]:
+    """Filas de `-X importtime`: {"modulo", "propio_ms", "acumulado_ms", "nivel", "padre"}.
+
+    La salida lista cada módulo después de sus dependencias, con una sangría
+    por nivel; el padre de una fila es la siguiente fila de nivel menor.
+    """
+    filas = []
+    for linea in texto.splitlines():
+        m = _LINEA.match(linea)
+        if m:
+            filas.append({
+                "modulo": m.group(4),
+                "propio_ms": int(m.group(1)) / 1000,
+                "acumulado_ms": int(m.group(2)) / 1000,
+                "nivel": (len(m.group(3)) - 1) // 2,
+                "padre": None,
+            })
+    pendientes: List[Tuple[int, Dict]] = []
+    for fila in filas:
+        while pendientes and pendientes[-1][0] > fila["nivel"]:
+            pendientes.pop()[1]["padre"] = fila["modulo"]
+        pendientes.append((fila["nivel"], fila))
+    return filas
+
+
+def _cadena(fila: Dict, por_nombre: Dict[str, Dict]) -> str:
+    """Ruta de importación de `fila` hasta el módulo raíz, p. ej. "app > src.core > pulp"."""
+    ruta = [fila["modulo"]]
+    while fila["padre"] is not None and len(ruta) < 20:
+        fila = por_nombre[fila["padre"]]
+        ruta.append(fila["modulo"])
+    return " > ".join(reversed(ruta))
+
+
+def import_report(modulo: str = "app", top: int = 10, python: Optional[str] = None) -> Dict:
+    """Importa `modulo` en un proceso nuevo y resume los tiempos.
+
+    Devuelve {"modulo", "total_ms", "top_acumulado", "top_propio", "diferidos"},
+    donde "diferidos" lista los módulos de DIFERIDOS que importa el proyecto
+    y por qué cadena de imports.
+    """
+    proc = subprocess.run(
+        [python or sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True, text=True, cwd=os.getcwd(),
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}:\n{proc.stderr[-2000:]}")
+    filas = parse_importtime(proc.stderr)
+    por_nombre = {f["modulo"]: f for f in filas}
+    raiz = por_nombre.get(modulo)
+
+    primer_nivel = [f for f in filas if f["nivel"] == 1 and f["padre"] == modulo]
+    resumen = lambda f: {"modulo": f["modulo"], "ms": round(f["acumulado_ms"], 1)}
+    return {
+        "modulo": modulo,
+        "total_ms": round(raiz["acumulado_ms"], 1) if raiz else None,
+        "top_acumulado": [resumen(f) for f in sorted(primer_nivel, key=lambda f: -f["acumulado_ms"])[:top]],
+        "top_propio": [
+            {"modulo": f["modulo"], "ms": round(f["propio_ms"], 1)}
+            for f in sorted(filas, key=lambda f: -f["propio_ms"])[:top]
+        ],
+        "diferidos": [
+            {"modulo": f["modulo"], "ms": round(f["acumulado_ms"], 1), "cadena": _cadena(f, por_nombre)}
+            for f in filas
+            if f["modulo"].split(".")[0] in DIFERIDOS
+            and f["padre"] is not None and f["padre"].split(".")[0] in PROYECTO
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de importación de la app")
+    parser.add_argument("--modulo", default="app", help="Módulo a importar (por defecto app)")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--repeticiones", type=int, default=3,
+                        help="Se reporta la corrida de menor total (la primera calienta el disco)")
+    parser.add_argument("--salida", default=None, help="Reporte JSON")
+    args = parser.parse_args()
+
+    reportes = [import_report(args.modulo, args.top) for _ in range(max(args.repeticiones, 1))]
+    rep = min(reportes, key=lambda r: r["total_ms"] or float("inf"))
+
+    print(f"import {rep['modulo']}: {rep['total_ms']:.0f} ms (mejor de {len(reportes)})\n")
+    print("Acumulado por import directo:")
+    for f in rep["top_acumulado"]:
+        print(f"  {f['ms']:8.1f} ms  {f['modulo']}")
+    print("\nPropio (sin dependencias):")
+    for f in rep["top_propio"]:
+        print(f"  {f['ms']:8.1f} ms  {f['modulo']}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(rep, f, indent=2, ensure_ascii=False)
+
+    if rep["diferidos"]:
+        print("\n❌ Módulos que deberían cargarse en diferido:")
+        for f in rep["diferidos"]:
+            print(f"  {f['modulo']} ({f['ms']:.0f} ms): {f['cadena']}")
+        sys.exit(1)
+    print(f"\n✅ El proyecto no importa {', '.join(DIFERIDOS)} al arrancar")
+
+
+if __name__ == "__main__":
+    main()
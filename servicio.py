@@ -0,0 +1,283 @@
+"""
+Servicio local de optimización (HTTP/JSON)
+
+Centraliza las corridas de todas las sesiones en una sola cola con un pool
+acotado de procesos, en vez de que cada sesión de Streamlit lance sus
+propios CBC. La app lo usa como cliente si se define la variable de entorno
+OPTIMIZACION_SERVICIO_URL (p. ej. http://localhost:8600).
+
+Uso:
+    python servicio.py --puerto 8600 --trabajos 2 --cpus-por-trabajo 1
+
+Endpoints:
+    GET    /salud                        estado del pool de trabajos
+    POST   /plantillas?set_id=&semestre=  cuerpo: el .xlsx; devuelve plantilla_id,
+                                          sets, semestres del plan y huellas de hojas
+    POST   /plantillas/<id>/scores       {"set_id"} -> {"scores": {ID_Institucion: score}}
+    POST   /trabajos                     {"plantilla_id", "modo": "refinado" | "agregado",
+                                          "params"} -> 202 {"trabajo_id"}
+    GET    /trabajos/<id>                estado, avisos, parciales y, al completar, resultado
+    GET    /trabajos/<id>/diferido?ruta=a&ruta=b
+                                          {"valor"}: un valor pendiente del resultado
+    DELETE /trabajos/<id>                cancela el trabajo
+
+Los resultados se codifican con src/utils/codec.py (DataFrames y claves tupla).
+Los diferidos de un LazyDict (tablas de debug) no se calculan al enviar el
+resultado: viajan como marcas y el cliente los pide a /diferido cuando los usa.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, List, Optional
+
+import app
+from src.core import DataLoader
+from src.core.jobs import JobRunner, COMPLETADO, TERMINADOS
+from src.core.solve_report import prune_solver_logs
+from src.utils.codec import to_jsonable
+
+logger = logging.getLogger("servicio")
+
+# Plantillas cargadas que se conservan en memoria (las más recientes)
+MAX_PLANTILLAS = 20
+
+
+class Servicio:
+    """Estado del servicio: plantillas cargadas, sus memos y la cola de trabajos."""
+
+    def __init__(self, runner: JobRunner):
+        self.runner = runner
+        self.plantillas: Dict[str, Dict] = {}
+        self._plantilla_de: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def load_template(self, contenido: bytes, set_id: str, semestre: str) -> Dict:
+        """Carga una plantilla (o reutiliza la misma ya cargada) y resume su contenido."""
+        plantilla_id = hashlib.sha1(
+            contenido + f"|{set_id}|{semestre}".encode("utf-8")
+        ).hexdigest()[:16]
+        with self._lock:
+            entrada = self.plantillas.get(plantilla_id)
+        if entrada is None:
+            fd, ruta = tempfile.mkstemp(suffix=".xlsx")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(contenido)
+                loader = DataLoader(ruta, set_id, semestre)
+                loader.load_all()
+            finally:
+                os.remove(ruta)
+            entrada = {"loader": loader, "cache": {}, "cache_etapas": {}}
+            with self._lock:
+                self.plantillas[plantilla_id] = entrada
+                while len(self.plantillas) > MAX_PLANTILLAS:
+                    self._drop_template(next(iter(self.plantillas)))
+        loader = entrada["loader"]
+        return {
+            "plantilla_id": plantilla_id,
+            "sets": loader.get_available_set_ids(),
+            "semestres_plan": loader.get_available_semestres(),
+            "huellas": loader.huellas,
+        }
+
+    def _drop_template(self, plantilla_id: str) -> None:
+        """Descarta una plantilla y los trabajos que aún le devolverían memos (con _lock tomado)."""
+        del self.plantillas[plantilla_id]
+        for job_id in [j for j, p in self._plantilla_de.items() if p == plantilla_id]:
+            del self._plantilla_de[job_id]
+
+    def _template(self, plantilla_id: str) -> Dict:
+        entrada = self.plantillas.get(plantilla_id)
+        if entrada is None:
+            raise KeyError(f"Plantilla no cargada: {plantilla_id}")
+        return entrada
+
+    def scores(self, plantilla_id: str, set_id: str) -> Dict:
+        """Score de cada IPS de 01_Oferta con los pesos del set."""
+        entrada = self._template(plantilla_id)
+        loader = entrada["loader"]
+        S = app._score_matrix_cached(loader, entrada["cache_etapas"])
+        ips = set(loader.oferta["ID_Institucion"].dropna().astype(str))
+        return {"scores": app._scores_for_set(loader, S, app._weights_norm_for_set(loader, set_id), ips)}
+
+    def submit(self, plantilla_id: str, modo: str, params: Dict) -> str:
+        """Encola una optimización refinada o agregada sobre una plantilla cargada."""
+        entrada = self._template(plantilla_id)
+        if modo == "refinado":
+            # JSON solo admite claves str
+            params = dict(params, n_por_semestre={
+                int(k): v for k, v in params.get("n_por_semestre", {}).items()
+            })
+        elif modo != "agregado":
+            raise ValueError(f"Modo no reconocido: {modo}")
+        # Con el lock tomado, job() no puede ver el trabajo terminado antes del registro
+        with self._lock:
+            job_id = self.runner.submit(
+                app._trabajo_optimizacion,
+                modo, entrada["loader"], params, entrada["cache"], entrada["cache_etapas"],
+            )
+            self._plantilla_de[job_id] = plantilla_id
+        return job_id
+
+    def job(self, job_id: str) -> Optional[Dict]:
+        """Estado del trabajo listo para JSON.
+
+        La primera consulta tras completarse pasa sus memos a la plantilla; las
+        siguientes no los tocan (otro trabajo posterior pudo haberlos renovado).
+        """
+        job = self.runner.get(job_id)
+        if job is None:
+            return None
+        estado = job["estado"]
+        out = {
+            "trabajo_id": job_id,
+            "estado": estado,
+            "error": job["error"],
+            "creado": job["creado"],
+            "inicio": job["inicio"],
+            "fin": job["fin"],
+            "avisos": [[nivel, to_jsonable(c)] for nivel, c in job["avisos"] if nivel != "semestre"],
+            "parciales": to_jsonable(job["parciales"]),
+            "resultado": None,
+        }
+        if estado in TERMINADOS:
+            # Un trabajo con error o cancelado no devuelve memos, pero deja de esperarlos
+            with self._lock:
+                plantilla_id = self._plantilla_de.pop(job_id, None)
+                entrada = self.plantillas.get(plantilla_id) if plantilla_id else None
+                if entrada is not None and estado == COMPLETADO:
+                    salida = job["resultado"]
+                    entrada["cache"], entrada["cache_etapas"] = salida["cache"], salida["cache_etapas"]
+        if estado == COMPLETADO:
+            salida = job["resultado"]
+            # Los memos se quedan en el servicio
+            out["resultado"] = to_jsonable(dict(salida, cache={}, cache_etapas={}), ruta=[])
+        return out
+
+    def deferred(self, job_id: str, ruta: List[str]) -> Dict:
+        """Evalúa el valor pendiente en `ruta` del resultado de un trabajo completado."""
+        job = self.runner.get(job_id)
+        if job is None or job["estado"] != COMPLETADO:
+            raise KeyError(f"Trabajo sin resultado: {job_id}")
+        if not ruta or ruta[0] in ("cache", "cache_etapas"):
+            raise ValueError(f"Ruta no válida: {ruta}")
+        valor = job["resultado"]
+        for clave in ruta:
+            if not isinstance(valor, dict):
+                raise KeyError(f"Ruta inexistente: {'/'.join(ruta)}")
+            valor = valor[clave]
+        return {"valor": to_jsonable(valor)}
+
+
+def make_handler(servicio: Servicio):
+    """Manejador HTTP ligado a `servicio`."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _responder(self, codigo: int, cuerpo: Dict) -> None:
+            datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+            self.send_response(codigo)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def _cuerpo(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def _json(self) -> Dict:
+            cuerpo = self._cuerpo()
+            return json.loads(cuerpo) if cuerpo else {}
+
+        def _atender(self, metodo: str) -> None:
+            url = urlparse(self.path)
+            partes = [p for p in url.path.split("/") if p]
+            try:
+                if metodo == "GET" and partes == ["salud"]:
+                    self._responder(200, {"estado": "ok", **servicio.runner.stats()})
+                elif metodo == "POST" and partes == ["plantillas"]:
+                    q = parse_qs(url.query)
+                    self._responder(200, servicio.load_template(
+                        self._cuerpo(),
+                        q.get("set_id", ["SET001"])[0],
+                        q.get("semestre", ["2026-1"])[0],
+                    ))
+                elif metodo == "POST" and len(partes) == 3 and partes[0] == "plantillas" and partes[2] == "scores":
+                    self._responder(200, servicio.scores(partes[1], self._json()["set_id"]))
+                elif metodo == "POST" and partes == ["trabajos"]:
+                    cuerpo = self._json()
+                    job_id = servicio.submit(cuerpo["plantilla_id"], cuerpo["modo"], cuerpo.get("params", {}))
+                    self._responder(202, {"trabajo_id": job_id})
+                elif metodo == "GET" and len(partes) == 3 and partes[0] == "trabajos" and partes[2] == "diferido":
+                    self._responder(200, servicio.deferred(partes[1], parse_qs(url.query).get("ruta", [])))
+                elif len(partes) == 2 and partes[0] == "trabajos" and metodo in ("GET", "DELETE"):
+                    if metodo == "DELETE":
+                        if servicio.runner.get(partes[1]) is None:
+                            raise KeyError(f"Trabajo inexistente: {partes[1]}")
+                        self._responder(200, {"cancelado": servicio.runner.cancel(partes[1])})
+                        return
+                    job = servicio.job(partes[1])
+                    if job is None:
+                        raise KeyError(f"Trabajo inexistente: {partes[1]}")
+                    self._responder(200, job)
+                else:
+                    self._responder(404, {"error": f"Ruta no encontrada: {metodo} {url.path}"})
+            except KeyError as e:
+                self._responder(404, {"error": str(e).strip("'\"")})
+            except (ValueError, json.JSONDecodeError) as e:
+                self._responder(400, {"error": str(e)})
+            except Exception as e:
+                logger.exception("Error atendiendo la solicitud")
+                self._responder(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def do_GET(self):
+            self._atender("GET")
+
+        def do_POST(self):
+            self._atender("POST")
+
+        def do_DELETE(self):
+            self._atender("DELETE")
+
+        def log_message(self, formato, *args):
+            logger.info("%s - %s", self.address_string(), formato % args)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio local de optimización (HTTP/JSON)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8600)
+    parser.add_argument("--trabajos", type=int, default=2, help="Optimizaciones simultáneas")
+    parser.add_argument("--cpus-por-trabajo", type=int, default=None,
+                        help="Núcleos asignados a cada trabajo (afinidad de CPU)")
+    parser.add_argument("--cpu-segundos", type=int, default=None,
+                        help="Tiempo de CPU máximo por proceso de un trabajo")
+    args = parser.parse_args()
+
+    prune_solver_logs()
+    runner = JobRunner(
+        max_workers=args.trabajos,
+        cpus_por_trabajo=args.cpus_por_trabajo,
+        cpu_segundos=args.cpu_segundos,
+    )
+    servidor = ThreadingHTTPServer((args.host, args.puerto), make_handler(Servicio(runner)))
+    logger.info(f"Servicio de optimización en http://{args.host}:{args.puerto} | {runner.stats()}")
+    print(f"Servicio de optimización en http://{args.host}:{args.puerto}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,14 @@ Módulo principal: Corazón del modelo de optimización
 """
 
 from .data_loader import DataLoader
-from .optimizer import Optimizer, GroupOptimizer
 from .calculator import ScoreCalculator
 
 __all__ = ["DataLoader", "Optimizer", "GroupOptimizer", "ScoreCalculator"]
+
+
+def __getattr__(nombre):
+    # Los optimizadores cargan PuLP: se importan recién al pedirlos
+    if nombre in ("Optimizer", "GroupOptimizer"):
+        from . import optimizer
+        return getattr(optimizer, nombre)
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
@@ -7,6 +7,8 @@ import numpy as np
 from typing import Dict, Tuple
 import logging
 
+from ..utils.timing import timed
+
 logger = logging.getLogger(__name__)
 
 
@@ -45,6 +47,7 @@ class ScoreCalculator:
         return (series - mn) / (mx - mn)
     
     @classmethod
+    @timed("normalizar_criterios")
     def normalize_criteria(cls, base_df: pd.DataFrame) -> pd.DataFrame:
         """Normaliza todos los criterios en el dataframe"""
         S = base_df.set_index("ID_Institucion").copy()
@@ -2,15 +2,35 @@
 Cargador de datos desde plantilla Excel
 """
 
+import hashlib
 import pandas as pd
 import numpy as np
-from typing import Dict, Tuple, Optional, List
+from typing import Dict, Tuple, Optional, List, Set
 import logging
 
+from ..utils.timing import timed
+
 logger = logging.getLogger(__name__)
 
 _ROTACION_DEFAULT = "Práctica General"
 
+# Grafo de dependencias del pipeline: etapa -> hojas o etapas de las que se deriva.
+# Al recargar una plantilla solo se recalculan las etapas alcanzadas por una
+# hoja con huella distinta (ver DataLoader.stale_stages).
+ETAPAS: Dict[str, Tuple[str, ...]] = {
+    "matriz_scores": ("01_Oferta", "03_Calidad", "04_Costo_del_Sitio"),
+    "scores_por_set": ("matriz_scores", "05_Ponderaciones"),
+    "modelos_semestre": ("scores_por_set", "06_Rotaciones", "07_Demanda_Semestres"),
+    "modelo_agregado": ("scores_por_set", "02_Oferta_x_Programa", "Demanda Pregrado/Posgrado"),
+}
+
+
+def sheet_fingerprint(df: pd.DataFrame) -> str:
+    """Huella del contenido de una hoja tal como se leyó (columnas y celdas)."""
+    h = hashlib.sha1(repr(list(df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df.astype(str), index=False).values.tobytes())
+    return h.hexdigest()
+
 
 class DataLoader:
     """Carga y valida datos desde plantilla Excel V4"""
@@ -28,6 +48,8 @@ class DataLoader:
         self.demanda = None
         self.rotaciones = None
         self.demanda_semestres = None
+        # {hoja: huella} de la última carga; None si la hoja no está
+        self.huellas: Dict[str, Optional[str]] = {}
 
     @staticmethod
     def _to_float(series: pd.Series) -> pd.Series:
@@ -39,26 +61,31 @@ class DataLoader:
             errors="coerce",
         )
 
+    @timed("carga_excel")
     def load_all(self) -> bool:
         """Carga todos los datos necesarios. Retorna True si está completo."""
+        xls = None
         try:
             logger.info(f"Cargando datos desde: {self.excel_path}")
+            # El libro se abre una sola vez para todas las hojas
+            xls = pd.ExcelFile(self.excel_path)
+            self.huellas = {}
 
-            self.oferta = pd.read_excel(self.excel_path, sheet_name="01_Oferta")
-            self.calidad = pd.read_excel(self.excel_path, sheet_name="03_Calidad")
-            self.cupos = pd.read_excel(self.excel_path, sheet_name="02_Oferta_x_Programa")
-            self.costos = pd.read_excel(self.excel_path, sheet_name="04_Costo_del_Sitio")
-            self.ponderaciones = pd.read_excel(self.excel_path, sheet_name="05_Ponderaciones", header=4)
+            self.oferta = self._read_sheet(xls, "01_Oferta")
+            self.calidad = self._read_sheet(xls, "03_Calidad")
+            self.cupos = self._read_sheet(xls, "02_Oferta_x_Programa")
+            self.costos = self._read_sheet(xls, "04_Costo_del_Sitio")
+            self.ponderaciones = self._read_sheet(xls, "05_Ponderaciones", header=4)
 
             try:
-                self.demanda = pd.read_excel(self.excel_path, sheet_name="Demanda Pregrado/Posgrado")
+                self.demanda = self._read_sheet(xls, "Demanda Pregrado/Posgrado")
                 logger.info(f"✓ Demanda cargada: {len(self.demanda)} grupos")
             except Exception:
                 logger.warning("⚠ Demanda no encontrada - usando placeholder")
                 self.demanda = None
 
             try:
-                rot_raw = pd.read_excel(self.excel_path, sheet_name="06_Rotaciones")
+                rot_raw = self._read_sheet(xls, "06_Rotaciones")
                 rot_raw = rot_raw.rename(columns={
                     "Semestre_Plan": "Semestre_plan",
                     "Cupo_Maximo": "Cupo",
@@ -123,9 +150,7 @@ class DataLoader:
                 self.rotaciones = None
 
             try:
-                self.demanda_semestres = pd.read_excel(
-                    self.excel_path, sheet_name="07_Demanda_Semestres"
-                )
+                self.demanda_semestres = self._read_sheet(xls, "07_Demanda_Semestres")
                 if "Semestre_Plan" in self.demanda_semestres.columns:
                     self.demanda_semestres["Semestre_Plan"] = pd.to_numeric(
                         self.demanda_semestres["Semestre_Plan"], errors="coerce"
@@ -148,6 +173,47 @@ class DataLoader:
         except Exception as e:
             logger.error(f"Error cargando datos: {e}")
             raise
+        finally:
+            if xls is not None:
+                xls.close()
+
+    def _read_sheet(self, xls: pd.ExcelFile, nombre: str, **kwargs) -> pd.DataFrame:
+        """Lee una hoja y registra su huella; si no existe la huella queda en None."""
+        self.huellas[nombre] = None
+        df = xls.parse(nombre, **kwargs)
+        self.huellas[nombre] = sheet_fingerprint(df)
+        return df
+
+    def changed_sheets(self, previo: Optional["DataLoader"]) -> Set[str]:
+        """Hojas cuya huella difiere de la carga `previo` (todas si no hay previo)."""
+        if previo is None or not previo.huellas:
+            return set(self.huellas)
+        hojas = set(self.huellas) | set(previo.huellas)
+        return {h for h in hojas if self.huellas.get(h) != previo.huellas.get(h)}
+
+    def stale_stages(self, previo: Optional["DataLoader"]) -> Set[str]:
+        """Etapas de ETAPAS que dependen, directa o indirectamente, de una hoja cambiada."""
+        sucias = set(self.changed_sheets(previo))
+        cambio = True
+        while cambio:
+            cambio = False
+            for etapa, entradas in ETAPAS.items():
+                if etapa not in sucias and sucias.intersection(entradas):
+                    sucias.add(etapa)
+                    cambio = True
+        return sucias & set(ETAPAS)
+
+    def fingerprint_for(self, etapa: str) -> Tuple:
+        """Huellas de las hojas de las que depende `etapa`, para usar como clave de caché."""
+        hojas = []
+        pendientes = [etapa]
+        while pendientes:
+            for entrada in ETAPAS.get(pendientes.pop(), ()):
+                if entrada in ETAPAS:
+                    pendientes.append(entrada)
+                else:
+                    hojas.append(entrada)
+        return tuple((h, self.huellas.get(h)) for h in sorted(set(hojas)))
 
     # ------------------------------------------------------------------
     # Validación de pesos
@@ -0,0 +1,138 @@
+"""
+Artefactos del panel de debug del modo agregado
+
+procesar_datos no los arma: deja en resultado["debug"] un LazyDict
+(src/utils/lazy.py) con `Lazy(función, entradas)` que apuntan a datos que la
+corrida ya tiene (scores por par, tablas del loader, pesos). Cada tabla se
+construye solo si se abre el panel de debug.
+"""
+
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+import pandas as pd
+
+BASE_DEBUG_COLS = [
+    "ID_Institucion",
+    "Acceso_Transporte_Publico (1-5)",
+    "MisionVisionProposito_AlineacionDocencia (1-5)",
+    "Evalua_Estudiantes_Profesores (0-5)",
+    "Vinculacion_Planta_Especialistas_%",
+    "Servicios_UCI (0/1)",
+    "Servicios_UCIN (0/1)",
+    "Servicios_UCI_UCIN (0/1)",
+    "Servicios_Pediatricos (0/1)",
+    "Servicios_Obstetricia (0/1)",
+    "Nro_Universidades_Comparten",
+    "Es_Hospital_Universitario",
+    "Escenario_Avalado_Practicas",
+    "Admiten_Docentes_Externos (Sí/No)",
+    "Areas_Bienestar (0/1)",
+    "Areas_Academicas (0/1)",
+]
+
+COSTOS_DEBUG_COLS = [
+    "ID_Institucion",
+    "Programa_Costo",
+    "Tipo_Estudiante_Costo",
+    "Tipo_Practica_Costo",
+    "Semestre_Vigencia (AAAA-S)",
+    "%_Contraprestacion_Matricula (0-100)",
+    "EPP_Exigidos (Sin exigencia/Parcial/Completo + detalle)",
+    "Cobro_EPP (No cobra/Cobra a la Universidad)",
+]
+
+# Origen de cada criterio especial en procesar_datos
+_FUENTES_ESPECIALES = {
+    "%_Contraprestacion_Matricula": "costo_pct",
+    "Cobro_EPP": "costo_cobro_epp",
+    "EPP_Exigidos": "costo_epp_exigidos",
+    "Admiten_Docentes_Externos": "calidad_bool",
+}
+
+
+def score_debug_table(
+    V: Dict[Tuple[str, Hashable], float],
+    V_criterios: Dict[Tuple[str, Hashable], Dict[str, float]],
+) -> pd.DataFrame:
+    """Score total y sk de cada criterio por institución (promedio sobre sus grupos)."""
+    if not V:
+        return pd.DataFrame()
+    filas = [
+        {"ID_Institucion": j, **{f"sk_{k}": sk for k, sk in V_criterios.get((j, g), {}).items()},
+         "score_total": score}
+        for (j, g), score in V.items()
+    ]
+    df = pd.DataFrame(filas)
+    value_cols = [c for c in df.columns if c.startswith("sk_") or c == "score_total"]
+    df = df.groupby("ID_Institucion", as_index=False)[value_cols].mean(numeric_only=True)
+    df["ID_Institucion"] = df["ID_Institucion"].astype(str)
+    return df
+
+
+def base_debug_table(oferta: pd.DataFrame, calidad: pd.DataFrame) -> pd.DataFrame:
+    """Oferta + Calidad con las columnas que alimentan los criterios."""
+    base_raw = oferta.merge(calidad, on="ID_Institucion", how="left", suffixes=("", "_cal"))
+    return base_raw[[c for c in BASE_DEBUG_COLS if c in base_raw.columns]].copy()
+
+
+def costos_debug_table(costos: pd.DataFrame) -> pd.DataFrame:
+    """Columnas de 04_Costo_del_Sitio usadas en los criterios de costo."""
+    return costos[[c for c in COSTOS_DEBUG_COLS if c in costos.columns]].copy()
+
+
+def weights_raw_table(
+    weights: Dict[str, float], limpios: Dict[str, str], crit_type: Dict[str, str]
+) -> pd.DataFrame:
+    """Pesos tal como vienen en 05_Ponderaciones, con su código limpio y tipo."""
+    return pd.DataFrame({
+        "criterio_raw": list(weights.keys()),
+        "criterio_clean": [limpios.get(k, k) for k in weights.keys()],
+        "peso": list(weights.values()),
+        "tipo": [crit_type.get(k) for k in weights.keys()],
+    })
+
+
+def weights_clean_table(
+    weights: Dict[str, float], limpios: Dict[str, str], crit_type: Dict[str, str]
+) -> pd.DataFrame:
+    """Pesos sumados por código limpio."""
+    raw = weights_raw_table(weights, limpios, crit_type)
+    return raw.groupby("criterio_clean", as_index=False)["peso"].sum()
+
+
+def criteria_status_table(criterios: Iterable[str], columnas_s: List[str]) -> pd.DataFrame:
+    """De dónde sale el sk de cada criterio activo ("missing" si no hay columna normalizada)."""
+    filas = []
+    for k in criterios:
+        fuente = _FUENTES_ESPECIALES.get(k)
+        if fuente is None:
+            fuente = "S_norm" if f"{k}_norm" in columnas_s else "missing"
+        filas.append({"criterio": k, "source": fuente})
+    return pd.DataFrame(filas)
+
+
+def score_consistency(
+    results_df: pd.DataFrame,
+    V: Dict[Tuple[str, Hashable], float],
+    V_criterios: Dict[Tuple[str, Hashable], Dict[str, float]],
+) -> Dict:
+    """Diferencia entre el Score_unitario del plan y el score_total recalculado por institución."""
+    consistencia = {"max_abs_diff": None, "mean_abs_diff": None}
+    score_debug = score_debug_table(V, V_criterios)
+    if results_df.empty or score_debug.empty or "Score_unitario" not in results_df.columns:
+        return consistencia
+    compare = results_df[["ID_Institucion", "Score_unitario"]].copy()
+    compare["ID_Institucion"] = compare["ID_Institucion"].astype(str)
+    compare = compare.merge(
+        score_debug[["ID_Institucion", "score_total"]],
+        on="ID_Institucion",
+        how="left",
+    )
+    compare["abs_diff"] = (
+        pd.to_numeric(compare["Score_unitario"], errors="coerce")
+        - pd.to_numeric(compare["score_total"], errors="coerce")
+    ).abs()
+    if compare["abs_diff"].notna().any():
+        consistencia["max_abs_diff"] = float(compare["abs_diff"].max())
+        consistencia["mean_abs_diff"] = float(compare["abs_diff"].mean())
+    return consistencia
@@ -0,0 +1,257 @@
+"""
+Descomposición en dos etapas del modelo por grupos
+
+Etapa 1: se fija el vector de tamaños de grupo t (ej. (7, 7, 6, 6)).
+Etapa 2: con t fijo, cada par (asignatura, rotación) es un problema
+independiente y pequeño: asignar cada grupo a una IPS respetando cupos.
+Las etapa-2 de un mismo vector se resuelven en paralelo y se itera sobre
+vectores candidatos, quedándose con el de mayor calidad (y, a igual
+calidad, con el de menos grupos, igual que la fase 2 lexicográfica).
+"""
+
+import math
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pulp import (
+    LpProblem, LpVariable, LpMaximize, lpSum, PULP_CBC_CMD,
+    value as pulp_value, LpStatus,
+)
+
+from .solve_report import ESTADO_OPTIMO, ESTADO_LIMITE, ESTADO_SIN_SOLUCION, ESTADO_INFACTIBLE
+
+logger = logging.getLogger(__name__)
+
+_TOL = 1e-6
+
+
+def _partitions(n: int, k: int, lo: int, hi: int) -> Iterator[Tuple[int, ...]]:
+    """Particiones de n en k partes no crecientes, cada una en [lo, hi], en
+    orden lexicográfico creciente."""
+    if k == 0:
+        if n == 0:
+            yield ()
+        return
+    if n < k * lo or n > k * hi:
+        return
+    # La primera parte es la mayor: al menos ceil(n/k)
+    for first in range(math.ceil(n / k), min(hi, n - (k - 1) * lo) + 1):
+        for rest in _partitions(n - first, k - 1, lo, first):
+            yield (first,) + rest
+
+
+def _size_vectors(n: int, k: int, lo: int, hi: int) -> Iterator[Tuple[int, ...]]:
+    """Vectores de k tamaños en [lo, hi] que suman n, por (mayor - menor, vector).
+
+    Se recorre cada par (menor, mayor) fijado, así que nunca se enumeran
+    vectores que no se vayan a entregar.
+    """
+    if k <= 1:
+        yield from _partitions(n, k, lo, hi)
+        return
+    for spread in range(hi - lo + 1):
+        for menor in range(lo, hi - spread + 1):
+            mayor = menor + spread
+            for medio in _partitions(n - mayor - menor, k - 2, menor, mayor):
+                yield (mayor,) + medio + (menor,)
+
+
+def candidate_size_vectors(
+    n_estudiantes: int,
+    min_group: int,
+    max_group: int,
+    limit: Optional[int] = None,
+) -> List[Tuple[int, ...]]:
+    """Vectores de tamaños factibles, ordenados por nº de grupos y luego por balance.
+
+    Dentro de cada número de grupos se prioriza el reparto más parejo
+    (menor diferencia entre el grupo mayor y el menor).
+    """
+    if min_group <= 0 or max_group < min_group:
+        return []
+    k_min = math.ceil(n_estudiantes / max_group)
+    k_max = n_estudiantes // min_group
+    out: List[Tuple[int, ...]] = []
+    for k in range(k_min, k_max + 1):
+        for v in _size_vectors(n_estudiantes, k, min_group, max_group):
+            out.append(v)
+            if limit is not None and len(out) >= limit:
+                return out
+    return out
+
+
+def _rotation_upper_bound(n_estudiantes: int, ips: List[Tuple[str, int, float]]) -> float:
+    """Cota superior (relajación continua) de la calidad de una rotación."""
+    restante = n_estudiantes
+    ub = 0.0
+    for _, cap, score in sorted(ips, key=lambda e: -e[2]):
+        usa = min(cap, restante)
+        ub += usa * score
+        restante -= usa
+        if restante <= 0:
+            break
+    return ub
+
+
+def solve_rotation(
+    sizes: Tuple[int, ...],
+    ips: List[Tuple[str, int, float]],
+    time_limit: Optional[int] = None,
+) -> Tuple[str, Optional[float], Optional[List[str]]]:
+    """Asigna cada grupo (de tamaño fijo) a una IPS de la rotación.
+
+    Parameters:
+    -----------
+    sizes : tamaños de grupo fijados en la etapa 1
+    ips : lista de (id_institucion, cupo, score)
+
+    Returns:
+    --------
+    (estado, calidad, [IPS de cada grupo]). estado es ESTADO_OPTIMO,
+    ESTADO_INFACTIBLE (probado), ESTADO_LIMITE (asignación válida sin
+    optimalidad probada) o ESTADO_SIN_SOLUCION (se agotó el tiempo sin
+    asignación: no prueba que sea infactible).
+    """
+    n = sum(sizes)
+    if not ips:
+        return ESTADO_INFACTIBLE, None, None
+
+    # Atajo exacto: si la mejor IPS recibe a todos, no hace falta solver
+    best = max(ips, key=lambda e: (e[2], e[1]))
+    if best[1] >= n:
+        return ESTADO_OPTIMO, best[2] * n, [best[0]] * len(sizes)
+    if sum(cap for _, cap, _ in ips) < n or max(sizes) > max(cap for _, cap, _ in ips):
+        return ESTADO_INFACTIBLE, None, None
+
+    model = LpProblem("Rotacion_grupos_fijos", LpMaximize)
+    x = {
+        (g, j): LpVariable(f"x_{g}_{j}", cat="Binary")
+        for g in range(len(sizes))
+        for j, _, _ in ips
+    }
+    score_j = {j: s for j, _, s in ips}
+    model += lpSum(score_j[j] * sizes[g] * var for (g, j), var in x.items())
+    for g in range(len(sizes)):
+        model += lpSum(x[(g, j)] for j, _, _ in ips) == 1, f"Un_IPS_{g}"
+    for j, cap, _ in ips:
+        model += lpSum(sizes[g] * x[(g, j)] for g in range(len(sizes))) <= cap, f"Cap_{j}"
+
+    status = model.solve(PULP_CBC_CMD(msg=False, timeLimit=time_limit))
+    # Con el límite de tiempo PuLP informa "Optimal" si hay incumbente y
+    # "Not Solved" si no lo hay; sol_status distingue lo probado
+    if LpStatus[status] == "Infeasible":
+        return ESTADO_INFACTIBLE, None, None
+    if model.sol_status not in (1, 2):
+        return ESTADO_SIN_SOLUCION, None, None
+
+    asignacion = []
+    for g in range(len(sizes)):
+        j_sel = next(j for j, _, _ in ips if (x[(g, j)].value() or 0) > 0.5)
+        asignacion.append(j_sel)
+    estado = ESTADO_OPTIMO if model.sol_status == 1 else ESTADO_LIMITE
+    return estado, float(pulp_value(model.objective) or 0.0), asignacion
+
+
+def solve_decomposed(
+    scores_fn,
+    cap_dict: Dict,
+    ar_pairs: List[Tuple[str, str]],
+    n_estudiantes: int,
+    min_group: int,
+    max_group: int,
+    max_candidates: Optional[int] = 200,
+    workers: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> Dict:
+    """Recorre vectores candidatos y resuelve las rotaciones en paralelo.
+
+    Parameters:
+    -----------
+    scores_fn : callable (asignatura, id_institucion) -> score
+    cap_dict : Dict[(a, r, j)] -> cupo
+    ar_pairs : lista de (asignatura, rotacion)
+    deadline : instante (time.perf_counter) en que se deja de iterar
+
+    Returns:
+    --------
+    {"sizes", "asignacion": {(a, r): [j por grupo]}, "calidad",
+     "cota_superior", "candidatos_evaluados", "candidatos_totales",
+     "completo", "motivo"}. "sizes" es None si ningún vector evaluado es factible.
+    "completo" exige que cada rotación evaluada se haya resuelto hasta el
+    final: si alguna se cortó por tiempo, el motivo es "limite_tiempo".
+    """
+    ips_by_ar: Dict[Tuple[str, str], List[Tuple[str, int, float]]] = {}
+    for (a, r, j), cap in cap_dict.items():
+        ips_by_ar.setdefault((a, r), []).append((j, int(cap), float(scores_fn(a, j))))
+
+    # Rotaciones sin IPS se ignoran, igual que en el modelo monolítico
+    pairs = [p for p in ar_pairs if ips_by_ar.get(p)]
+    cota = sum(_rotation_upper_bound(n_estudiantes, ips_by_ar[p]) for p in pairs)
+
+    limite = max_candidates + 1 if max_candidates is not None else None
+    candidatos = candidate_size_vectors(n_estudiantes, min_group, max_group, limit=limite)
+    truncado = max_candidates is not None and len(candidatos) > max_candidates
+    if truncado:
+        candidatos = candidatos[:max_candidates]
+    workers = workers or min(len(pairs), os.cpu_count() or 1) or 1
+
+    def _time_left() -> Optional[int]:
+        if deadline is None:
+            return None
+        return max(1, int(deadline - time.perf_counter()))
+
+    best = None
+    evaluados = 0
+    sin_probar = 0
+    motivo = "agotados"
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for sizes in candidatos:
+            if deadline is not None and time.perf_counter() >= deadline:
+                motivo = "limite_tiempo"
+                break
+            evaluados += 1
+            tl = _time_left()
+            sols = list(pool.map(lambda p: solve_rotation(sizes, ips_by_ar[p], tl), pairs))
+            estados = {s[0] for s in sols}
+            if estados & {ESTADO_LIMITE, ESTADO_SIN_SOLUCION}:
+                sin_probar += 1
+            if estados & {ESTADO_INFACTIBLE, ESTADO_SIN_SOLUCION}:
+                continue
+            calidad = sum(s[1] for s in sols)
+            if best is None or calidad > best["calidad"] + _TOL or (
+                abs(calidad - best["calidad"]) <= _TOL and len(sizes) < len(best["sizes"])
+            ):
+                best = {
+                    "sizes": sizes,
+                    "asignacion": {p: s[2] for p, s in zip(pairs, sols)},
+                    "calidad": calidad,
+                }
+            # Los candidatos vienen en orden creciente de grupos: al alcanzar
+            # la cota ya no hay un vector con más calidad ni con menos grupos.
+            if best["calidad"] >= cota - _TOL:
+                motivo = "cota_alcanzada"
+                break
+        else:
+            if truncado:
+                motivo = "limite_candidatos"
+    if sin_probar and motivo in ("agotados", "cota_alcanzada"):
+        motivo = "limite_tiempo"
+
+    logger.info(
+        f"Descomposición: {evaluados}/{len(candidatos)} vectores evaluados ({motivo}) | "
+        f"cortados por tiempo={sin_probar} | "
+        f"pares={len(pairs)} | cota={cota:.4f} | "
+        f"calidad={best['calidad'] if best else float('nan'):.4f}"
+    )
+    out = best or {"sizes": None, "asignacion": {}, "calidad": None}
+    out.update({
+        "cota_superior": cota,
+        "candidatos_evaluados": evaluados,
+        "candidatos_totales": len(candidatos),
+        "completo": motivo in ("agotados", "cota_alcanzada"),
+        "motivo": motivo,
+    })
+    return out
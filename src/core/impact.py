@@ -0,0 +1,204 @@
+"""
+Impacto de perder una IPS (leave-one-out) sobre el plan por grupos
+
+Para cada IPS de cap_dict se re-optimiza el semestre sin ella, arrancando en
+caliente desde el plan base sin sus grupos, y se mide cuánta calidad y cuánta
+cobertura se pierde. Las corridas van en un pool de procesos.
+
+Dos atajos evitan resolver:
+  - Una IPS que no recibe estudiantes en el plan base no cambia nada: el
+    plan base sigue siendo factible sin ella, con la misma calidad.
+  - La cobertura sin la IPS se acota con el DP de presolve.max_alojable por
+    rotación; si alguna rotación deja de alojar a todos, el modelo es
+    infactible. La cota relaja el acoplamiento entre rotaciones (los mismos
+    grupos pasan por todas), así que la cobertura real puede ser menor: la
+    pérdida de cobertura reportada es un mínimo, no el valor exacto.
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+import pandas as pd
+
+from .optimizer import GroupOptimizer
+from .presolve import max_alojable
+from .solve_report import ESTADO_OPTIMO, ESTADO_GAP, ESTADO_LIMITE, ESTADO_INFACTIBLE
+
+logger = logging.getLogger(__name__)
+
+ESTADO_SIN_USO = "sin_uso_en_plan"
+
+COLUMNAS = [
+    "ID_Institucion", "En_Plan_Base", "Estudiantes_Plan_Base", "Rotaciones", "Cupo_Total",
+    "Estado", "Calidad", "Perdida_Calidad", "Perdida_Calidad_Pct",
+    "Estudiantes_Alojables", "Perdida_Cobertura", "Grupos", "Tiempo",
+]
+
+
+def coverage_without(
+    cap_dict: Dict,
+    asignaturas_rotaciones: Dict,
+    ips,
+    n_estudiantes: int,
+    min_group: int,
+    max_group: int,
+) -> int:
+    """Cota superior de los estudiantes que todas las rotaciones alojan sin la IPS `ips`.
+
+    Es el mínimo, entre rotaciones, de lo que cada una aloja por separado; no
+    exige que los grupos sean los mismos en todas, así que el plan conjunto
+    puede alojar menos. Solo cuentan las rotaciones que tienen IPS en cap_dict (las demás el
+    modelo ya las ignora); una rotación que se queda sin IPS aloja 0.
+    """
+    cupos_by_ar: Dict = {}
+    for (a, r, j), cupo in cap_dict.items():
+        lista = cupos_by_ar.setdefault((a, r), [])
+        if j != ips:
+            lista.append(int(cupo))
+    alojables = [
+        max_alojable(cupos_by_ar[(a, r)], n_estudiantes, min_group, max_group)
+        for a, rots in asignaturas_rotaciones.items()
+        for r in rots
+        if (a, r) in cupos_by_ar
+    ]
+    return min(alojables) if alojables else 0
+
+
+def _resolver_sin_ips(args) -> Dict:
+    """Re-optimiza sin una IPS en un proceso del pool."""
+    ips, kwargs, plan_inicial = args
+    t0 = time.perf_counter()
+    opt = GroupOptimizer(verbose=False)
+    res = opt.optimize(**kwargs, initial_plan=plan_inicial)
+    rep = opt.get_solve_report() or {}
+    return {
+        "ips": ips,
+        "estado": rep.get("estado"),
+        "calidad": opt.get_objective_value(),
+        "grupos": int(res["Grupo"].nunique()) if res is not None and not res.empty else None,
+        "tiempo": round(time.perf_counter() - t0, 4),
+    }
+
+
+def leave_one_ips_out(
+    scores: Dict,
+    cap_dict: Dict,
+    asignaturas_rotaciones: Dict,
+    n_estudiantes: int,
+    min_group: int,
+    max_group: int,
+    plan_base: pd.DataFrame,
+    calidad_base: float,
+    time_limit: Optional[float] = 60,
+    gap_rel: Optional[float] = None,
+    mode: str = "monolitico",
+    workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """Pérdida de calidad y de cobertura al excluir cada IPS de cap_dict.
+
+    Parameters:
+    -----------
+    scores, cap_dict, asignaturas_rotaciones, n_estudiantes, min_group, max_group :
+        los mismos datos con que se resolvió el plan base (GroupOptimizer.optimize)
+    plan_base : asignaciones del plan base (columnas Asignatura, Rotacion,
+        ID_Institucion, Grupo, Estudiantes); sin los grupos de la IPS excluida es
+        el arranque en caliente de cada corrida
+    calidad_base : objetivo de calidad del plan base
+    time_limit, gap_rel, mode : como en GroupOptimizer.optimize, por corrida
+    workers : procesos del pool (None = núcleos disponibles)
+
+    Returns:
+    --------
+    DataFrame con COLUMNAS, una fila por IPS, ordenado por pérdida de cobertura
+    y de calidad. Estudiantes_Alojables es la cota de coverage_without y
+    Perdida_Cobertura = n_estudiantes - Estudiantes_Alojables, la pérdida
+    mínima: si es > 0 la corrida es infactible y Calidad / Perdida_Calidad
+    quedan vacías; si es 0 la re-optimización aún puede salir infactible
+    (ver Estado).
+    """
+    t0 = time.perf_counter()
+    plan_base = plan_base.copy()
+    plan_base["_ips"] = plan_base["ID_Institucion"].astype(str)
+    est_por_ips = plan_base.groupby("_ips")["Estudiantes"].sum().to_dict()
+
+    info: Dict = {}
+    for (a, r, j), cupo in cap_dict.items():
+        d = info.setdefault(j, {"rotaciones": 0, "cupo": 0})
+        d["rotaciones"] += 1
+        d["cupo"] += int(cupo)
+
+    filas = {}
+    tareas = []
+    for j, d in info.items():
+        alojables = coverage_without(
+            cap_dict, asignaturas_rotaciones, j, n_estudiantes, min_group, max_group
+        )
+        usada = str(j) in est_por_ips
+        filas[j] = {
+            "ID_Institucion": str(j),
+            "En_Plan_Base": usada,
+            "Estudiantes_Plan_Base": int(est_por_ips.get(str(j), 0)),
+            "Rotaciones": d["rotaciones"],
+            "Cupo_Total": d["cupo"],
+            "Estado": ESTADO_SIN_USO,
+            "Calidad": calidad_base,
+            "Perdida_Calidad": 0.0,
+            "Perdida_Calidad_Pct": 0.0,
+            "Estudiantes_Alojables": alojables,
+            "Perdida_Cobertura": n_estudiantes - alojables,
+            "Grupos": None,
+            "Tiempo": 0.0,
+        }
+        if alojables < n_estudiantes:
+            filas[j].update({
+                "Estado": ESTADO_INFACTIBLE, "Calidad": None,
+                "Perdida_Calidad": None, "Perdida_Calidad_Pct": None,
+            })
+        elif usada:
+            kwargs = dict(
+                scores=scores,
+                cap_dict={k: c for k, c in cap_dict.items() if k[2] != j},
+                asignaturas_rotaciones=asignaturas_rotaciones,
+                n_estudiantes=n_estudiantes,
+                min_group=min_group,
+                max_group=max_group,
+                time_limit=time_limit,
+                gap_rel=gap_rel,
+                mode=mode,
+            )
+            plan_inicial = plan_base[plan_base["_ips"] != str(j)].drop(columns="_ips")
+            tareas.append((j, kwargs, plan_inicial))
+
+    workers = workers or os.cpu_count() or 1
+    if tareas:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tareas))) as pool:
+            salidas = list(pool.map(_resolver_sin_ips, tareas))
+    else:
+        salidas = []
+
+    for s in salidas:
+        fila = filas[s["ips"]]
+        fila.update({"Estado": s["estado"], "Grupos": s["grupos"], "Tiempo": s["tiempo"]})
+        if s["estado"] in (ESTADO_OPTIMO, ESTADO_GAP, ESTADO_LIMITE) and s["calidad"] is not None:
+            perdida = calidad_base - s["calidad"]
+            fila.update({
+                "Calidad": s["calidad"],
+                "Perdida_Calidad": perdida,
+                "Perdida_Calidad_Pct": perdida / calidad_base if calidad_base else None,
+            })
+        else:
+            fila.update({"Calidad": None, "Perdida_Calidad": None, "Perdida_Calidad_Pct": None})
+
+    df = pd.DataFrame(list(filas.values()), columns=COLUMNAS)
+    df = df.sort_values(
+        ["Perdida_Cobertura", "Perdida_Calidad"], ascending=False, na_position="first"
+    ).reset_index(drop=True)
+    logger.info(
+        f"Impacto por IPS: {len(filas)} IPS | re-optimizadas={len(tareas)} | "
+        f"infactibles sin la IPS={int((df['Perdida_Cobertura'] > 0).sum())} | "
+        f"workers={workers} | t={time.perf_counter() - t0:.2f}s"
+    )
+    return df
@@ -0,0 +1,360 @@
+"""
+Ejecución de optimizaciones en segundo plano
+
+Cada trabajo corre en un proceso propio (con su grupo de procesos, para poder
+cancelarlo junto con CBC) y un hilo del servidor recoge sus avisos por una
+tubería. La función del trabajo recibe `avisar(nivel, contenido)`: los
+avisos quedan en el trabajo a medida que llegan y los de nivel "semestre"
+además se guardan como resultados parciales. El número de trabajos
+simultáneos está acotado (los demás esperan en cola) y cada uno puede
+limitarse en núcleos y en tiempo de CPU.
+
+Los procesos se arrancan siempre por fork, sea cual sea el método por defecto
+de la plataforma (forkserver en Linux desde Python 3.14, spawn en macOS y
+Windows): la función del trabajo de la app (app._trabajo_optimizacion) vive en
+el `__main__` de Streamlit y recibe el loader y los memos, que no se pueden
+serializar para un proceso nuevo. Donde no hay fork (Windows) JobRunner no
+puede lanzar trabajos; la app corre entonces en primer plano o usa el servicio.
+
+ServiceJobRunner consulta la misma cola atendida por el servicio HTTP local
+(servicio.py) en vez de lanzar los procesos en la app.
+"""
+
+import os
+import json
+import time
+import functools
+import uuid
+import queue
+import signal
+import logging
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import multiprocessing as mp
+from typing import Callable, Dict, List, Optional, Set
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from ..utils.codec import from_jsonable
+
+logger = logging.getLogger(__name__)
+
+EN_COLA = "en_cola"
+EJECUTANDO = "ejecutando"
+COMPLETADO = "completado"
+ERROR = "error"
+CANCELADO = "cancelado"
+
+TERMINADOS = (COMPLETADO, ERROR, CANCELADO)
+
+# Método de arranque de los procesos de trabajo (ver docstring del módulo)
+INICIO_PROCESOS = "fork"
+FORK_DISPONIBLE = INICIO_PROCESOS in mp.get_all_start_methods()
+
+# Trabajos terminados que se conservan para consulta
+MAX_TERMINADOS = 50
+
+
+def _aplicar_limites(cpus: Optional[Set[int]], cpu_segundos: Optional[int]) -> None:
+    """Limita el proceso actual (y los solvers que lance) a `cpus` y a `cpu_segundos` de CPU."""
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    if cpu_segundos and resource is not None:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_segundos, cpu_segundos + 5))
+
+
+def _job_worker(salida, fn: Callable, args: tuple, kwargs: dict, limites: Dict) -> None:
+    """Proceso del trabajo: ejecuta `fn` enviando avisos y el resultado por la tubería."""
+    # Grupo de procesos propio: cancelar detiene también al solver hijo
+    if hasattr(os, "setsid"):
+        os.setsid()
+    _aplicar_limites(**limites)
+
+    def avisar(nivel: str, contenido=None) -> None:
+        salida.send(("aviso", (nivel, contenido)))
+
+    try:
+        salida.send(("resultado", fn(*args, avisar=avisar, **kwargs)))
+    except Exception as e:
+        salida.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        salida.close()
+
+
+class JobRunner:
+    """Cola de trabajos con un máximo de `max_workers` procesos a la vez.
+
+    Parameters:
+    -----------
+    cpus_por_trabajo : núcleos asignados a cada trabajo (afinidad de CPU, la
+        heredan los solvers). Cada cupo del pool recibe núcleos distintos
+        mientras alcancen. None = sin restricción.
+    cpu_segundos : tiempo de CPU máximo por proceso del trabajo; al superarlo
+        el sistema lo detiene y el trabajo termina en error. None = sin límite.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        cpus_por_trabajo: Optional[int] = None,
+        cpu_segundos: Optional[int] = None,
+    ):
+        self.max_workers = max_workers
+        self.cpus_por_trabajo = cpus_por_trabajo
+        self.cpu_segundos = cpu_segundos
+        self._jobs: Dict[str, Dict] = {}
+        self._procs: Dict[str, mp.Process] = {}
+        self._lock = threading.Lock()
+        self._cupos: "queue.Queue[int]" = queue.Queue()
+        for i in range(max_workers):
+            self._cupos.put(i)
+
+    def _cpus_del_cupo(self, cupo: int) -> Optional[Set[int]]:
+        if not self.cpus_por_trabajo or not hasattr(os, "sched_getaffinity"):
+            return None
+        disponibles = sorted(os.sched_getaffinity(0))
+        n = min(self.cpus_por_trabajo, len(disponibles))
+        return {disponibles[(cupo * n + i) % len(disponibles)] for i in range(n)}
+
+    def stats(self) -> Dict:
+        """Trabajos por estado y configuración del pool."""
+        por_estado: Dict[str, int] = {}
+        for j in self._jobs.values():
+            por_estado[j["estado"]] = por_estado.get(j["estado"], 0) + 1
+        return {
+            "max_trabajos": self.max_workers,
+            "cpus_por_trabajo": self.cpus_por_trabajo,
+            "cpu_segundos": self.cpu_segundos,
+            "trabajos": por_estado,
+        }
+
+    def submit(self, fn: Callable, *args, **kwargs) -> str:
+        """Encola `fn(*args, avisar=..., **kwargs)` y devuelve el id del trabajo.
+
+        Con el arranque por fork ni `fn` ni los argumentos necesitan ser
+        serializables; el resultado sí, porque vuelve por una tubería. Sin fork
+        en la plataforma se lanza RuntimeError.
+        """
+        if not FORK_DISPONIBLE:
+            raise RuntimeError(
+                f"Los trabajos en segundo plano requieren el arranque de procesos por "
+                f"'{INICIO_PROCESOS}', que esta plataforma no ofrece"
+            )
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "estado": EN_COLA,
+            "avisos": [],
+            "parciales": {},
+            "resultado": None,
+            "error": None,
+            "creado": time.time(),
+            "inicio": None,
+            "fin": None,
+        }
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = job
+        threading.Thread(target=self._run, args=(job, fn, args, kwargs), daemon=True).start()
+        logger.info(f"Trabajo {job_id} encolado")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Estado actual del trabajo (el mismo dict que actualiza el hilo recolector)."""
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Dict]:
+        return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancela un trabajo en cola o en ejecución. Devuelve False si ya terminó."""
+        job = self._jobs.get(job_id)
+        if job is None or job["estado"] in TERMINADOS:
+            return False
+        job["cancelar"] = True
+        proc = self._procs.get(job_id)
+        if proc is not None and proc.is_alive():
+            try:
+                if hasattr(os, "killpg"):
+                    os.killpg(proc.pid, signal.SIGKILL)
+                else:
+                    proc.kill()
+            except (ProcessLookupError, PermissionError):
+                proc.kill()
+        if job["estado"] == EN_COLA:
+            self._finish(job, CANCELADO)
+        logger.info(f"Trabajo {job_id}: cancelación solicitada")
+        return True
+
+    def _finish(self, job: Dict, estado: str, error: Optional[str] = None) -> None:
+        job["estado"] = estado
+        job["error"] = error
+        job["fin"] = time.time()
+
+    def _prune(self) -> None:
+        terminados = sorted(
+            (j for j in self._jobs.values() if j["estado"] in TERMINADOS), key=lambda j: j["fin"]
+        )
+        for j in terminados[:max(0, len(terminados) - MAX_TERMINADOS)]:
+            del self._jobs[j["id"]]
+
+    def _run(self, job: Dict, fn: Callable, args: tuple, kwargs: dict) -> None:
+        """Hilo recolector: espera un cupo libre del pool y ejecuta el trabajo en él."""
+        cupo = self._cupos.get()
+        try:
+            self._execute(job, fn, args, kwargs, cupo)
+        finally:
+            self._cupos.put(cupo)
+        if job["inicio"] is not None:
+            logger.info(
+                f"Trabajo {job['id']}: {job['estado']} en "
+                f"{job['fin'] - (job['inicio'] or job['creado']):.2f}s"
+            )
+
+    def _execute(self, job: Dict, fn: Callable, args: tuple, kwargs: dict, cupo: int) -> None:
+        """Lanza el proceso del trabajo en `cupo` y vuelca sus mensajes en `job`."""
+        if job.get("cancelar"):
+            return
+        ctx = mp.get_context(INICIO_PROCESOS)
+        # Tubería de un solo sentido: al morir el proceso, recv() ve EOF en vez
+        # de quedar esperando un mensaje a medio escribir
+        entrada, salida = ctx.Pipe(duplex=False)
+        limites = {"cpus": self._cpus_del_cupo(cupo), "cpu_segundos": self.cpu_segundos}
+        # No daemon: el modo portafolio lanza sus propios procesos
+        proc = ctx.Process(target=_job_worker, args=(salida, fn, args, kwargs, limites))
+        job["estado"] = EJECUTANDO
+        job["inicio"] = time.time()
+        proc.start()
+        salida.close()
+        self._procs[job["id"]] = proc
+        if job.get("cancelar"):
+            # Cancelado entre la salida de la cola y el arranque
+            self.cancel(job["id"])
+
+        while True:
+            if not entrada.poll(0.2):
+                continue
+            try:
+                tipo, contenido = entrada.recv()
+            except EOFError:
+                break
+            if tipo == "aviso":
+                nivel, dato = contenido
+                job["avisos"].append((nivel, dato))
+                if nivel == "semestre":
+                    job["parciales"][dato["semestre"]] = dato
+            elif tipo == "resultado":
+                job["resultado"] = contenido
+                self._finish(job, COMPLETADO)
+                break
+            else:
+                self._finish(job, ERROR, contenido)
+                break
+
+        proc.join(5)
+        self._procs.pop(job["id"], None)
+        entrada.close()
+        if job["estado"] != EJECUTANDO:
+            return
+        if job.get("cancelar"):
+            self._finish(job, CANCELADO)
+        elif hasattr(signal, "SIGXCPU") and proc.exitcode == -signal.SIGXCPU:
+            self._finish(job, ERROR, f"El trabajo superó el límite de {self.cpu_segundos} s de CPU")
+        else:
+            self._finish(job, ERROR, f"El proceso terminó sin resultado (código {proc.exitcode})")
+
+
+class ServiceJobRunner:
+    """Cliente del servicio de optimización (servicio.py) con la interfaz de
+    consulta de JobRunner (get / cancel / stats).
+
+    Los trabajos se envían con submit_optimizacion: la plantilla se sube una
+    vez (el servicio la identifica por su contenido) y la corrida queda en la
+    cola del servicio, compartida por todas las sesiones.
+    """
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        # Trabajos terminados ya descargados: no cambian más
+        self._terminados: Dict[str, Dict] = {}
+
+    def _pedir(self, metodo: str, ruta: str, cuerpo=None, tipo: str = "application/json") -> Dict:
+        if cuerpo is not None and tipo == "application/json":
+            cuerpo = json.dumps(cuerpo).encode("utf-8")
+        req = urllib.request.Request(
+            self.url + ruta, data=cuerpo, method=metodo, headers={"Content-Type": tipo}
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            try:
+                detalle = json.loads(e.read()).get("error", e.reason)
+            except ValueError:
+                detalle = e.reason
+            raise RuntimeError(f"Servicio de optimización ({e.code}): {detalle}") from e
+        except urllib.error.URLError as e:
+            raise ConnectionError(f"Servicio de optimización no disponible en {self.url}: {e.reason}") from e
+
+    def stats(self) -> Dict:
+        return self._pedir("GET", "/salud")
+
+    def submit_optimizacion(
+        self, xlsx: bytes, set_id: str, semestre: str, modo_resultado: str, params: Dict
+    ) -> str:
+        """Sube la plantilla y encola la optimización. Devuelve el id del trabajo."""
+        consulta = urllib.parse.urlencode({"set_id": set_id, "semestre": semestre})
+        plantilla = self._pedir(
+            "POST", f"/plantillas?{consulta}", xlsx,
+            tipo="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+        resp = self._pedir("POST", "/trabajos", {
+            "plantilla_id": plantilla["plantilla_id"],
+            "modo": modo_resultado,
+            "params": params,
+        })
+        logger.info(f"Trabajo {resp['trabajo_id']} encolado en {self.url}")
+        return resp["trabajo_id"]
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Estado del trabajo con la misma forma que JobRunner.get."""
+        if job_id in self._terminados:
+            return self._terminados[job_id]
+        try:
+            job = self._pedir("GET", f"/trabajos/{job_id}")
+        except RuntimeError:
+            return None
+        except ConnectionError as e:
+            return {
+                "id": job_id, "estado": ERROR, "avisos": [], "parciales": {},
+                "resultado": None, "error": str(e),
+            }
+        job = from_jsonable(job, functools.partial(_fetch_deferred, self.url, job_id, self.timeout))
+        job["id"] = job.pop("trabajo_id")
+        job["avisos"] = [tuple(a) for a in job["avisos"]]
+        if job["estado"] in TERMINADOS:
+            self._terminados[job_id] = job
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        try:
+            return bool(self._pedir("DELETE", f"/trabajos/{job_id}").get("cancelado"))
+        except (RuntimeError, ConnectionError):
+            return False
+
+
+def _fetch_deferred(url: str, job_id: str, timeout: float, ruta: List[str]):
+    """Trae del servicio un valor pendiente del resultado (ver codec.from_jsonable)."""
+    consulta = urllib.parse.urlencode([("ruta", clave) for clave in ruta])
+    try:
+        with urllib.request.urlopen(f"{url}/trabajos/{job_id}/diferido?{consulta}", timeout=timeout) as resp:
+            return from_jsonable(json.loads(resp.read())["valor"])
+    except (urllib.error.URLError, ValueError, KeyError) as e:
+        logger.warning(f"No se pudo traer {'/'.join(ruta)} del trabajo {job_id}: {e}")
+        return None
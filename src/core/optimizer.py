@@ -5,14 +5,56 @@ Modelo de optimización MILP para asignación de estudiantes
 import pandas as pd
 import numpy as np
 from pulp import (
-    LpProblem, LpVariable, LpMaximize, lpSum, LpInteger, PULP_CBC_CMD,
-    value as pulp_value, LpStatus,
+    LpProblem, LpVariable, LpMaximize, LpMinimize, lpSum, LpInteger,
+    value as pulp_value,
 )
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional
 import logging
+import time
+
+from .decomposition import solve_decomposed
+from .portfolio import solve_portfolio
+from .presolve import check_feasibility, reduce_problem
+from .sensitivity import capacity_duals, weight_ranges, METODO_RELAJACION, METODO_ENTEROS_FIJOS
+from .solve_report import (
+    ESTADO_OPTIMO, ESTADO_LIMITE, ESTADO_INFACTIBLE, ESTADO_SIN_SOLUCION, solve_cbc, new_report, has_incumbent, relative_gap, format_report,
+)
+from ..utils.timing import timed, record_timings
 
 logger = logging.getLogger(__name__)
 
+# Estado de la fase 2 cuando no queda presupuesto para correrla
+FASE2_OMITIDA = "omitida"
+# Piso de tiempo por fase de update_scores (re-optimización interactiva)
+PISO_INTERACTIVO = 0.2
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    """Segundos que quedan del presupuesto (None = sin límite; ≤ 0 si se agotó)."""
+    if deadline is None:
+        return None
+    return deadline - time.perf_counter()
+
+
+def _cbc_limit(restante: Optional[float], piso: float = 1.0) -> Optional[float]:
+    """timeLimit para CBC: lo que queda, con un piso de `piso` s (None = sin límite)."""
+    if restante is None:
+        return None
+    return max(piso, round(restante, 2))
+
+
+def _lex_status(fase1: Dict, fase2: Optional[Dict]) -> str:
+    """Estado del plan lexicográfico (calidad, luego nº de grupos).
+
+    Es el de la fase 1, salvo que la calidad esté probada y la consolidación
+    no: entonces el número de grupos es solo un incumbente (límite de tiempo).
+    """
+    if fase1["estado"] != ESTADO_OPTIMO:
+        return fase1["estado"]
+    if fase2 is None or fase2["estado"] != ESTADO_OPTIMO:
+        return ESTADO_LIMITE
+    return ESTADO_OPTIMO
+
 
 class Optimizer:
     """Ejecuta optimización MILP de asignación"""
@@ -22,7 +64,11 @@ class Optimizer:
         self.model = None
         self.variables = {}
         self.results = None
+        self.solve_report = None
+        # {(j, p, n, s): (nombre de la restricción Cap_, cupo)}
+        self._cap_restricciones = {}
     
+    @timed("modelo_agregado")
     def optimize(
         self,
         V: Dict,
@@ -30,7 +76,9 @@ class Optimizer:
         cap_dict: Dict,
         instituciones: List[str],
         groups: List[Tuple],
-        semestre: str
+        semestre: str,
+        time_limit: Optional[float] = None,
+        gap_rel: Optional[float] = None,
     ) -> pd.DataFrame:
         """
         Resuelve el problema de optimización.
@@ -42,8 +90,13 @@ class Optimizer:
         cap_dict : Dict[(j,p,n,s)] -> cupo
         instituciones : Lista de IDs
         groups : Lista de tuplas (p,n,t,s)
+        time_limit : presupuesto de reloj en segundos (None = sin límite)
+        gap_rel : gap relativo objetivo para detener CBC
         """
         
+        t_inicio = time.perf_counter()
+        self.solve_report = new_report(time_limit, gap_rel)
+        self._cap_restricciones = {}
         logger.info("Creando modelo MILP...")
         
         self.model = LpProblem("Asignacion_Practicas", LpMaximize)
@@ -76,18 +129,33 @@ class Optimizer:
             relevant_vars = [self.variables[(j, g)] for g in relevant_groups if (j, g) in self.variables]
             
             if relevant_vars:
-                self.model += lpSum(relevant_vars) <= cap, f"Cap_{j}_{p}_{n}_{s}"
+                restr = lpSum(relevant_vars) <= cap
+                self.model += restr, f"Cap_{j}_{p}_{n}_{s}"
+                # PuLP normaliza el nombre; se guarda el definitivo
+                self._cap_restricciones[(j, p, n, s)] = (restr.name, cap)
         
         # Resolver
         logger.info("Resolviendo modelo...")
-        solver = PULP_CBC_CMD(msg=self.verbose)
-        status = self.model.solve(solver)
+        report = self.solve_report
+        report["tiempos"]["construccion"] = round(time.perf_counter() - t_inicio, 4)
+        fase1 = solve_cbc(self.model, time_limit=time_limit, gap_rel=gap_rel, verbose=self.verbose)
+        report["fases"]["fase1"] = fase1
+        report["tiempos"]["fase1"] = fase1["tiempo"]
+        report.update({
+            "estado": fase1["estado"],
+            "optimo_probado": fase1["estado"] == ESTADO_OPTIMO,
+            "objetivo": fase1["objetivo"],
+            "cota": fase1["cota"],
+            "gap": fase1["gap"],
+            "nodos": fase1["nodos"],
+        })
         
-        logger.info(f"Estado: {status}")
+        logger.info(f"Estado: {fase1['estado']} ({fase1['estado_pulp']})")
         
         # Extraer resultados
+        t_extraccion = time.perf_counter()
         results = []
-        for (j, g), var in self.variables.items():
+        for (j, g), var in (self.variables.items() if has_incumbent(fase1) else []):
             if var.value() and var.value() > 0:
                 p, n, t, s = g
                 results.append({
@@ -104,12 +172,77 @@ class Optimizer:
             ["Programa", "Tipo_Estudiante", "Tipo_Practica", "ID_Institucion"]
         ) if results else pd.DataFrame()
         
+        report["tiempos"]["extraccion"] = round(time.perf_counter() - t_extraccion, 4)
+        report["tiempos"]["total"] = round(time.perf_counter() - t_inicio, 4)
+        logger.info(f"Optimizer: {format_report(report)}")
+        record_timings(report["tiempos"])
         return self.results
     
     def get_objective_value(self) -> float:
         """Retorna el valor óptimo de la función objetivo"""
         return self.model.objective.value() if self.model else None
 
+    @timed("precios_sombra")
+    def capacity_shadow_prices(self) -> pd.DataFrame:
+        """Precio sombra de cada cupo (j, p, n, s): calidad marginal por cupo adicional.
+
+        Se obtiene del dual de Cap_{j}_{p}_{n}_{s} en la relajación LP, que en
+        este modelo de transporte coincide con el óptimo entero.
+        """
+        if self.model is None or not self._cap_restricciones:
+            return pd.DataFrame()
+        duales = capacity_duals(
+            self.model,
+            self.model.objective,
+            {k: nombre for k, (nombre, _) in self._cap_restricciones.items()},
+        )
+        filas = []
+        for (j, p, n, s), (_, cap) in self._cap_restricciones.items():
+            if (j, p, n, s) not in duales:
+                continue
+            d = duales[(j, p, n, s)]
+            filas.append({
+                "ID_Institucion": j,
+                "Programa": p,
+                "Tipo_Estudiante": n,
+                "Semestre": s,
+                "Cupo": cap,
+                "Uso": cap - d["holgura"],
+                "Holgura": d["holgura"],
+                "Precio_Sombra": d["precio_sombra"],
+            })
+        df = pd.DataFrame(filas)
+        if not df.empty:
+            df = df.sort_values("Precio_Sombra", ascending=False).reset_index(drop=True)
+        return df
+
+    def weight_sensitivity(self, criterios: Dict, weights: Dict[str, float]) -> pd.DataFrame:
+        """Rango de cada peso del set en el que el plan actual sigue siendo óptimo.
+
+        Parameters:
+        -----------
+        criterios : Dict[(j, g)] -> {criterio: score normalizado}, los mismos
+            que componen V[(j, g)] = Σ_k w_k · s_k
+        weights : {criterio: peso normalizado}
+
+        Al mover un peso, el resto se reescala proporcionalmente para sumar 1.
+        Ver src/core/sensitivity.py (weight_ranges).
+        """
+        if self.model is None or self.results is None or self.results.empty:
+            return pd.DataFrame()
+        por_variable = {
+            var.name: criterios[key] for key, var in self.variables.items() if key in criterios
+        }
+        df = pd.DataFrame(weight_ranges(self.model, por_variable, weights))
+        if not df.empty:
+            df["Margen_Bajada"] = df["Peso_Actual"] - df["Peso_Min"]
+            df["Margen_Subida"] = df["Peso_Max"] - df["Peso_Actual"]
+        return df
+
+    def get_solve_report(self) -> Optional[Dict]:
+        """Reporte de la última corrida (estado, incumbente, cota, gap, nodos, tiempos)."""
+        return self.solve_report
+
 
 class GroupOptimizer:
     """Optimización con grupos de tamaño controlado por semestre."""
@@ -119,7 +252,11 @@ class GroupOptimizer:
         self.model = None
         self.results = None
         self._score_optimo = None
+        self.solve_report = None
+        # Variables del último modelo monolítico (para planes alternativos)
+        self._modelo = None
 
+    @timed("modelo_grupos")
     def optimize(
         self,
         scores: dict,
@@ -128,10 +265,101 @@ class GroupOptimizer:
         n_estudiantes: int,
         min_group: int,
         max_group: int,
-        time_limit: int = 120,
+        time_limit: Optional[float] = 120,
+        mode: str = "monolitico",
+        max_candidates: Optional[int] = 200,
+        workers: Optional[int] = None,
+        gap_rel: Optional[float] = None,
+        precheck: bool = True,
+        presolve: bool = True,
+        portfolio_configs: Optional[List[Dict]] = None,
+        initial_plan: Optional[pd.DataFrame] = None,
     ) -> pd.DataFrame:
+        """
+        Forma grupos y los asigna a IPS en cada (asignatura, rotación).
+
+        Parameters:
+        -----------
+        time_limit : presupuesto total de reloj en segundos (None = sin límite).
+            Si se agota, se devuelve el mejor incumbente y el reporte lo indica.
+        gap_rel : gap relativo objetivo; CBC se detiene al alcanzarlo
+        mode : "monolitico" (un único MILP) o "descomposicion" (se fija el
+            vector de tamaños de grupo y cada rotación se resuelve aparte,
+            en paralelo; ver src/core/decomposition.py) o "portafolio" (el
+            modelo monolítico resuelto por varias configuraciones de solver en
+            procesos paralelos; gana la primera que prueba el óptimo, ver
+            src/core/portfolio.py)
+        max_candidates : vectores de tamaños a evaluar en modo descomposición
+        workers : hilos para las rotaciones en modo descomposición
+        precheck : verificar antes, sin solver, que cada rotación pueda alojar
+            a los estudiantes en grupos (ver src/core/presolve.py)
+        presolve : aplicar reducciones exactas (IPS con cupo menor al grupo
+            mínimo, IPS dominadas, cupos recortados) antes de construir el modelo
+        portfolio_configs : configuraciones del modo portafolio
+            (None = PORTAFOLIO_DEFAULT)
+        initial_plan : plan previo (mismo formato que el resultado) para arrancar
+            la fase 1 en caliente. Si ya no es factible (otros cupos), CBC lo descarta.
+        """
         import math
 
+        t_inicio = time.perf_counter()
+        deadline = t_inicio + time_limit if time_limit else None
+        self.solve_report = new_report(time_limit, gap_rel)
+        self._modelo = None
+
+        # Score por (asignatura, IPS) si está disponible; si no, por IPS (compat.)
+        def _score(a, j):
+            if (a, j) in scores:
+                return scores[(a, j)]
+            return scores.get(j, 0.0)
+
+        if precheck:
+            chequeo = check_feasibility(
+                cap_dict, asignaturas_rotaciones, n_estudiantes, min_group, max_group
+            )
+            self.solve_report["precheck"] = chequeo
+            self.solve_report["tiempos"]["precheck"] = round(time.perf_counter() - t_inicio, 4)
+            if not chequeo["factible"]:
+                logger.info(f"GroupOptimizer: infactible sin llamar al solver — {chequeo['mensaje']}")
+                self.solve_report["estado"] = ESTADO_INFACTIBLE
+                self.solve_report["tiempos"]["total"] = self.solve_report["tiempos"]["precheck"]
+                record_timings(self.solve_report["tiempos"])
+                self.model = None
+                self._score_optimo = None
+                self.results = pd.DataFrame()
+                return self.results
+
+        n_entradas = len(cap_dict)
+        if presolve:
+            t_pre = time.perf_counter()
+            cap_dict, reducciones = reduce_problem(
+                cap_dict, _score, n_estudiantes, min_group, max_group
+            )
+            self.solve_report["presolve"] = reducciones
+            self.solve_report["tiempos"]["presolve"] = round(time.perf_counter() - t_pre, 4)
+            if reducciones["rotaciones_vaciadas"]:
+                logger.info(
+                    f"GroupOptimizer: infactible tras presolve — rotaciones sin IPS útiles: "
+                    f"{reducciones['rotaciones_vaciadas']}"
+                )
+                self.solve_report["estado"] = ESTADO_INFACTIBLE
+                self.solve_report["tiempos"]["total"] = round(time.perf_counter() - t_inicio, 4)
+                record_timings(self.solve_report["tiempos"])
+                self.model = None
+                self._score_optimo = None
+                self.results = pd.DataFrame()
+                return self.results
+
+        if mode == "descomposicion":
+            res = self._optimize_descomposicion(
+                scores, cap_dict, asignaturas_rotaciones, n_estudiantes,
+                min_group, max_group, deadline, max_candidates, workers,
+            )
+            record_timings(self.solve_report["tiempos"])
+            return res
+        if mode not in ("monolitico", "portafolio"):
+            raise ValueError(f"Modo de optimización no reconocido: {mode}")
+
         g_max = math.ceil(n_estudiantes / min_group)
 
         ar_pairs = []
@@ -146,6 +374,9 @@ class GroupOptimizer:
                 ips_by_ar[key] = []
             ips_by_ar[key].append(j)
 
+        # Un grupo nunca supera max_group ni el cupo de la IPS
+        y_max = {k: min(max_group, int(cap)) for k, cap in cap_dict.items()}
+
         self.model = LpProblem("Asignacion_Grupos", LpMaximize)
 
         t = {}
@@ -161,13 +392,9 @@ class GroupOptimizer:
                 valid_ips = ips_by_ar.get((a, r), [])
                 for j in valid_ips:
                     x[(g, a, r, j)] = LpVariable(f"x_{g}_{a}_{r}_{j}", cat="Binary")
-                    y[(g, a, r, j)] = LpVariable(f"y_{g}_{a}_{r}_{j}", lowBound=0, cat=LpInteger)
-
-        # Score por (asignatura, IPS) si está disponible; si no, por IPS (compat.)
-        def _score(a, j):
-            if (a, j) in scores:
-                return scores[(a, j)]
-            return scores.get(j, 0.0)
+                    y[(g, a, r, j)] = LpVariable(
+                        f"y_{g}_{a}_{r}_{j}", lowBound=0, upBound=y_max[(a, r, j)], cat=LpInteger
+                    )
 
         # Expresión de calidad (objetivo primario): maximizar score ponderado
         score_expr = lpSum(
@@ -199,7 +426,7 @@ class GroupOptimizer:
                     if (g, a, r, j) not in y:
                         continue
                     self.model += (
-                        y[(g, a, r, j)] <= max_group * x[(g, a, r, j)],
+                        y[(g, a, r, j)] <= y_max[(a, r, j)] * x[(g, a, r, j)],
                         f"BigM_upper_{g}_{a}_{r}_{j}",
                     )
                     self.model += (
@@ -211,6 +438,7 @@ class GroupOptimizer:
                         f"Y_leq_t_{g}_{a}_{r}_{j}",
                     )
 
+        cap_restricciones = {}
         for (a, r) in ar_pairs:
             valid_ips = ips_by_ar.get((a, r), [])
             for j in valid_ips:
@@ -221,10 +449,9 @@ class GroupOptimizer:
                 ]
                 if relevant_y:
                     cap = cap_dict.get((a, r, j), 0)
-                    self.model += (
-                        lpSum(relevant_y) <= cap,
-                        f"Cap_{a}_{r}_{j}",
-                    )
+                    restr = lpSum(relevant_y) <= cap
+                    self.model += (restr, f"Cap_{a}_{r}_{j}")
+                    cap_restricciones[(a, r, j)] = (restr.name, cap)
 
         # ===========================================================
         # OPTIMIZACIÓN LEXICOGRÁFICA EN DOS FASES
@@ -236,36 +463,142 @@ class GroupOptimizer:
         #         una IPS con 14 cupos): a igual calidad, el modelo
         #         prefiere llenar los grupos hasta max_group.
         # ===========================================================
-        solver = PULP_CBC_CMD(msg=self.verbose, timeLimit=time_limit)
+        # Presupuesto de tiempo: `time_limit` es el total de reloj para ambas
+        # fases; la fase 2 usa lo que sobre de la fase 1.
+        report = self.solve_report
+        report["tiempos"]["construccion"] = round(time.perf_counter() - t_inicio, 4)
+        if "presolve" in report:
+            report["presolve"]["variables_sin_presolve"] = 2 * g_max * (n_entradas + 1)
+            report["presolve"]["variables"] = len(self.model.variables())
+
+        if mode == "portafolio":
+            def _solve(model, **kw):
+                return solve_portfolio(model, portfolio_configs, **kw)
+        else:
+            _solve = solve_cbc
+
+        warm = initial_plan is not None and not initial_plan.empty
+        if warm:
+            self._set_initial_values(initial_plan, t, z, x, y)
 
         # ---- Fase 1: calidad ----
-        status = self.model.solve(solver)
-        logger.info(f"GroupOptimizer fase 1 (calidad) status: {LpStatus[status]}")
+        fase1 = _solve(
+            self.model,
+            time_limit=_cbc_limit(_remaining(deadline)),
+            gap_rel=gap_rel,
+            warm_start=warm,
+            verbose=self.verbose,
+        )
+        report["fases"]["fase1"] = fase1
+        report["tiempos"]["fase1"] = fase1["tiempo"]
+        logger.info(f"GroupOptimizer fase 1 (calidad): {fase1['estado']} ({fase1['estado_pulp']})")
 
         # ---- Fase 2: consolidación de grupos ----
-        if LpStatus[status] == "Optimal":
+        fase2 = None
+        if has_incumbent(fase1):
             p_star = pulp_value(score_expr)
-            # Piso de calidad: no perder más que una tolerancia numérica
-            tol = max(1e-4, abs(p_star) * 1e-6) if p_star is not None else 1e-4
-            self.model += (score_expr >= p_star - tol, "Lex_piso_calidad")
-            # Nuevo objetivo: minimizar grupos activos (maximizar su negativo)
-            self.model.setObjective(-lpSum(z[g] for g in range(g_max)))
-            status2 = self.model.solve(solver)
-            logger.info(
-                f"GroupOptimizer fase 2 (consolidación) status: {LpStatus[status2]} | "
-                f"calidad={p_star:.4f} | grupos={int(round(-pulp_value(self.model.objective)))}"
-            )
-            # Guardar la calidad óptima para reportes
             self._score_optimo = p_star
+            fase2 = self._consolidate(self.model, score_expr, z, p_star, _remaining(deadline), _solve)
+            if fase2 is not None:
+                report["fases"]["fase2"] = fase2
+                report["tiempos"]["fase2"] = fase2["tiempo"]
         else:
-            self._score_optimo = pulp_value(score_expr)
+            self._score_optimo = None
 
+        estado = _lex_status(fase1, fase2)
+        report.update({
+            "estado": estado,
+            "estado_fase1": fase1["estado"],
+            "estado_fase2": fase2["estado"] if fase2 is not None else (
+                FASE2_OMITIDA if has_incumbent(fase1) else None
+            ),
+            "optimo_probado": estado == ESTADO_OPTIMO,
+            "objetivo": self._score_optimo,
+            "cota": fase1["cota"],
+            "gap": relative_gap(self._score_optimo, fase1["cota"]),
+            "nodos": fase1["nodos"],
+        })
+
+        self._modelo = {
+            "t": t, "z": z, "x": x, "y": y, "score_expr": score_expr,
+            "g_max": g_max, "ar_pairs": ar_pairs, "ips_by_ar": ips_by_ar,
+            "score_fn": _score, "solve": _solve,
+            "caps": cap_restricciones,
+        }
+
+        t_extraccion = time.perf_counter()
+        self.results = self._extract_results() if has_incumbent(fase1) else pd.DataFrame()
+
+        report["tiempos"]["extraccion"] = round(time.perf_counter() - t_extraccion, 4)
+        report["tiempos"]["total"] = round(time.perf_counter() - t_inicio, 4)
+        logger.info(f"GroupOptimizer: {format_report(report)}")
+        record_timings(report["tiempos"])
+        return self.results
+
+    def _consolidate(
+        self, model, score_expr, z: Dict, calidad: float, restante: Optional[float], solve,
+        piso: float = 1.0,
+    ) -> Optional[Dict]:
+        """Fase 2 sobre `model`: con la calidad fija (piso `calidad`), minimizar los grupos activos.
+
+        Devuelve el reporte de la fase, o None si el presupuesto ya no alcanza
+        (restante < `piso` s). Si CBC no deja solución, las variables vuelven a
+        los valores de la fase 1.
+        """
+        if restante is not None and restante < piso:
+            logger.info("GroupOptimizer fase 2 omitida: presupuesto de tiempo agotado")
+            return None
+        # Se guarda el incumbente de la fase 1 por si la fase 2 no mejora
+        incumbente = {v.name: v.varValue for v in model.variables()}
+        # Piso de calidad: no perder más que una tolerancia numérica
+        tol = max(1e-4, abs(calidad) * 1e-6) if calidad is not None else 1e-4
+        model += (score_expr >= calidad - tol, "Lex_piso_calidad")
+        # Nuevo objetivo: minimizar grupos activos. Se cambia el sentido en
+        # vez de maximizar -Σz porque CBC descarta mejoras sobre el arranque
+        # en caliente cuando el problema es de maximización.
+        model.sense = LpMinimize
+        model.setObjective(lpSum(z.values()))
+        # Arranque en caliente: la solución de fase 1 es factible en fase 2
+        fase2 = solve(model, time_limit=_cbc_limit(restante, piso), warm_start=True, verbose=self.verbose)
+        if not has_incumbent(fase2):
+            for v in model.variables():
+                if v.name in incumbente:
+                    v.varValue = incumbente[v.name]
+        grupos = sum(1 for v in z.values() if (v.value() or 0) > 0.5)
+        logger.info(
+            f"GroupOptimizer fase 2 (consolidación): {fase2['estado']} | "
+            f"calidad={calidad:.4f} | grupos={grupos}"
+        )
+        return fase2
+
+    @staticmethod
+    def _set_initial_values(plan: pd.DataFrame, t: Dict, z: Dict, x: Dict, y: Dict) -> None:
+        """Carga un plan (columnas de get_results) como valores iniciales de las variables."""
+        for var in list(t.values()) + list(z.values()) + list(x.values()) + list(y.values()):
+            var.setInitialValue(0)
+        for row in plan.itertuples(index=False):
+            g = int(row.Grupo) - 1
+            if g not in t:
+                continue
+            t[g].setInitialValue(int(row.Tamano_Grupo))
+            z[g].setInitialValue(1)
+            key = (g, row.Asignatura, row.Rotacion, row.ID_Institucion)
+            if key not in x:
+                key = (g, row.Asignatura, row.Rotacion, str(row.ID_Institucion))
+            if key in x:
+                x[key].setInitialValue(1)
+                y[key].setInitialValue(int(row.Estudiantes))
+
+    def _extract_results(self) -> pd.DataFrame:
+        """Lee grupos y asignaciones de los valores actuales de las variables."""
+        m = self._modelo
+        t, z, y = m["t"], m["z"], m["y"]
         results = []
-        for g in range(g_max):
+        for g in range(m["g_max"]):
             if z[g].value() and z[g].value() > 0.5:
                 group_size = int(round(t[g].value()))
-                for (a, r) in ar_pairs:
-                    valid_ips = ips_by_ar.get((a, r), [])
+                for (a, r) in m["ar_pairs"]:
+                    valid_ips = m["ips_by_ar"].get((a, r), [])
                     for j in valid_ips:
                         if (g, a, r, j) in y and y[(g, a, r, j)].value() and y[(g, a, r, j)].value() > 0:
                             results.append({
@@ -275,22 +608,377 @@ class GroupOptimizer:
                                 "Rotacion": r,
                                 "ID_Institucion": j,
                                 "Estudiantes": int(round(y[(g, a, r, j)].value())),
-                                "Score_IPS": _score(a, j),
+                                "Score_IPS": m["score_fn"](a, j),
                             })
 
+        df = pd.DataFrame(results)
+        if not df.empty:
+            df = df.sort_values(["Grupo", "Asignatura", "Rotacion"]).reset_index(drop=True)
+        return df
+
+    @timed("planes_alternativos")
+    def alternative_plans(
+        self,
+        k: int,
+        time_limit: Optional[float] = None,
+        gap_rel: Optional[float] = None,
+    ) -> List[Dict]:
+        """Los k mejores planes distintos del último modelo monolítico, en orden de calidad.
+
+        El primero es el plan de `optimize`. Dos planes son distintos si usan
+        un conjunto diferente de IPS en alguna (asignatura, rotación): un corte
+        no-good sobre x directamente solo devolvería permutaciones de grupos
+        con la misma calidad. CBC no expone un pool de soluciones, así que cada
+        plan se obtiene reoptimizando con un corte más y arranque en caliente,
+        más la consolidación de grupos de la fase 2.
+        Las IPS descartadas por el presolve (dominadas) no aparecen en ningún
+        plan; para un k-best sobre todas las IPS, optimizar con presolve=False.
+
+        Los cortes y las variables de uso w viven en una copia del modelo: al
+        terminar, el modelo, sus valores (el plan de `optimize`) y el reporte
+        quedan como estaban, así que precios sombra y re-optimización siguen
+        refiriéndose al plan óptimo.
+
+        Parameters:
+        -----------
+        k : número total de planes (incluido el óptimo)
+        time_limit : presupuesto de reloj para todos los planes adicionales;
+            cada plan recibe lo que queda dividido por los planes que faltan y
+            la búsqueda se detiene cuando queda menos de 1 s
+
+        Returns:
+        --------
+        [{"plan", "calidad", "grupos", "estado", "resultados": DataFrame}]
+        """
+        if self._modelo is None or self.results is None or self.results.empty:
+            raise ValueError(
+                "Los planes alternativos requieren una corrida monolítica previa con solución"
+            )
+        m = self._modelo
+        x, z, score_expr, solve = m["x"], m["z"], m["score_expr"], m["solve"]
+        deadline = time.perf_counter() + time_limit if time_limit else None
+
+        planes = [{
+            "plan": 1,
+            "calidad": self._score_optimo,
+            "grupos": int(self.results["Grupo"].nunique()),
+            "estado": self.solve_report["estado"],
+            "resultados": self.results.copy(),
+        }]
+
+        # Copia superficial: comparte variables y restricciones del modelo, pero
+        # los cortes, el objetivo y el sentido que se agregan quedan solo en ella
+        modelo = self.model.copy()
+        incumbente = {v.name: v.varValue for v in self.model.variables()}
+        estado_modelo = (self.model.status, self.model.sol_status)
+
+        # w[a, r, j] = 1 si la IPS j recibe algún grupo en (a, r)
+        w = {}
+        for (a, r), ips in m["ips_by_ar"].items():
+            for j in ips:
+                xs = [x[(g, a, r, j)] for g in range(m["g_max"]) if (g, a, r, j) in x]
+                w[(a, r, j)] = LpVariable(f"w_{a}_{r}_{j}", cat="Binary")
+                modelo += w[(a, r, j)] <= lpSum(xs), f"Uso_sup_{a}_{r}_{j}"
+                for xv in xs:
+                    modelo += xv <= w[(a, r, j)], f"Uso_inf_{xv.name}"
+
+        def _usadas(df: pd.DataFrame) -> set:
+            return set(zip(df["Asignatura"], df["Rotacion"], df["ID_Institucion"]))
+
+        for v in w.values():
+            v.varValue = 0
+        for key in _usadas(self.results):
+            w[key].varValue = 1
+
+        try:
+            corte = 0
+            while len(planes) < k:
+                restante = _remaining(deadline)
+                if restante is not None and restante < 1:
+                    logger.info("Planes alternativos: presupuesto de tiempo agotado")
+                    break
+                # Cada plan recibe una parte de lo que queda: uno difícil no
+                # consume el presupuesto de los siguientes
+                parte = restante / (k - len(planes)) if restante is not None else None
+                fin_plan = time.perf_counter() + parte if parte is not None else None
+
+                usadas = _usadas(planes[-1]["resultados"])
+                modelo += (
+                    lpSum(1 - v for key, v in w.items() if key in usadas)
+                    + lpSum(v for key, v in w.items() if key not in usadas) >= 1,
+                    f"No_good_{corte}",
+                )
+                corte += 1
+
+                # Fase 1 sin el piso de calidad del plan anterior
+                if "Lex_piso_calidad" in modelo.constraints:
+                    del modelo.constraints["Lex_piso_calidad"]
+                modelo.sense = LpMaximize
+                modelo.setObjective(score_expr)
+                fase1 = solve(modelo, time_limit=_cbc_limit(_remaining(fin_plan)), gap_rel=gap_rel,
+                              warm_start=True, verbose=self.verbose)
+                if fase1["estado"] == ESTADO_INFACTIBLE:
+                    logger.info("Planes alternativos: no hay más planes distintos")
+                    break
+                if not has_incumbent(fase1):
+                    logger.info(f"Planes alternativos: sin plan en el tiempo asignado ({fase1['estado']})")
+                    break
+                calidad = pulp_value(score_expr)
+                fase2 = self._consolidate(modelo, score_expr, z, calidad, _remaining(fin_plan), solve)
+
+                resultados = self._extract_results()
+                planes.append({
+                    "plan": len(planes) + 1,
+                    "calidad": calidad,
+                    "grupos": int(resultados["Grupo"].nunique()),
+                    "estado": _lex_status(fase1, fase2),
+                    "resultados": resultados,
+                })
+                logger.info(
+                    f"Plan alternativo {len(planes)}: calidad={calidad:.4f} | "
+                    f"grupos={planes[-1]['grupos']} | {planes[-1]['estado']}"
+                )
+        finally:
+            # Las variables son compartidas con la copia: vuelven al plan de optimize
+            for v in self.model.variables():
+                if v.name in incumbente:
+                    v.varValue = incumbente[v.name]
+            self.model.status, self.model.sol_status = estado_modelo
+
+        return planes
+
+    @timed("reoptimizacion_pesos")
+    def update_scores(
+        self,
+        scores: dict,
+        time_limit: Optional[float] = 1.0,
+        gap_rel: Optional[float] = None,
+    ) -> pd.DataFrame:
+        """Re-optimiza el último modelo monolítico con otros scores (p. ej. otros pesos).
+
+        Solo se reescribe el objetivo de calidad: variables y restricciones se
+        reutilizan y CBC arranca en caliente desde el plan actual, que sigue
+        siendo factible. Con un time_limit corto se obtiene, como mínimo, ese
+        plan evaluado con los scores nuevos; el reporte indica si se probó el
+        óptimo.
+
+        El presolve elimina IPS dominadas según los scores originales; para
+        explorar pesos, construir el modelo con presolve=False.
+
+        Parameters:
+        -----------
+        scores : {(asignatura, IPS): score} o {IPS: score}, como en optimize
+        time_limit : presupuesto de reloj para ambas fases
+        """
+        if self._modelo is None or self.results is None or self.results.empty:
+            raise ValueError("La re-optimización requiere una corrida monolítica previa con solución")
+        t_inicio = time.perf_counter()
+        deadline = t_inicio + time_limit if time_limit else None
+        m = self._modelo
+        y, z, solve = m["y"], m["z"], m["solve"]
+
+        def _score(a, j):
+            if (a, j) in scores:
+                return scores[(a, j)]
+            return scores.get(j, 0.0)
+
+        score_expr = lpSum(_score(a, j) * var for (g, a, r, j), var in y.items())
+        m["score_expr"], m["score_fn"] = score_expr, _score
+
+        if "Lex_piso_calidad" in self.model.constraints:
+            del self.model.constraints["Lex_piso_calidad"]
+        # Los valores actuales de las variables (el plan vigente) son el arranque
+        self.model.sense = LpMaximize
+        self.model.setObjective(score_expr)
+
+        self.solve_report = report = new_report(time_limit, gap_rel)
+        # Sin el piso de 1 s de _cbc_limit: el ajuste interactivo puede pedir menos
+        fase1 = solve(self.model, time_limit=time_limit, gap_rel=gap_rel,
+                      warm_start=True, verbose=self.verbose)
+        report["fases"]["fase1"] = fase1
+        report["tiempos"]["fase1"] = fase1["tiempo"]
+        if not has_incumbent(fase1):
+            report["estado"] = fase1["estado"]
+            record_timings(report["tiempos"])
+            self._score_optimo = None
+            self.results = pd.DataFrame()
+            return self.results
+
+        self._score_optimo = p_star = pulp_value(score_expr)
+        # El ajuste interactivo trabaja con presupuestos de ~1 s: la fase 2
+        # corre si quedan al menos PISO_INTERACTIVO segundos
+        fase2 = self._consolidate(
+            self.model, score_expr, z, p_star, _remaining(deadline), solve, piso=PISO_INTERACTIVO
+        )
+        if fase2 is not None:
+            report["fases"]["fase2"] = fase2
+            report["tiempos"]["fase2"] = fase2["tiempo"]
+
+        estado = _lex_status(fase1, fase2)
+        report.update({
+            "estado": estado,
+            "estado_fase1": fase1["estado"],
+            "estado_fase2": fase2["estado"] if fase2 is not None else FASE2_OMITIDA,
+            "optimo_probado": estado == ESTADO_OPTIMO,
+            "objetivo": p_star,
+            "cota": fase1["cota"],
+            "gap": relative_gap(p_star, fase1["cota"]),
+            "nodos": fase1["nodos"],
+        })
+        self.results = self._extract_results()
+        report["tiempos"]["total"] = round(time.perf_counter() - t_inicio, 4)
+        logger.info(f"GroupOptimizer (scores actualizados): {format_report(report)}")
+        record_timings(report["tiempos"])
+        return self.results
+
+    @timed("precios_sombra")
+    def capacity_shadow_prices(self, metodo: str = METODO_RELAJACION) -> pd.DataFrame:
+        """Precio sombra de cada cupo (a, r, j): calidad marginal por cupo adicional.
+
+        Una sola LP sobre el último modelo monolítico, con el objetivo de calidad:
+        - "relajacion": relajación LP completa. Responde cuánto vale un cupo
+          más si los grupos pudieran redistribuirse libremente.
+        - "enteros_fijos": se fijan grupos activos (z) y asignaciones (x) del
+          plan actual y solo se relajan tamaños (t, y). Responde cuánto vale
+          un cupo más manteniendo el plan, agrandando sus grupos.
+
+        Las IPS descartadas por el presolve no tienen restricción de cupo y no
+        aparecen; "Cupo" es el cupo efectivo usado en el modelo.
+        """
+        if self._modelo is None or self.results is None or self.results.empty:
+            return pd.DataFrame()
+        m = self._modelo
+        fijar = None
+        extra = []
+        if metodo == METODO_RELAJACION:
+            # Desigualdad válida: cada grupo activo reparte exactamente t[g]
+            # estudiantes en cada rotación. Sin ella las BigM relajadas no
+            # ligan y con t y los duales no significan nada.
+            for g in range(m["g_max"]):
+                for (a, r) in m["ar_pairs"]:
+                    ys = [m["y"][(g, a, r, j)] for j in m["ips_by_ar"].get((a, r), [])
+                          if (g, a, r, j) in m["y"]]
+                    if ys:
+                        extra.append((f"Reparto_{g}_{a}_{r}", lpSum(ys) == m["t"][g]))
+        elif metodo == METODO_ENTEROS_FIJOS:
+            fijar = {
+                v.name: round(v.varValue or 0)
+                for v in list(m["x"].values()) + list(m["z"].values())
+            }
+        else:
+            raise ValueError(f"Método de precios sombra no reconocido: {metodo}")
+
+        duales = capacity_duals(
+            self.model,
+            m["score_expr"],
+            {k: nombre for k, (nombre, _) in m["caps"].items()},
+            descartar=("Lex_piso",),
+            fijar=fijar,
+            extra=extra,
+        )
+        uso = self.results.groupby(["Asignatura", "Rotacion", "ID_Institucion"])["Estudiantes"].sum()
+        filas = []
+        for (a, r, j), (_, cap) in m["caps"].items():
+            if (a, r, j) not in duales:
+                continue
+            filas.append({
+                "Asignatura": a,
+                "Rotacion": r,
+                "ID_Institucion": j,
+                "Cupo": cap,
+                "Uso": int(uso.get((a, r, j), 0)),
+                "Score_IPS": m["score_fn"](a, j),
+                "Precio_Sombra": duales[(a, r, j)]["precio_sombra"],
+            })
+        df = pd.DataFrame(filas)
+        if not df.empty:
+            df = df.sort_values(
+                ["Precio_Sombra", "Asignatura", "Rotacion"], ascending=[False, True, True]
+            ).reset_index(drop=True)
+        return df
+
+    def _optimize_descomposicion(
+        self,
+        scores: dict,
+        cap_dict: dict,
+        asignaturas_rotaciones: dict,
+        n_estudiantes: int,
+        min_group: int,
+        max_group: int,
+        deadline: Optional[float],
+        max_candidates: Optional[int],
+        workers: Optional[int],
+    ) -> pd.DataFrame:
+        """Resuelve por descomposición: tamaños de grupo → rotaciones independientes."""
+        t_inicio = time.perf_counter()
+        ar_pairs = [(a, r) for a, rots in asignaturas_rotaciones.items() for r in rots]
+
+        def _score(a, j):
+            if (a, j) in scores:
+                return scores[(a, j)]
+            return scores.get(j, 0.0)
+
+        self.model = None
+        sol = solve_decomposed(
+            _score, cap_dict, ar_pairs, n_estudiantes, min_group, max_group,
+            max_candidates=max_candidates, workers=workers, deadline=deadline,
+        )
+        report = self.solve_report
+        if sol["sizes"] is None:
+            estado = ESTADO_INFACTIBLE if sol["completo"] else ESTADO_SIN_SOLUCION
+        elif sol["completo"]:
+            estado = ESTADO_OPTIMO
+        else:
+            estado = ESTADO_LIMITE
+        # La cota de la descomposición es la relajación continua por rotación;
+        # solo es "probada" cuando se agotan los candidatos o se alcanza.
+        report.update({
+            "estado": estado,
+            "optimo_probado": estado == ESTADO_OPTIMO,
+            "objetivo": sol["calidad"],
+            "cota": sol["calidad"] if estado == ESTADO_OPTIMO else sol["cota_superior"],
+            "gap": relative_gap(sol["calidad"], sol["calidad"] if estado == ESTADO_OPTIMO else sol["cota_superior"]),
+            "candidatos_evaluados": sol["candidatos_evaluados"],
+            "candidatos_totales": sol["candidatos_totales"],
+        })
+        report["tiempos"]["descomposicion"] = round(time.perf_counter() - t_inicio, 4)
+        report["tiempos"]["total"] = report["tiempos"]["descomposicion"]
+
+        self._score_optimo = sol["calidad"]
+        if sol["sizes"] is None:
+            logger.info("GroupOptimizer descomposición: ningún vector de tamaños es factible")
+            self.results = pd.DataFrame()
+            return self.results
+
+        results = []
+        for (a, r), ips_por_grupo in sol["asignacion"].items():
+            for g, j in enumerate(ips_por_grupo):
+                results.append({
+                    "Grupo": g + 1,
+                    "Tamano_Grupo": sol["sizes"][g],
+                    "Asignatura": a,
+                    "Rotacion": r,
+                    "ID_Institucion": j,
+                    "Estudiantes": sol["sizes"][g],
+                    "Score_IPS": _score(a, j),
+                })
+
         self.results = pd.DataFrame(results)
         if not self.results.empty:
             self.results = self.results.sort_values(
                 ["Grupo", "Asignatura", "Rotacion"]
             ).reset_index(drop=True)
-
         return self.results
 
     def get_objective_value(self) -> float:
-        # Tras la fase 2 el objetivo del modelo es -Σz (nº de grupos),
+        # Tras la fase 2 el objetivo del modelo es Σz (nº de grupos),
         # por lo que devolvemos la calidad óptima guardada en fase 1.
         return getattr(self, "_score_optimo", None)
 
+    def get_solve_report(self) -> Optional[Dict]:
+        """Reporte de la última corrida (estado, incumbente, cota, gap, nodos, tiempos)."""
+        return self.solve_report
+
     def get_groups_summary(self) -> pd.DataFrame:
         if self.results is None or self.results.empty:
             return pd.DataFrame()
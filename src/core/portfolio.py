@@ -0,0 +1,248 @@
+"""
+Portafolio de solvers: carrera de configuraciones en procesos paralelos
+
+El mismo modelo se resuelve a la vez con varias configuraciones (solver,
+semilla, cortes). La primera que prueba el óptimo (o que el modelo es
+infactible) gana y el resto de los procesos se detiene. Si ninguna lo prueba dentro del tiempo, se usa el
+mejor incumbente disponible.
+"""
+
+import os
+import time
+import queue
+import signal
+import logging
+import multiprocessing as mp
+from typing import Dict, List, Optional
+
+from pulp import LpProblem, LpMaximize, listSolvers, getSolver, LpStatus, value as pulp_value
+
+from .solve_report import (
+    ESTADO_OPTIMO, ESTADO_GAP, ESTADO_INFACTIBLE, ESTADO_SIN_SOLUCION,
+    _estado, has_incumbent, solve_cbc,
+)
+
+logger = logging.getLogger(__name__)
+
+CBC = "PULP_CBC_CMD"
+
+# Configuraciones por defecto. "opciones" se pasa al constructor del solver.
+# Las de solvers no instalados se descartan al lanzar la carrera.
+PORTAFOLIO_DEFAULT: List[Dict] = [
+    {"nombre": "cbc", "solver": CBC, "opciones": {}},
+    {"nombre": "cbc_semilla_7", "solver": CBC,
+     "opciones": {"options": ["randomCbcSeed 7", "randomSeed 7"]}},
+    {"nombre": "cbc_sin_cortes", "solver": CBC, "opciones": {"cuts": False}},
+    {"nombre": "cbc_cortes_branching_fuerte", "solver": CBC,
+     "opciones": {"cuts": True, "strong": 10}},
+    {"nombre": "highs", "solver": "HiGHS_CMD", "opciones": {}},
+]
+
+# Margen sobre time_limit antes de dar por perdido a un proceso
+_MARGEN_ESPERA = 5.0
+
+
+def available_configs(configs: Optional[List[Dict]] = None) -> List[Dict]:
+    """Filtra las configuraciones cuyo solver está instalado."""
+    disponibles = set(listSolvers(onlyAvailable=True))
+    return [c for c in (configs or PORTAFOLIO_DEFAULT) if c.get("solver", CBC) in disponibles]
+
+
+def _solve_config(
+    model: LpProblem,
+    config: Dict,
+    time_limit: Optional[float],
+    gap_rel: Optional[float],
+    warm_start: bool,
+) -> Dict:
+    """Resuelve `model` con una configuración y devuelve el reporte de la fase."""
+    solver = config.get("solver", CBC)
+    opciones = dict(config.get("opciones", {}))
+    if solver == CBC:
+        return solve_cbc(model, time_limit=time_limit, gap_rel=gap_rel,
+                         warm_start=warm_start, **opciones)
+
+    # Otros solvers: el estado sale de PuLP, sin cota ni nodos
+    t0 = time.perf_counter()
+    model.solve(getSolver(solver, msg=False, timeLimit=time_limit, gapRel=gap_rel,
+                          warmStart=warm_start, **opciones))
+    objetivo = pulp_value(model.objective) if model.sol_status in (1, 2) else None
+    return {
+        "estado": _estado(model, {}, None, gap_rel),
+        "estado_pulp": LpStatus[model.status],
+        "objetivo": objetivo,
+        "cota": objetivo if model.sol_status == 1 else None,
+        "gap": 0.0 if model.sol_status == 1 else None,
+        "nodos": None,
+        "iteraciones": None,
+        "resultado_cbc": None,
+        "tiempo": round(time.perf_counter() - t0, 4),
+    }
+
+
+def _worker(idx: int, data: Dict, config: Dict, time_limit, gap_rel, warm_start, cola) -> None:
+    """Proceso de la carrera: reconstruye el modelo, lo resuelve y publica el resultado."""
+    # Grupo de procesos propio para poder detener también al solver hijo
+    if hasattr(os, "setsid"):
+        os.setsid()
+    try:
+        _, model = LpProblem.from_dict(data)
+        fase = _solve_config(model, config, time_limit, gap_rel, warm_start)
+        valores = (
+            {v.name: v.varValue for v in model.variables()} if has_incumbent(fase) else {}
+        )
+        cola.put((idx, {
+            "fase": fase,
+            "status": model.status,
+            "sol_status": model.sol_status,
+            "valores": valores,
+        }))
+    except Exception as e:  # el error se reporta; la carrera sigue con los demás
+        cola.put((idx, {"error": f"{type(e).__name__}: {e}"}))
+
+
+def _stop(proc) -> None:
+    """Detiene un proceso de la carrera junto con el solver que lanzó."""
+    if not proc.is_alive():
+        proc.join(0)
+        return
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        proc.kill()
+    proc.join(1)
+
+
+def _mejor(resultados: Dict[int, Dict], maximizar: bool) -> Optional[int]:
+    """Índice del mejor incumbente entre los resultados terminados."""
+    con_sol = [
+        i for i, r in resultados.items()
+        if "fase" in r and has_incumbent(r["fase"]) and r["fase"]["objetivo"] is not None
+    ]
+    if not con_sol:
+        return None
+    signo = 1 if maximizar else -1
+    return max(con_sol, key=lambda i: signo * resultados[i]["fase"]["objetivo"])
+
+
+def solve_portfolio(
+    model: LpProblem,
+    configs: Optional[List[Dict]] = None,
+    time_limit: Optional[float] = None,
+    gap_rel: Optional[float] = None,
+    warm_start: bool = False,
+    verbose: bool = False,
+) -> Dict:
+    """Resuelve `model` con una carrera de configuraciones en procesos paralelos.
+
+    Gana la primera configuración que prueba el óptimo (o alcanza `gap_rel`)
+    o que prueba que el modelo es infactible; los demás procesos se detienen. Los valores ganadores se cargan en las
+    variables de `model`, igual que tras `model.solve`.
+
+    Returns:
+    --------
+    Reporte de la fase (mismas claves que solve_cbc) más "portafolio":
+    {"ganador", "corridas": [{config, estado, objetivo, tiempo}], "canceladas"}
+    """
+    configs = available_configs(configs)
+    if not configs:
+        raise ValueError("Ninguna configuración del portafolio tiene su solver instalado")
+
+    data = model.to_dict()
+    ctx = mp.get_context()
+    cola = ctx.Queue()
+    procs = []
+    t0 = time.perf_counter()
+    for i, config in enumerate(configs):
+        p = ctx.Process(
+            target=_worker,
+            args=(i, data, config, time_limit, gap_rel, warm_start, cola),
+            daemon=True,
+        )
+        p.start()
+        procs.append(p)
+    logger.info(f"Portafolio: {len(procs)} configuraciones en carrera ({[c['nombre'] for c in configs]})")
+
+    limite_espera = time_limit + _MARGEN_ESPERA if time_limit else None
+    resultados: Dict[int, Dict] = {}
+    ganador = None
+    while len(resultados) < len(procs):
+        transcurrido = time.perf_counter() - t0
+        if limite_espera is not None and transcurrido >= limite_espera:
+            break
+        try:
+            idx, res = cola.get(timeout=0.2)
+        except queue.Empty:
+            if not any(p.is_alive() for p in procs) and cola.empty():
+                break
+            continue
+        res["tiempo_carrera"] = round(time.perf_counter() - t0, 4)
+        resultados[idx] = res
+        if "error" in res:
+            logger.warning(f"Portafolio: {configs[idx]['nombre']} falló — {res['error']}")
+            continue
+        if res["fase"]["estado"] in (ESTADO_OPTIMO, ESTADO_GAP, ESTADO_INFACTIBLE):
+            ganador = idx
+            break
+
+    canceladas = [configs[i]["nombre"] for i, p in enumerate(procs) if i not in resultados]
+    for p in procs:
+        _stop(p)
+    cola.close()
+
+    if ganador is None:
+        ganador = _mejor(resultados, model.sense == LpMaximize)
+
+    corridas = []
+    for i, config in enumerate(configs):
+        res = resultados.get(i)
+        if res is None:
+            corridas.append({"config": config["nombre"], "estado": "cancelada",
+                             "objetivo": None, "tiempo": None})
+        elif "error" in res:
+            corridas.append({"config": config["nombre"], "estado": "error",
+                             "objetivo": None, "tiempo": res["tiempo_carrera"]})
+        else:
+            corridas.append({"config": config["nombre"], "estado": res["fase"]["estado"],
+                             "objetivo": res["fase"]["objetivo"], "tiempo": res["tiempo_carrera"]})
+
+    elapsed = round(time.perf_counter() - t0, 4)
+    resumen = {
+        "ganador": configs[ganador]["nombre"] if ganador is not None else None,
+        "corridas": corridas,
+        "canceladas": canceladas,
+    }
+    if verbose:
+        logger.debug(f"Portafolio: {resumen}")
+
+    if ganador is None:
+        logger.info(f"Portafolio: ninguna configuración dejó solución en {elapsed:.2f}s")
+        return {
+            "estado": ESTADO_SIN_SOLUCION,
+            "estado_pulp": "Not Solved",
+            "objetivo": None,
+            "cota": None,
+            "gap": None,
+            "nodos": None,
+            "iteraciones": None,
+            "resultado_cbc": None,
+            "tiempo": elapsed,
+            "portafolio": resumen,
+        }
+
+    res = resultados[ganador]
+    for v in model.variables():
+        v.varValue = res["valores"].get(v.name)
+    model.status = res["status"]
+    model.sol_status = res["sol_status"]
+    logger.info(
+        f"Portafolio: gana {resumen['ganador']} ({res['fase']['estado']}) en {elapsed:.2f}s | "
+        f"canceladas={len(canceladas)}"
+    )
+    fase = dict(res["fase"])
+    fase["tiempo"] = elapsed
+    fase["portafolio"] = resumen
+    return fase
@@ -0,0 +1,198 @@
+"""
+Presolve del modelo por grupos: factibilidad y reducciones sin llamar al solver
+"""
+
+import math
+import logging
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _cargas_posibles(cupo: int, n_estudiantes: int, min_group: int, max_group: int) -> List[int]:
+    """Cargas que una IPS puede recibir: 0 o la suma de k grupos de [min, max].
+
+    k grupos suman cualquier valor en [k·min, k·max], así que basta con la
+    unión de esos intervalos acotada por el cupo y por la demanda.
+    """
+    tope = min(cupo, n_estudiantes)
+    cargas = {0}
+    for k in range(1, tope // min_group + 1):
+        cargas.update(range(k * min_group, min(k * max_group, tope) + 1))
+    return sorted(cargas)
+
+
+def max_alojable(
+    cupos: List[int], n_estudiantes: int, min_group: int, max_group: int
+) -> int:
+    """Mayor número de estudiantes (≤ n) que las IPS pueden alojar en grupos completos.
+
+    DP exacta de suma de subconjuntos sobre las cargas posibles de cada IPS,
+    usando un entero como bitset (bit h = se pueden alojar h estudiantes).
+    """
+    mask = (1 << (n_estudiantes + 1)) - 1
+    reach = 1
+    for cupo in cupos:
+        nuevo = 0
+        for h in _cargas_posibles(cupo, n_estudiantes, min_group, max_group):
+            nuevo |= reach << h
+        reach = nuevo & mask
+        if reach >> n_estudiantes & 1:
+            return n_estudiantes
+    return reach.bit_length() - 1
+
+
+def check_feasibility(
+    cap_dict: Dict,
+    asignaturas_rotaciones: Dict,
+    n_estudiantes: int,
+    min_group: int,
+    max_group: int,
+) -> Dict:
+    """Verifica, por (asignatura, rotación), si los cupos alojan a n estudiantes en grupos.
+
+    Para cada rotación la respuesta es exacta: existe un reparto en grupos de
+    [min_group, max_group] que cabe en los cupos de sus IPS. Todas las rotaciones
+    comparten los mismos grupos, por lo que la factibilidad por rotación es una
+    condición necesaria del modelo completo.
+
+    Returns:
+    --------
+    {"factible": bool, "mensaje": str, "rotaciones": [ {Asignatura, Rotacion,
+     N_IPS, Cupo_Total, Max_Alojable, Demanda, Factible} ], "cuello_botella": dict | None}
+
+    "factible" = False prueba que el modelo es infactible; True solo dice que
+    ninguna rotación por separado lo impide (la factibilidad conjunta la
+    decide el solver).
+    """
+    k_min = math.ceil(n_estudiantes / max_group) if max_group > 0 else 0
+    k_max = n_estudiantes // min_group if min_group > 0 else 0
+    if min_group <= 0 or max_group < min_group or k_min > k_max:
+        return {
+            "factible": False,
+            "mensaje": (
+                f"{n_estudiantes} estudiantes no se pueden dividir en grupos de "
+                f"{min_group}–{max_group}"
+            ),
+            "rotaciones": [],
+            "cuello_botella": None,
+        }
+
+    cupos_by_ar: Dict = {}
+    for (a, r, j), cupo in cap_dict.items():
+        cupos_by_ar.setdefault((a, r), []).append(int(cupo))
+
+    filas = []
+    for asig, rots in asignaturas_rotaciones.items():
+        for rot in rots:
+            cupos = cupos_by_ar.get((asig, rot), [])
+            if not cupos:
+                # El modelo ignora rotaciones sin IPS (se avisan aparte)
+                continue
+            alojable = max_alojable(cupos, n_estudiantes, min_group, max_group)
+            filas.append({
+                "Asignatura": asig,
+                "Rotacion": rot,
+                "N_IPS": len(cupos),
+                "Cupo_Total": sum(cupos),
+                "Max_Alojable": alojable,
+                "Demanda": n_estudiantes,
+                "Factible": alojable >= n_estudiantes,
+            })
+
+    infactibles = [f for f in filas if not f["Factible"]]
+    cuello = min(infactibles, key=lambda f: f["Max_Alojable"]) if infactibles else None
+    if cuello is None:
+        mensaje = (
+            f"ninguna de las {len(filas)} rotaciones, por separado, impide alojar a "
+            f"{n_estudiantes} estudiantes (condición necesaria, no suficiente)"
+        )
+    else:
+        mensaje = (
+            f"{cuello['Asignatura']} / {cuello['Rotacion']} solo aloja "
+            f"{cuello['Max_Alojable']} de {n_estudiantes} estudiantes en grupos de "
+            f"{min_group}–{max_group} (cupo total {cuello['Cupo_Total']} en "
+            f"{cuello['N_IPS']} IPS)"
+        )
+        if len(infactibles) > 1:
+            mensaje += f"; {len(infactibles) - 1} rotación(es) más también son insuficientes"
+    logger.info(f"Chequeo de factibilidad: {mensaje}")
+    return {
+        "factible": cuello is None,
+        "mensaje": mensaje,
+        "rotaciones": filas,
+        "cuello_botella": cuello,
+    }
+
+
+def reduce_problem(
+    cap_dict: Dict,
+    scores_fn,
+    n_estudiantes: int,
+    min_group: int,
+    max_group: int,
+) -> Tuple[Dict, Dict]:
+    """Reducciones exactas sobre {(a, r, j): cupo} antes de construir el MILP.
+
+    1. El cupo se recorta a la mayor carga alcanzable con grupos completos
+       (≤ n_estudiantes); si queda en 0 la IPS nunca recibe un grupo y se descarta.
+    2. Dominancia: en una rotación, si la IPS k aloja a todos (cupo ≥ n) y su
+       score es ≥ al de j, cualquier grupo en j puede moverse a k sin perder
+       calidad ni cambiar el número de grupos, así que j sobra. Esto colapsa
+       las IPS equivalentes (mismo score y cupo suficiente) en una sola.
+
+    No se suman cupos de sedes distintas: un grupo no puede repartirse entre
+    dos IPS, así que esa agregación no sería exacta.
+
+    Returns:
+    --------
+    (cap_dict reducido, reporte de reducciones)
+    """
+    ajustados = 0
+    bajo_minimo = 0
+    efectivo: Dict = {}
+    for (a, r, j), cupo in cap_dict.items():
+        cargas = _cargas_posibles(int(cupo), n_estudiantes, min_group, max_group)
+        cap_ef = cargas[-1]
+        if cap_ef == 0:
+            bajo_minimo += 1
+            continue
+        if cap_ef != cupo:
+            ajustados += 1
+        efectivo[(a, r, j)] = cap_ef
+
+    by_ar: Dict = {}
+    for (a, r, j), cap in efectivo.items():
+        by_ar.setdefault((a, r), []).append((j, cap, float(scores_fn(a, j))))
+
+    reducido: Dict = {}
+    dominadas = 0
+    vaciadas = sorted({(a, r) for (a, r, _) in cap_dict} - set(by_ar))
+    for (a, r), ips in by_ar.items():
+        # Mejor IPS que aloja a todos: mayor score y, a igual score, ID estable
+        completas = [e for e in ips if e[1] >= n_estudiantes]
+        if completas:
+            k = max(completas, key=lambda e: (e[2], e[1], e[0]))
+            for j, cap, score in ips:
+                if j != k[0] and score <= k[2]:
+                    dominadas += 1
+                    continue
+                reducido[(a, r, j)] = cap
+        else:
+            for j, cap, _ in ips:
+                reducido[(a, r, j)] = cap
+
+    reporte = {
+        "entradas_originales": len(cap_dict),
+        "entradas_finales": len(reducido),
+        "descartadas_cupo_bajo_minimo": bajo_minimo,
+        "dominadas": dominadas,
+        "cupos_ajustados": ajustados,
+        # Rotaciones que se quedan sin IPS: el problema es infactible
+        "rotaciones_vaciadas": vaciadas,
+    }
+    logger.info(
+        f"Presolve: {len(cap_dict)} → {len(reducido)} (a, r, IPS) | "
+        f"cupo < grupo mínimo={bajo_minimo} | dominadas={dominadas} | cupos ajustados={ajustados}"
+    )
+    return reducido, reporte
@@ -0,0 +1,233 @@
+"""
+Robustez Monte Carlo del plan por grupos
+
+Se muestrean vectores de pesos (alrededor de los del set) y cupos (alrededor
+de los de 06_Rotaciones), se recalculan los scores de todas las muestras de
+una vez como producto matricial y las muestras se resuelven en un pool de
+procesos. Por defecto cada muestra usa el modo por descomposición (vector de
+tamaños fijo y rotaciones por separado, src/core/decomposition.py), que llega
+al mismo óptimo que el MILP monolítico en una fracción del tiempo: con
+cientos de muestras, el monolítico pasa la mayor parte del presupuesto en la
+fase 2. El resultado es, por (asignatura, IPS), la fracción de muestras en las
+que la IPS recibe estudiantes.
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .optimizer import GroupOptimizer
+from .solve_report import ESTADO_OPTIMO, ESTADO_GAP, ESTADO_LIMITE
+
+logger = logging.getLogger(__name__)
+
+
+def sample_weights(
+    weights: Dict[str, float],
+    n_muestras: int,
+    concentracion: float,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Muestras de pesos Dirichlet(concentracion · w): media w, suma 1, ceros intactos.
+
+    Returns:
+    --------
+    Matriz (n_muestras × n_criterios) en el orden de `weights`.
+    """
+    w = np.array(list(weights.values()), dtype=float)
+    activos = w > 0
+    out = np.zeros((n_muestras, len(w)))
+    if activos.any():
+        out[:, activos] = rng.dirichlet(concentracion * w[activos], size=n_muestras)
+    return out
+
+
+def sample_capacities(
+    cap_dict: Dict,
+    n_muestras: int,
+    variacion: float,
+    rng: np.random.Generator,
+) -> List[Dict]:
+    """Cupos perturbados uniformemente en ±variacion (redondeados, ≥ 0)."""
+    claves = list(cap_dict.keys())
+    base = np.array([cap_dict[k] for k in claves], dtype=float)
+    factores = rng.uniform(1 - variacion, 1 + variacion, size=(n_muestras, len(claves)))
+    cupos = np.maximum(0, np.rint(base * factores)).astype(int)
+    return [
+        {k: int(c) for k, c in zip(claves, fila) if c > 0}
+        for fila in cupos
+    ]
+
+
+def score_samples(criterios: pd.DataFrame, pesos: np.ndarray) -> np.ndarray:
+    """Scores de todas las muestras a la vez.
+
+    Parameters:
+    -----------
+    criterios : matriz IPS × criterio (s_k normalizado), columnas en el orden de los pesos
+    pesos : (n_muestras × n_criterios)
+
+    Returns:
+    --------
+    (n_muestras × n_ips), redondeado a 4 decimales como el score por set.
+    """
+    return np.round(pesos @ criterios.values.T, 4)
+
+
+def _resolver_muestra(args) -> Dict:
+    """Resuelve una muestra en un proceso del pool."""
+    idx, kwargs, plan_base = args
+    opt = GroupOptimizer(verbose=False)
+    res = opt.optimize(**kwargs, initial_plan=plan_base)
+    rep = opt.get_solve_report() or {}
+    asignaciones = []
+    if res is not None and not res.empty:
+        asignaciones = (
+            res.groupby(["Asignatura", "ID_Institucion"])["Estudiantes"].sum().reset_index()
+            .itertuples(index=False, name=None)
+        )
+    return {
+        "muestra": idx,
+        "estado": rep.get("estado"),
+        "calidad": opt.get_objective_value(),
+        "asignaciones": list(asignaciones),
+    }
+
+
+def robustness_analysis(
+    criterios: pd.DataFrame,
+    weights_by_set: Dict[str, Dict[str, float]],
+    set_by_asig: Dict[str, str],
+    cap_dict: Dict,
+    asignaturas_rotaciones: Dict,
+    n_estudiantes: int,
+    min_group: int,
+    max_group: int,
+    n_muestras: int = 200,
+    concentracion: float = 50.0,
+    variacion_cupos: float = 0.2,
+    plan_base: Optional[pd.DataFrame] = None,
+    time_limit: Optional[float] = 5,
+    gap_rel: Optional[float] = None,
+    mode: str = "descomposicion",
+    workers: Optional[int] = None,
+    seed: Optional[int] = 0,
+) -> Dict:
+    """Frecuencia con que cada IPS recibe estudiantes de cada asignatura bajo incertidumbre.
+
+    Parameters:
+    -----------
+    criterios : matriz IPS × criterio (ver _criteria_matrix en app.py); debe
+        contener todas las IPS de cap_dict y los criterios de todos los sets
+    weights_by_set : {set_id: {criterio: peso}} de los sets en uso
+    set_by_asig : {asignatura: set_id}
+    concentracion : concentración de la Dirichlet de pesos (mayor = menos dispersión)
+    variacion_cupos : variación relativa máxima de cada cupo (0.2 = ±20%)
+    plan_base : plan actual; marca En_Plan_Base y, en los modos con MILP
+        único, es el arranque en caliente de cada muestra
+    time_limit, gap_rel, mode : como en GroupOptimizer.optimize, por muestra
+    workers : procesos del pool (None = núcleos disponibles)
+
+    Returns:
+    --------
+    {"frecuencias": DataFrame [Asignatura, ID_Institucion, Frecuencia,
+      Cupos_Usados_Medio, En_Plan_Base], "muestras": DataFrame [muestra, estado,
+      calidad], "resumen": dict}. Cupos_Usados_Medio suma las rotaciones de la
+    asignatura en la IPS (un estudiante en dos rotaciones usa dos cupos).
+    """
+    t0 = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    ips = list(criterios.index)
+    asigs = list(asignaturas_rotaciones.keys())
+
+    # Scores de todas las muestras, un producto matricial por set
+    scores_por_set = {}
+    for sid, weights in weights_by_set.items():
+        pesos = sample_weights(weights, n_muestras, concentracion, rng)
+        matriz = criterios.reindex(columns=list(weights.keys()), fill_value=0.0)
+        scores_por_set[sid] = score_samples(matriz, pesos)
+    cupos = sample_capacities(cap_dict, n_muestras, variacion_cupos, rng)
+    t_muestreo = time.perf_counter() - t0
+
+    tareas = []
+    for i in range(n_muestras):
+        scores = {
+            (a, j): float(scores_por_set[set_by_asig[a]][i, col])
+            for a in asigs
+            for col, j in enumerate(ips)
+        }
+        kwargs = dict(
+            scores=scores,
+            cap_dict=cupos[i],
+            asignaturas_rotaciones=asignaturas_rotaciones,
+            n_estudiantes=n_estudiantes,
+            min_group=min_group,
+            max_group=max_group,
+            time_limit=time_limit,
+            gap_rel=gap_rel,
+            mode=mode,
+        )
+        tareas.append((i, kwargs, plan_base))
+
+    workers = workers or os.cpu_count() or 1
+    # Muestras de décimas de segundo: se envían en bloques para no pagar un viaje por muestra
+    bloque = max(1, n_muestras // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        salidas = list(pool.map(_resolver_muestra, tareas, chunksize=bloque))
+
+    con_solucion = [
+        s for s in salidas if s["estado"] in (ESTADO_OPTIMO, ESTADO_GAP, ESTADO_LIMITE)
+    ]
+    conteo: Dict = {}
+    for s in con_solucion:
+        for a, j, est in s["asignaciones"]:
+            c = conteo.setdefault((a, str(j)), [0, 0])
+            c[0] += 1
+            c[1] += est
+
+    en_base = set()
+    if plan_base is not None and not plan_base.empty:
+        en_base = set(zip(plan_base["Asignatura"], plan_base["ID_Institucion"].astype(str)))
+
+    n_ok = len(con_solucion)
+    filas = []
+    if n_ok:
+        # Las IPS del plan base que ninguna muestra usa aparecen con frecuencia 0
+        for (a, j) in sorted(set(conteo) | en_base):
+            veces, est = conteo.get((a, j), (0, 0))
+            filas.append({
+                "Asignatura": a,
+                "ID_Institucion": j,
+                "Frecuencia": veces / n_ok,
+                "Cupos_Usados_Medio": est / n_ok,
+                "En_Plan_Base": (a, j) in en_base,
+            })
+    frecuencias = pd.DataFrame(
+        filas, columns=["Asignatura", "ID_Institucion", "Frecuencia", "Cupos_Usados_Medio", "En_Plan_Base"]
+    ).sort_values(["Asignatura", "Frecuencia"], ascending=[True, False]).reset_index(drop=True)
+
+    muestras = pd.DataFrame(
+        [{"muestra": s["muestra"], "estado": s["estado"], "calidad": s["calidad"]} for s in salidas]
+    )
+    calidades = muestras["calidad"].dropna()
+    resumen = {
+        "muestras": n_muestras,
+        "con_solucion": n_ok,
+        "sin_solucion": n_muestras - n_ok,
+        "calidad_media": float(calidades.mean()) if len(calidades) else None,
+        "calidad_p05": float(calidades.quantile(0.05)) if len(calidades) else None,
+        "calidad_p95": float(calidades.quantile(0.95)) if len(calidades) else None,
+        "workers": workers,
+        "tiempo_muestreo": round(t_muestreo, 4),
+        "tiempo_total": round(time.perf_counter() - t0, 4),
+    }
+    logger.info(
+        f"Robustez: {n_ok}/{n_muestras} muestras con solución | workers={workers} | "
+        f"t={resumen['tiempo_total']:.2f}s"
+    )
+    return {"frecuencias": frecuencias, "muestras": muestras, "resumen": resumen}
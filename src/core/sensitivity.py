@@ -0,0 +1,244 @@
+"""
+Análisis post-óptimo sobre el modelo ya resuelto (sin re-optimizar el MILP)
+
+Precios sombra de cupos: dual de cada restricción de capacidad en una LP
+derivada del modelo. Se interpreta como la calidad (score) que se ganaría
+por cada cupo adicional en esa IPS, mientras la base óptima no cambie.
+
+Rangos de pesos: intervalo de cada peso del set en el que el plan actual
+sigue siendo óptimo, a partir de las condiciones de optimalidad de la LP.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pulp import (
+    LpProblem, LpVariable, LpMaximize, LpMinimize, LpContinuous, LpAffineExpression,
+    LpConstraint, LpConstraintLE, LpConstraintGE, lpSum, PULP_CBC_CMD, LpStatus,
+    PulpSolverError,
+)
+
+logger = logging.getLogger(__name__)
+
+METODO_RELAJACION = "relajacion"
+METODO_ENTEROS_FIJOS = "enteros_fijos"
+
+
+def lp_copy(
+    model: LpProblem,
+    objetivo,
+    descartar: Iterable[str] = (),
+    fijar: Optional[Dict[str, float]] = None,
+    extra: Iterable[Tuple[str, LpConstraint]] = (),
+) -> LpProblem:
+    """Copia continua de `model` con `objetivo` (maximizar), sin tocar el original.
+
+    La copia se arma solo con las filas que se conservan: las variables que no
+    aparecen en ninguna de ellas ni en `objetivo` (p. ej. las que solo usaban
+    las filas descartadas) no se copian.
+
+    Parameters:
+    -----------
+    objetivo : expresión de PuLP sobre las variables del modelo original
+    descartar : prefijos de restricciones que no se copian (ej. cortes de fases)
+    fijar : {nombre de variable: valor} que se fijan (lowBound = upBound = valor)
+    extra : (nombre, restricción) sobre las variables originales que se agregan
+        a la copia, p.ej. desigualdades válidas que ajustan la relajación
+    """
+    descartar = tuple(descartar)
+    extra = list(extra)
+    datos = model.to_dict()
+    if descartar:
+        datos["constraints"] = [c for c in datos["constraints"] if not c["name"].startswith(descartar)]
+    usadas = {coef["name"] for c in datos["constraints"] for coef in c["coefficients"]}
+    usadas.update(v.name for v in objetivo.keys())
+    for _, c in extra:
+        usadas.update(v.name for v in c.keys())
+    datos["variables"] = [v for v in datos["variables"] if v["name"] in usadas]
+    # El objetivo original se reemplaza: no se copia
+    datos["objective"]["coefficients"] = []
+    _, lp = LpProblem.from_dict(datos)
+    vars_lp = lp.variablesDict()
+    lp.sense = LpMaximize
+    lp.setObjective(LpAffineExpression(
+        [(vars_lp[v.name], c) for v, c in objetivo.items() if v.name in vars_lp],
+        constant=objetivo.constant,
+    ))
+    for nombre, c in extra:
+        expr = LpAffineExpression(
+            [(vars_lp[v.name], coef) for v, coef in c.items()], constant=c.constant
+        )
+        lp += LpConstraint(expr, sense=c.sense, rhs=0), nombre
+    fijar = fijar or {}
+    for v in lp.variables():
+        if v.name in fijar:
+            v.lowBound = v.upBound = fijar[v.name]
+        v.cat = LpContinuous
+    return lp
+
+
+def capacity_duals(
+    model: LpProblem,
+    objetivo,
+    restricciones: Dict,
+    descartar: Iterable[str] = (),
+    fijar: Optional[Dict[str, float]] = None,
+    extra: Iterable[Tuple[str, LpConstraint]] = (),
+) -> Dict:
+    """Resuelve la LP una vez y devuelve el dual y la holgura de cada restricción.
+
+    Parameters:
+    -----------
+    restricciones : {clave: nombre de la restricción en el modelo}
+
+    Returns:
+    --------
+    {clave: {"precio_sombra": float, "holgura": float}}; vacío si la LP no es
+    óptima o el solver falla (los precios sombra son un reporte opcional).
+    """
+    lp = lp_copy(model, objetivo, descartar, fijar, extra)
+    try:
+        lp.solve(PULP_CBC_CMD(msg=False))
+    except PulpSolverError as e:
+        logger.warning(f"Precios sombra: el solver falló al resolver la LP — {e}")
+        return {}
+    if LpStatus[lp.status] != "Optimal":
+        logger.warning(f"Precios sombra: la LP no es óptima ({LpStatus[lp.status]})")
+        return {}
+
+    out = {}
+    for clave, nombre in restricciones.items():
+        c = lp.constraints.get(nombre)
+        if c is None:
+            continue
+        out[clave] = {
+            # -0.0 → 0.0 para la presentación
+            "precio_sombra": float(c.pi or 0.0) + 0.0,
+            "holgura": float(c.slack or 0.0) + 0.0,
+        }
+    logger.info(
+        f"Precios sombra: {len(out)} restricciones de cupo | "
+        f"activas con precio > 0: {sum(1 for d in out.values() if d['precio_sombra'] > 1e-9)}"
+    )
+    return out
+
+
+def _plan_rows(model: LpProblem, tol: float):
+    """Filas del modelo con su actividad en la solución actual.
+
+    Returns:
+    --------
+    [(nombre, sentido, [(nombre_var, coef)], holgura)]
+    """
+    filas = []
+    for nombre, c in model.constraints.items():
+        coefs = [(v.name, coef) for v, coef in c.items()]
+        actividad = sum(coef * (v.varValue or 0.0) for v, coef in c.items())
+        holgura = -c.constant - actividad
+        filas.append((nombre, c.sense, coefs, abs(holgura) > tol))
+    return filas
+
+
+def weight_ranges(
+    model: LpProblem,
+    criterios: Dict[str, Dict[str, float]],
+    weights: Dict[str, float],
+    tol: float = 1e-6,
+) -> List[Dict]:
+    """Rango de cada peso en el que la solución actual de `model` sigue siendo óptima.
+
+    Válido para modelos cuya relajación LP tiene la solución entera como
+    óptimo (p. ej. el modelo agregado, que es de transporte). Al mover el peso
+    w_k a θ, el resto se reescala para que la suma siga en 1, y el coeficiente
+    de cada variable queda lineal en θ:
+
+        c_j(θ) = θ·s_kj + (1 - θ)·(c_j - w_k·s_kj) / (1 - w_k)
+
+    La solución x* sigue siendo óptima mientras existan duales π que cumplan
+    holgura complementaria con x* y costos reducidos con el signo correcto.
+    Ese conjunto es un intervalo en θ y sus extremos salen de dos LPs
+    pequeñas (min θ y max θ), sin volver a resolver el modelo.
+
+    Parameters:
+    -----------
+    criterios : {nombre de variable: {criterio: score normalizado s_kj}}
+    weights : {criterio: peso actual}; se analizan los de peso > 0
+
+    Returns:
+    --------
+    [{"Criterio", "Peso_Actual", "Peso_Min", "Peso_Max"}]; min/max son None si la
+    solución actual no es óptima para la relajación (p. ej. corte por tiempo).
+    """
+    filas = _plan_rows(model, tol)
+    valores = {v.name: v for v in model.variables()}
+
+    # Cómo entra cada variable en las filas activas (las filas con holgura tienen π = 0)
+    columnas: Dict[str, List[Tuple[int, float]]] = {}
+    for i, (_, _, coefs, con_holgura) in enumerate(filas):
+        if con_holgura:
+            continue
+        for nombre_var, coef in coefs:
+            columnas.setdefault(nombre_var, []).append((i, coef))
+
+    activos = {k: w for k, w in weights.items() if w > 0}
+    out = []
+    for k, w_k in activos.items():
+        lp = LpProblem(f"Rango_{k}", LpMaximize)
+        theta = LpVariable("theta", lowBound=0, upBound=1)
+        pi = {}
+        for i, (_, sentido, _, con_holgura) in enumerate(filas):
+            if con_holgura:
+                continue
+            # Maximización: π ≥ 0 en filas ≤, π ≤ 0 en filas ≥, libre en igualdades
+            if sentido == LpConstraintLE:
+                pi[i] = LpVariable(f"pi_{i}", lowBound=0)
+            elif sentido == LpConstraintGE:
+                pi[i] = LpVariable(f"pi_{i}", upBound=0)
+            else:
+                pi[i] = LpVariable(f"pi_{i}")
+
+        for nombre_var, s_k in criterios.items():
+            var = valores.get(nombre_var)
+            if var is None:
+                continue
+            c_j = sum(weights.get(c, 0.0) * s for c, s in s_k.items())
+            s_kj = s_k.get(k, 0.0)
+            resto = (c_j - w_k * s_kj) / (1 - w_k) if w_k < 1 else 0.0
+            # c_j(θ) - a_jᵀπ = costo reducido
+            reducido = (s_kj - resto) * theta + resto - lpSum(
+                coef * pi[i] for i, coef in columnas.get(nombre_var, [])
+            )
+            x = var.varValue or 0.0
+            en_inf = var.lowBound is not None and x <= var.lowBound + tol
+            en_sup = var.upBound is not None and x >= var.upBound - tol
+            if en_inf and en_sup:
+                continue
+            if en_inf:
+                lp += reducido <= tol
+            elif en_sup:
+                lp += reducido >= -tol
+            else:
+                lp += reducido <= tol
+                lp += reducido >= -tol
+
+        extremos = []
+        for sentido in (LpMinimize, LpMaximize):
+            lp.sense = sentido
+            lp.setObjective(theta + 0)
+            try:
+                lp.solve(PULP_CBC_CMD(msg=False))
+            except PulpSolverError as e:
+                logger.warning(f"Rango de pesos ({k}): el solver falló — {e}")
+                extremos.append(None)
+                continue
+            extremos.append(theta.varValue if LpStatus[lp.status] == "Optimal" else None)
+        if None in extremos:
+            logger.warning(f"Rango de pesos ({k}): la solución actual no es óptima para la LP")
+            extremos = [None, None]
+        out.append({
+            "Criterio": k,
+            "Peso_Actual": w_k,
+            "Peso_Min": extremos[0],
+            "Peso_Max": extremos[1],
+        })
+    return out
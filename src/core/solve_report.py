@@ -0,0 +1,367 @@
+"""
+Reporte estructurado de soluciones MILP (estado, incumbente, cota, gap)
+
+Cada resolución con CBC deja su log en DIR_LOGS_SOLVER (prune_solver_logs,
+que se llama al arrancar la app o el servicio, conserva los MAX_LOGS_SOLVER
+más recientes) y del log se extraen métricas de dificultad:
+cota de la relajación en la raíz, efecto de los cortes, nodos, tiempo al
+primer incumbente. solver_metrics las reúne por corrida y fase, y el
+historial en METRICAS_HISTORIAL permite compararlas entre corridas.
+"""
+
+import os
+import re
+import json
+import uuid
+import tempfile
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Sentido de maximización de PuLP (pulp.LpMaximize). PuLP se importa dentro
+# de solve_cbc/_estado para que format_report y las métricas no lo carguen
+LP_MAXIMIZE = -1
+
+# Estados del reporte (de mejor a peor)
+ESTADO_OPTIMO = "optimo"
+ESTADO_GAP = "gap_objetivo"
+ESTADO_LIMITE = "limite_tiempo"
+ESTADO_SIN_SOLUCION = "sin_solucion"
+ESTADO_INFACTIBLE = "infactible"
+ESTADO_NO_RESUELTO = "no_resuelto"
+
+ESTADO_ETIQUETAS = {
+    ESTADO_OPTIMO: "Óptimo probado",
+    ESTADO_GAP: "Dentro del gap objetivo",
+    ESTADO_LIMITE: "Incumbente (límite de tiempo)",
+    ESTADO_SIN_SOLUCION: "Sin solución en el tiempo dado",
+    ESTADO_INFACTIBLE: "Infactible",
+    ESTADO_NO_RESUELTO: "No resuelto",
+}
+
+_NUM = r"(-?\d+(?:\.\d+)?(?:e[+-]?\d+)?)"
+_RE_RESULT = re.compile(r"^Result - (.+)$", re.MULTILINE)
+_RE_OBJ = re.compile(r"^Objective value:\s*" + _NUM, re.MULTILINE)
+_RE_BOUND = re.compile(r"^(?:Lower|Upper) bound:\s*" + _NUM, re.MULTILINE)
+_RE_NODES = re.compile(r"^Enumerated nodes:\s*(\d+)", re.MULTILINE)
+_RE_ITERS = re.compile(r"^Total iterations:\s*(\d+)", re.MULTILINE)
+_RE_WALL = re.compile(r"^Time \(Wallclock seconds\):\s*" + _NUM, re.MULTILINE)
+_RE_LP_RAIZ = re.compile(r"^Continuous objective value is\s*" + _NUM, re.MULTILINE)
+_RE_CORTES_RAIZ = re.compile(r"^Cuts at root node changed objective from\s*" + _NUM + r"\s*to\s*" + _NUM, re.MULTILINE)
+_RE_N_CORTES_RAIZ = re.compile(r"At root node, (\d+) cuts changed objective", re.MULTILINE)
+_RE_GENERADOR = re.compile(r"^(\w+) was tried \d+ times and created (\d+) cuts", re.MULTILINE)
+_RE_INCUMBENTE = re.compile(
+    r"^Cbc00(?:04|12|38)I .*(?:Integer solution of|improved solution).*\(" + _NUM + r" seconds\)",
+    re.MULTILINE,
+)
+_RE_N_INCUMBENTES = re.compile(r"^Cbc00(?:04|12)I Integer solution of", re.MULTILINE)
+
+# Logs de CBC por resolución
+DIR_LOGS_SOLVER = os.environ.get("CBC_LOG_DIR", os.path.join("logs", "solver"))
+MAX_LOGS_SOLVER = 200
+METRICAS_HISTORIAL = "metricas.jsonl"
+
+# Columnas de solver_metrics
+METRICAS = [
+    "estado", "objetivo", "cota", "gap", "cota_lp_raiz", "cota_raiz_cortes", "cortes_raiz",
+    "cortes_generados", "nodos", "iteraciones", "incumbentes", "t_primer_incumbente", "tiempo", "log",
+]
+
+
+def _last_float(regex, text: str) -> Optional[float]:
+    found = regex.findall(text)
+    return float(found[-1]) if found else None
+
+
+def parse_cbc_log(text: str, sentido: int = 1) -> Dict:
+    """Extrae del log de CBC el resultado, incumbente, cota, nodos, tiempo y
+    métricas de la raíz y de los cortes.
+
+    CBC minimiza internamente: los valores de los cortes en la raíz se pasan al
+    sentido del modelo con `sentido` (model.sense; LpMaximize = -1).
+    """
+    result = _RE_RESULT.findall(text)
+    nodos = _RE_NODES.findall(text)
+    iters = _RE_ITERS.findall(text)
+    cortes = _RE_CORTES_RAIZ.findall(text)
+    n_cortes = _RE_N_CORTES_RAIZ.findall(text)
+    incumbentes = _RE_INCUMBENTE.findall(text)
+    generadores: Dict[str, int] = {}
+    for nombre, n in _RE_GENERADOR.findall(text):
+        generadores[nombre] = generadores.get(nombre, 0) + int(n)
+    signo = -1.0 if sentido == LP_MAXIMIZE else 1.0
+    # Con la raíz cortada por el cutoff CBC informa el "infinito" (±1.8e308)
+    cota_cortes = float(cortes[-1][1]) if cortes else None
+    if cota_cortes is not None and abs(cota_cortes) >= 1e300:
+        cota_cortes = None
+    return {
+        "resultado": result[-1].strip() if result else None,
+        "objetivo": _last_float(_RE_OBJ, text),
+        "cota": _last_float(_RE_BOUND, text),
+        "nodos": int(nodos[-1]) if nodos else None,
+        "iteraciones": int(iters[-1]) if iters else None,
+        "tiempo_cbc": _last_float(_RE_WALL, text),
+        "cota_lp_raiz": _last_float(_RE_LP_RAIZ, text),
+        "cota_raiz_cortes": signo * cota_cortes if cota_cortes is not None else None,
+        "cortes_raiz": int(n_cortes[-1]) if n_cortes else None,
+        "cortes_generados": sum(generadores.values()) if generadores else None,
+        "cortes_por_generador": generadores,
+        "incumbentes": len(_RE_N_INCUMBENTES.findall(text)),
+        "t_primer_incumbente": float(incumbentes[0]) if incumbentes else None,
+    }
+
+
+def prune_solver_logs(max_logs: int = MAX_LOGS_SOLVER) -> int:
+    """Borra los logs de CBC más antiguos de DIR_LOGS_SOLVER y deja `max_logs`.
+
+    Devuelve cuántos se borraron. Se llama una vez al arrancar (app, servicio),
+    no en cada resolución.
+    """
+    try:
+        logs = sorted(
+            (e for e in os.scandir(DIR_LOGS_SOLVER) if e.name.startswith("cbc_") and e.name.endswith(".log")),
+            key=lambda e: e.name,
+        )
+    except OSError:
+        return 0
+    borrados = 0
+    for e in logs[:max(0, len(logs) - max_logs)]:
+        try:
+            os.remove(e.path)
+            borrados += 1
+        except OSError:
+            pass
+    if borrados:
+        logger.info(f"Logs del solver: {borrados} borrados, quedan {len(logs) - borrados}")
+    return borrados
+
+
+def _log_path() -> str:
+    """Archivo nuevo para el log de una resolución, en DIR_LOGS_SOLVER.
+
+    Si la carpeta no se puede usar se devuelve un temporal (se borra tras leerlo).
+    """
+    try:
+        os.makedirs(DIR_LOGS_SOLVER, exist_ok=True)
+        nombre = f"cbc_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:6]}.log"
+        return os.path.join(DIR_LOGS_SOLVER, nombre)
+    except OSError:
+        fd, ruta = tempfile.mkstemp(prefix="cbc_tmp_", suffix=".log")
+        os.close(fd)
+        return ruta
+
+
+def relative_gap(objetivo: Optional[float], cota: Optional[float]) -> Optional[float]:
+    """Gap relativo |cota - objetivo| / max(|objetivo|, 1e-9)."""
+    if objetivo is None or cota is None:
+        return None
+    return abs(cota - objetivo) / max(abs(objetivo), 1e-9)
+
+
+def _estado(model, log_info: Dict, gap: Optional[float], gap_rel: Optional[float]) -> str:
+    from pulp import LpStatus
+
+    status = LpStatus[model.status]
+    if status == "Infeasible":
+        return ESTADO_INFACTIBLE
+    # sol_status: 1 = óptimo, 2 = factible entero (se detuvo por tiempo)
+    if model.sol_status == 1:
+        return ESTADO_GAP if gap is not None and gap > 1e-9 else ESTADO_OPTIMO
+    if model.sol_status == 2:
+        if gap_rel is not None and gap is not None and gap <= gap_rel:
+            return ESTADO_GAP
+        return ESTADO_LIMITE
+    if log_info.get("resultado") and "infeasible" in log_info["resultado"].lower():
+        return ESTADO_INFACTIBLE
+    if status == "Not Solved" or model.sol_status == 0:
+        return ESTADO_SIN_SOLUCION
+    return ESTADO_NO_RESUELTO
+
+
+def has_incumbent(fase: Dict) -> bool:
+    """True si la fase dejó una solución entera utilizable."""
+    return fase.get("estado") in (ESTADO_OPTIMO, ESTADO_GAP, ESTADO_LIMITE)
+
+
+def solve_cbc(
+    model,
+    time_limit: Optional[float] = None,
+    gap_rel: Optional[float] = None,
+    warm_start: bool = False,
+    verbose: bool = False,
+    **opciones,
+) -> Dict:
+    """Resuelve `model` con CBC capturando su log y devuelve el reporte de la fase.
+
+    El incumbente y la cota se leen del log porque PuLP solo expone el estado.
+    El log queda en DIR_LOGS_SOLVER y su ruta en la clave "log"; con `verbose`
+    la ruta también se anota en el log de la app.
+    `opciones` se pasan tal cual a PULP_CBC_CMD (cuts, strong, options, threads...).
+    """
+    from pulp import PULP_CBC_CMD, LpStatus
+
+    log_path = _log_path()
+    temporal = os.path.basename(log_path).startswith("cbc_tmp_")
+    solver = PULP_CBC_CMD(
+        msg=False,
+        timeLimit=time_limit,
+        gapRel=gap_rel,
+        warmStart=warm_start,
+        logPath=log_path,
+        **opciones,
+    )
+    t0 = time.perf_counter()
+    try:
+        model.solve(solver)
+        with open(log_path, encoding="utf-8", errors="replace") as f:
+            log_text = f.read()
+    finally:
+        if temporal:
+            try:
+                os.remove(log_path)
+            except OSError:
+                pass
+    elapsed = time.perf_counter() - t0
+
+    if verbose and not temporal:
+        logger.info(f"Log de CBC: {log_path}")
+
+    info = parse_cbc_log(log_text, model.sense)
+    objetivo = info["objetivo"]
+    cota = info["cota"]
+    if model.sol_status == 1 and cota is None:
+        # CBC no imprime cota cuando prueba optimalidad: cota = incumbente
+        cota = objetivo
+    gap = relative_gap(objetivo, cota)
+    return {
+        "estado": _estado(model, info, gap, gap_rel),
+        "estado_pulp": LpStatus[model.status],
+        "objetivo": objetivo,
+        "cota": cota,
+        "gap": gap,
+        "nodos": info["nodos"],
+        "iteraciones": info["iteraciones"],
+        "resultado_cbc": info["resultado"],
+        "tiempo": round(elapsed, 4),
+        "cota_lp_raiz": info["cota_lp_raiz"],
+        "cota_raiz_cortes": info["cota_raiz_cortes"],
+        "cortes_raiz": info["cortes_raiz"],
+        "cortes_generados": info["cortes_generados"],
+        "cortes_por_generador": info["cortes_por_generador"],
+        "incumbentes": info["incumbentes"],
+        "t_primer_incumbente": info["t_primer_incumbente"],
+        "log": None if temporal else log_path,
+    }
+
+
+def solver_metrics(reportes: Dict) -> pd.DataFrame:
+    """Métricas de CBC de varios reportes: una fila por (corrida, fase).
+
+    Parameters:
+    -----------
+    reportes : {etiqueta de la corrida (p. ej. el semestre): reporte}
+
+    Returns:
+    --------
+    DataFrame con Corrida, Fase y METRICAS (las fases sin CBC, como la
+    descomposición, no aportan filas).
+    """
+    filas = []
+    for corrida, reporte in reportes.items():
+        for fase, datos in ((reporte or {}).get("fases") or {}).items():
+            filas.append({"Corrida": corrida, "Fase": fase, **{m: datos.get(m) for m in METRICAS}})
+    return pd.DataFrame(filas, columns=["Corrida", "Fase"] + METRICAS)
+
+
+def append_metrics_history(metricas: pd.DataFrame, **etiquetas) -> None:
+    """Agrega las filas de solver_metrics al historial (JSON lines) de DIR_LOGS_SOLVER."""
+    if metricas is None or metricas.empty:
+        return
+    fecha = datetime.now().isoformat(timespec="seconds")
+    try:
+        os.makedirs(DIR_LOGS_SOLVER, exist_ok=True)
+        with open(os.path.join(DIR_LOGS_SOLVER, METRICAS_HISTORIAL), "a", encoding="utf-8") as f:
+            for fila in metricas.to_dict(orient="records"):
+                f.write(json.dumps({"fecha": fecha, **etiquetas, **fila}, default=str) + "\n")
+    except OSError as e:
+        logger.warning(f"No se pudo guardar el historial de métricas del solver: {e}")
+
+
+def load_metrics_history() -> pd.DataFrame:
+    """Historial de métricas guardado con append_metrics_history (vacío si no hay)."""
+    ruta = os.path.join(DIR_LOGS_SOLVER, METRICAS_HISTORIAL)
+    if not os.path.exists(ruta):
+        return pd.DataFrame(columns=["fecha", "Corrida", "Fase"] + METRICAS)
+    return pd.read_json(ruta, lines=True)
+
+
+def summarize_metrics(metricas: pd.DataFrame) -> pd.DataFrame:
+    """Dificultad de cada corrida (fase 1): resoluciones, % al límite de tiempo,
+    nodos, tiempo, gap máximo, tiempo al primer incumbente y cierre de la
+    brecha de la raíz por los cortes, ordenado de más a menos difícil."""
+    fase1 = metricas[metricas["Fase"] == "fase1"] if not metricas.empty else metricas
+    if fase1.empty:
+        return pd.DataFrame()
+    df = fase1.copy()
+    # Fracción de la brecha LP-raíz vs. incumbente que cierran los cortes
+    brecha = (df["cota_lp_raiz"] - df["objetivo"]).abs()
+    df["cierre_cortes"] = ((df["cota_lp_raiz"] - df["cota_raiz_cortes"]).abs() / brecha.where(brecha > 1e-9))
+    resumen = df.groupby("Corrida").agg(
+        Resoluciones=("estado", "size"),
+        Pct_Limite_Tiempo=("estado", lambda e: float((e == ESTADO_LIMITE).mean())),
+        Nodos_Prom=("nodos", "mean"),
+        Tiempo_Prom=("tiempo", "mean"),
+        Gap_Max=("gap", "max"),
+        T_Primer_Incumbente_Prom=("t_primer_incumbente", "mean"),
+        Cierre_Cortes_Prom=("cierre_cortes", "mean"),
+    ).reset_index()
+    return resumen.sort_values(["Pct_Limite_Tiempo", "Tiempo_Prom"], ascending=False).round(4)
+
+
+def new_report(time_limit: Optional[float], gap_rel: Optional[float]) -> Dict:
+    """Reporte vacío; los optimizadores lo completan fase a fase."""
+    return {
+        "estado": ESTADO_NO_RESUELTO,
+        "optimo_probado": False,
+        "objetivo": None,
+        "cota": None,
+        "gap": None,
+        "nodos": None,
+        "limite_tiempo": time_limit,
+        "gap_objetivo": gap_rel,
+        "tiempos": {},
+        "fases": {},
+    }
+
+
+def format_report(report: Optional[Dict]) -> str:
+    """Resumen de una línea para la UI y los logs."""
+    if not report:
+        return "Sin reporte del solver"
+    partes = [ESTADO_ETIQUETAS.get(report.get("estado"), str(report.get("estado")))]
+    if report.get("objetivo") is not None:
+        partes.append(f"calidad={report['objetivo']:.4f}")
+    if report.get("cota") is not None:
+        partes.append(f"cota={report['cota']:.4f}")
+    if report.get("gap") is not None:
+        partes.append(f"gap={report['gap'] * 100:.2f}%")
+    if report.get("nodos") is not None:
+        partes.append(f"nodos={report['nodos']}")
+    fase2 = report.get("estado_fase2")
+    if fase2 is not None and fase2 != ESTADO_OPTIMO:
+        partes.append(f"consolidación de grupos: {ESTADO_ETIQUETAS.get(fase2, fase2)}")
+    total = report.get("tiempos", {}).get("total")
+    if total is not None:
+        partes.append(f"t={total:.2f}s")
+    ganador = report.get("fases", {}).get("fase1", {}).get("portafolio", {}).get("ganador")
+    if ganador:
+        partes.append(f"gana {ganador}")
+    precheck = report.get("precheck")
+    if precheck and not precheck.get("factible", True):
+        partes.append(f"cuello de botella: {precheck['mensaje']}")
+    return " | ".join(partes)
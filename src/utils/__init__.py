@@ -2,46 +2,122 @@
 Utilidades generales del proyecto
 """
 
+import os
+import queue
+import atexit
 import logging
+import threading
 import logging.handlers
 from pathlib import Path
 from typing import Optional
 import json
-from datetime import datetime
 
+# Estado del logging del proceso: setup_logging lo configura una sola vez
+_listener: Optional[logging.handlers.QueueListener] = None
+_handlers: list = []
+_lock = threading.Lock()
 
-def setup_logging(log_dir: str = "logs", debug_dir: str = "debug_logs") -> logging.Logger:
-    """Configura logging para toda la aplicación"""
-    
-    Path(log_dir).mkdir(exist_ok=True)
-    Path(debug_dir).mkdir(exist_ok=True)
-    
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.DEBUG)
-    
-    # Handler para logs normales
-    log_file = Path(log_dir) / f"modelo_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-    fh = logging.FileHandler(log_file)
-    fh.setLevel(logging.INFO)
-    
-    # Handler para debug
-    debug_file = Path(debug_dir) / f"debug_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-    dh = logging.FileHandler(debug_file)
-    dh.setLevel(logging.DEBUG)
-    
-    # Formato
-    formatter = logging.Formatter(
+# Loggers que escriben en los archivos: el paquete (src.core.*, src.utils.*) y el
+# servicio HTTP. La raíz queda fuera para no volcar el DEBUG de Streamlit o PuLP
+LOGGERS_APP = ("src", "servicio")
+
+
+def _file_handler(ruta: Path, nivel: int, max_bytes: int, respaldos: int,
+                  cuando: Optional[str]) -> logging.Handler:
+    if cuando:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            ruta, when=cuando, backupCount=respaldos, encoding="utf-8"
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            ruta, maxBytes=max_bytes, backupCount=respaldos, encoding="utf-8"
+        )
+    handler.setLevel(nivel)
+    handler.setFormatter(logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    fh.setFormatter(formatter)
-    dh.setFormatter(formatter)
-    
-    logger.addHandler(fh)
-    logger.addHandler(dh)
-    
+    ))
+    return handler
+
+
+def setup_logging(
+    log_dir: str = "logs",
+    debug_dir: str = "debug_logs",
+    max_bytes: int = 10 * 1024 * 1024,
+    respaldos: int = 5,
+    cuando: Optional[str] = None,
+) -> logging.Logger:
+    """Configura logging para toda la aplicación (una vez por proceso)
+
+    Los registros de LOGGERS_APP pasan por una cola (QueueHandler) y un hilo
+    de fondo (QueueListener) los escribe en logs/modelo.log (INFO) y
+    debug_logs/debug.log (DEBUG), así que el código que loguea no espera al
+    disco. Llamarla de nuevo (p. ej. en cada rerun de Streamlit) devuelve el
+    mismo logger sin agregar handlers ni archivos.
+
+    Parameters:
+        max_bytes: tamaño al que rota cada archivo
+        respaldos: archivos rotados que se conservan
+        cuando: si se indica ("midnight", "H", ...), rota por tiempo en vez de tamaño
+    """
+    global _listener, _handlers
+
+    logger = logging.getLogger(__name__)
+    with _lock:
+        if _listener is not None:
+            return logger
+
+        Path(log_dir).mkdir(exist_ok=True)
+        Path(debug_dir).mkdir(exist_ok=True)
+
+        _handlers = [
+            _file_handler(Path(log_dir) / "modelo.log", logging.INFO, max_bytes, respaldos, cuando),
+            _file_handler(Path(debug_dir) / "debug.log", logging.DEBUG, max_bytes, respaldos, cuando),
+        ]
+        cola: queue.Queue = queue.Queue(-1)
+        _listener = logging.handlers.QueueListener(cola, *_handlers, respect_handler_level=True)
+        _listener.start()
+
+        encolar = logging.handlers.QueueHandler(cola)
+        for nombre in LOGGERS_APP:
+            destino = logging.getLogger(nombre)
+            destino.setLevel(logging.DEBUG)
+            destino.addHandler(encolar)
     return logger
 
 
+def shutdown_logging() -> None:
+    """Vacía la cola y detiene el hilo de escritura (se llama al salir)."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+            for handler in _handlers:
+                handler.close()
+
+
+def _after_fork_in_child() -> None:
+    # El hilo del listener no existe en el proceso hijo (src/core/jobs.py) y
+    # este termina con os._exit, sin vaciar colas: escribe directo a los archivos
+    global _listener, _lock
+    _lock = threading.Lock()
+    if _listener is None:
+        return
+    _listener = None
+    for nombre in LOGGERS_APP:
+        logger = logging.getLogger(nombre)
+        for handler in list(logger.handlers):
+            if isinstance(handler, logging.handlers.QueueHandler):
+                logger.removeHandler(handler)
+        for handler in _handlers:
+            logger.addHandler(handler)
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
 def save_results_json(results_dict: dict, output_file: str) -> None:
     """Guarda resultados en JSON"""
     with open(output_file, 'w') as f:
@@ -0,0 +1,81 @@
+"""
+Conversión de resultados a JSON y de vuelta
+
+Los resultados de la app son dicts anidados con DataFrames, tuplas como
+claves ({(asignatura, IPS): score}) y escalares de numpy. Aquí se codifican
+con marcas ("__df__", "__tupla__", "__dict__") para que el servicio HTTP
+pueda enviarlos en JSON y el cliente reconstruya la misma estructura.
+
+Los LazyDict (src/utils/lazy.py) se envían sin evaluar sus diferidos: cada
+valor pendiente viaja como {"__diferido__": ruta}, la lista de claves desde la
+raíz hasta él, y el cliente lo pide al servicio solo si lo necesita.
+"""
+
+import json
+import math
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .lazy import Lazy, LazyDict
+
+
+def to_jsonable(obj: Any, ruta: Optional[List[str]] = None) -> Any:
+    """Estructura equivalente a `obj` formada solo por tipos de JSON.
+
+    `ruta` es la posición de `obj` en la estructura que se codifica; se sigue
+    por los dicts de claves str y hace falta para dejar pendientes los
+    diferidos de un LazyDict. Donde no se puede seguir (listas, claves no
+    str) los diferidos se evalúan.
+    """
+    if isinstance(obj, LazyDict) and ruta is not None and all(isinstance(k, str) for k in obj):
+        return {"__lazydict__": {
+            k: {"__diferido__": ruta + [k]} if isinstance(v, Lazy) else to_jsonable(v, ruta + [k])
+            for k, v in obj.raw_items()
+        }}
+    if isinstance(obj, pd.DataFrame):
+        return {"__df__": json.loads(obj.to_json(orient="split", index=False, date_format="iso"))}
+    if isinstance(obj, pd.Series):
+        return to_jsonable(obj.to_frame())
+    if isinstance(obj, dict):
+        if all(isinstance(k, str) for k in obj):
+            return {k: to_jsonable(v, None if ruta is None else ruta + [k]) for k, v in obj.items()}
+        return {"__dict__": [[to_jsonable(k), to_jsonable(v)] for k, v in obj.items()]}
+    if isinstance(obj, tuple):
+        return {"__tupla__": [to_jsonable(v) for v in obj]}
+    if isinstance(obj, (list, set)):
+        return [to_jsonable(v) for v in obj]
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    return str(obj)
+
+
+def from_jsonable(obj: Any, diferido: Optional[Callable[[List[str]], Any]] = None) -> Any:
+    """Inversa de to_jsonable.
+
+    `diferido(ruta)` trae un valor pendiente de un LazyDict; queda como
+    `Lazy(diferido, ruta)` y se llama en el primer acceso. Debe poder
+    serializarse (función de módulo o functools.partial de una). Sin él, los
+    pendientes quedan en None.
+    """
+    if isinstance(obj, list):
+        return [from_jsonable(v, diferido) for v in obj]
+    if not isinstance(obj, dict):
+        return obj
+    if "__lazydict__" in obj:
+        return LazyDict({k: from_jsonable(v, diferido) for k, v in obj["__lazydict__"].items()})
+    if "__diferido__" in obj:
+        return Lazy(diferido, obj["__diferido__"]) if diferido is not None else None
+    if "__df__" in obj:
+        d = obj["__df__"]
+        return pd.DataFrame(d["data"], columns=d["columns"])
+    if "__tupla__" in obj:
+        return tuple(from_jsonable(v, diferido) for v in obj["__tupla__"])
+    if "__dict__" in obj:
+        return {from_jsonable(k, diferido): from_jsonable(v, diferido) for k, v in obj["__dict__"]}
+    return {k: from_jsonable(v, diferido) for k, v in obj.items()}
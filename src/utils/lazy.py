@@ -0,0 +1,89 @@
+"""
+Valores diferidos
+
+`LazyDict` es un dict cuyos valores pueden ser `Lazy(fn, *args)`: se calculan
+en el primer acceso (`d[k]`, `d.get(k)`, `d.items()`...) y el resultado
+reemplaza al diferido. `k in d` y `len(d)` no calculan nada.
+
+Se usa para los artefactos de debug, que solo se miran en el panel de debug.
+Para que los resultados sigan viajando entre procesos (src/core/jobs.py) `fn`
+debe ser una función de módulo importable, no una lambda ni una función de app.py.
+"""
+
+from typing import Any, Callable, Iterator, Tuple
+
+
+class Lazy:
+    """Cálculo diferido: `fn(*args, **kwargs)` al evaluarse."""
+
+    __slots__ = ("fn", "args", "kwargs")
+
+    def __init__(self, fn: Callable, *args, **kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def __call__(self) -> Any:
+        return self.fn(*self.args, **self.kwargs)
+
+    def __reduce__(self):
+        return (_lazy, (self.fn, self.args, self.kwargs))
+
+    def __repr__(self) -> str:
+        return f"Lazy({getattr(self.fn, '__name__', self.fn)})"
+
+
+def _lazy(fn: Callable, args: Tuple, kwargs: dict) -> Lazy:
+    return Lazy(fn, *args, **kwargs)
+
+
+class LazyDict(dict):
+    """dict que evalúa sus valores `Lazy` en el primer acceso y guarda el resultado."""
+
+    def __getitem__(self, key):
+        valor = dict.__getitem__(self, key)
+        if isinstance(valor, Lazy):
+            valor = valor()
+            dict.__setitem__(self, key, valor)
+        return valor
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            dict.__setitem__(self, key, default)
+        return self[key]
+
+    def pop(self, key, *default):
+        if key in self:
+            valor = self[key]
+            dict.__delitem__(self, key)
+            return valor
+        return dict.pop(self, key, *default)
+
+    def values(self):
+        return [self[k] for k in self]
+
+    def items(self):
+        return [(k, self[k]) for k in self]
+
+    def pending(self) -> list:
+        """Claves que aún no se han calculado."""
+        return [k for k, v in dict.items(self) if isinstance(v, Lazy)]
+
+    def raw_items(self) -> Iterator[Tuple[Any, Any]]:
+        """Pares (clave, valor) sin evaluar los diferidos."""
+        return iter(dict.items(self))
+
+    def copy(self) -> "LazyDict":
+        return LazyDict(self.raw_items())
+
+    def __reduce__(self):
+        # Al serializar (procesos de jobs) los diferidos viajan sin evaluarse
+        return (LazyDict, (), None, None, self.raw_items())
+
+    def __repr__(self) -> str:
+        return "LazyDict({" + ", ".join(
+            f"{k!r}: {v!r}" for k, v in dict.items(self)
+        ) + "})"
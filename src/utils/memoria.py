@@ -0,0 +1,133 @@
+"""
+Perfil de memoria del pipeline (opcional)
+
+Con PERFIL_MEMORIA=1 (o `collect_timings(memoria=True)`) cada span de
+src/utils/timing.py registra además:
+
+    pico_mb      pico de memoria asignada por Python (tracemalloc) durante la
+                 etapa, sobre lo que ya había al empezarla
+    rss_max_mb   máximo RSS del proceso al terminar la etapa (getrusage)
+
+`retained_sizes` mide lo que queda retenido después: el dict de resultados,
+sus entradas de debug y los objetos de st.session_state. tracemalloc hace
+el código varias veces más lento, por eso el modo es opt-in.
+"""
+
+import os
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .lazy import Lazy
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PERFIL_MEMORIA = os.environ.get("PERFIL_MEMORIA", "").strip().lower() not in ("", "0", "false", "no")
+
+MB = 1024 * 1024
+
+# Etapas abiertas: por cada una, memoria al empezar y pico pendiente de sus hijas
+_pila: ContextVar[Tuple[Dict, ...]] = ContextVar("pila_memoria", default=())
+
+
+def rss_max_mb() -> Optional[float]:
+    """Máximo RSS del proceso hasta ahora, en MB (None si no se puede medir)."""
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB; macOS, bytes
+    return round(maxrss / (MB if sys.platform == "darwin" else 1024), 2)
+
+
+@contextmanager
+def tracing() -> Iterator[None]:
+    """Activa tracemalloc durante el bloque (si no estaba ya activo)."""
+    iniciado = not tracemalloc.is_tracing()
+    if iniciado:
+        tracemalloc.start()
+    try:
+        yield
+    finally:
+        if iniciado:
+            tracemalloc.stop()
+
+
+def stage_start() -> Dict:
+    """Abre la medición de una etapa; devolver el resultado a `stage_end`."""
+    pila = _pila.get()
+    actual, pico = tracemalloc.get_traced_memory()
+    if pila:
+        # El pico hasta aquí pertenece a la etapa madre: se guarda antes de reiniciarlo
+        pila[-1]["pendiente"] = max(pila[-1]["pendiente"], pico)
+    tracemalloc.reset_peak()
+    marco = {"inicio": actual, "pendiente": 0, "token": None}
+    marco["token"] = _pila.set(pila + (marco,))
+    return marco
+
+
+def stage_end(marco: Dict) -> Dict[str, Optional[float]]:
+    """Cierra la etapa: {"pico_mb", "rss_max_mb"}."""
+    _pila.reset(marco["token"])
+    pico = max(marco["pendiente"], tracemalloc.get_traced_memory()[1])
+    return {
+        "pico_mb": round(max(pico - marco["inicio"], 0) / MB, 3),
+        "rss_max_mb": rss_max_mb(),
+    }
+
+
+def deep_sizeof(obj: Any, _vistos: Optional[set] = None) -> int:
+    """Bytes retenidos por `obj` y lo que cuelga de él (cada objeto se cuenta una vez).
+
+    DataFrames/Series/arrays se miden con su propio memory_usage/nbytes. Los
+    valores diferidos (src/utils/lazy.py) no se evalúan: cuentan sus entradas.
+    """
+    vistos = set() if _vistos is None else _vistos
+    if id(obj) in vistos:
+        return 0
+    vistos.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+
+    total = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        total += sum(deep_sizeof(k, vistos) + deep_sizeof(v, vistos) for k, v in dict.items(obj))
+    elif isinstance(obj, Lazy):
+        total += deep_sizeof(obj.args, vistos) + deep_sizeof(obj.kwargs, vistos)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        total += sum(deep_sizeof(x, vistos) for x in obj)
+    elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+        total += deep_sizeof(vars(obj), vistos)
+    return total
+
+
+def retained_sizes(objetos: Dict[str, Any], expandir: Tuple[str, ...] = ("debug",)) -> pd.DataFrame:
+    """Tamaño retenido de cada objeto (Objeto, MB), de mayor a menor.
+
+    Las entradas en `expandir` que sean dict se desglosan también por clave
+    (p. ej. "debug.base_debug").
+    """
+    filas = []
+    for nombre, obj in objetos.items():
+        filas.append({"Objeto": str(nombre), "MB": deep_sizeof(obj) / MB})
+        if nombre in expandir and isinstance(obj, dict):
+            filas.extend(
+                {"Objeto": f"{nombre}.{k}", "MB": deep_sizeof(v) / MB} for k, v in dict.items(obj)
+            )
+    if not filas:
+        return pd.DataFrame(columns=["Objeto", "MB"])
+    df = pd.DataFrame(filas).sort_values("MB", ascending=False, ignore_index=True)
+    df["MB"] = df["MB"].round(3)
+    return df
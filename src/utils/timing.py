@@ -0,0 +1,133 @@
+"""
+Tiempos por etapa del pipeline
+
+`span(nombre)` (o el decorador `timed`) mide un bloque y lo suma al registro
+activo. Los spans anidados quedan con nombre jerárquico, p. ej.
+"modelo_grupos/fase1". `collect_timings()` abre el registro de una corrida.
+Fuera de un registro un span solo mide y deja el tiempo en el log DEBUG, así
+que instrumentar una función no cambia su comportamiento.
+
+El registro es {nombre: {"segundos": total, "llamadas": n}}: un dict simple
+que viaja con los resultados (también desde los procesos de src/core/jobs.py).
+Con el perfil de memoria activo (src/utils/memoria.py) cada entrada suma
+"pico_mb" y "rss_max_mb" (máximos entre llamadas).
+"""
+
+import time
+import logging
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+import pandas as pd
+
+from . import memoria as _mem
+
+logger = logging.getLogger(__name__)
+
+_registro: ContextVar[Optional[Dict]] = ContextVar("registro_tiempos", default=None)
+_ruta: ContextVar[Tuple[str, ...]] = ContextVar("ruta_span", default=())
+_memoria: ContextVar[bool] = ContextVar("perfil_memoria", default=False)
+
+
+def _sumar(ruta: Tuple[str, ...], segundos: float, memoria: Optional[Dict] = None) -> None:
+    nombre = "/".join(ruta)
+    registro = _registro.get()
+    if registro is not None:
+        entrada = registro.setdefault(nombre, {"segundos": 0.0, "llamadas": 0})
+        entrada["segundos"] = round(entrada["segundos"] + segundos, 4)
+        entrada["llamadas"] += 1
+        for clave, valor in (memoria or {}).items():
+            if valor is not None:
+                entrada[clave] = max(entrada.get(clave) or 0.0, valor)
+    logger.debug(f"⏱ {nombre}: {segundos:.4f}s" + (f" · pico {memoria['pico_mb']:.1f}MB" if memoria else ""))
+
+
+@contextmanager
+def span(nombre: str) -> Iterator[None]:
+    """Mide el bloque como etapa `nombre`, hija del span que esté abierto."""
+    ruta = _ruta.get() + (nombre,)
+    token = _ruta.set(ruta)
+    marco = _mem.stage_start() if _memoria.get() else None
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - t0
+        _ruta.reset(token)
+        _sumar(ruta, segundos, _mem.stage_end(marco) if marco is not None else None)
+
+
+def timed(nombre: str):
+    """Decorador: cada llamada a la función es un span `nombre`."""
+    def decorador(fn):
+        @functools.wraps(fn)
+        def envoltura(*args, **kwargs):
+            with span(nombre):
+                return fn(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def record_timings(tiempos: Dict[str, float], excluir: Tuple[str, ...] = ("total",)) -> None:
+    """Suma tiempos ya medidos por otro medio (p. ej. report["tiempos"] de los
+    optimizadores) como hijos del span abierto."""
+    ruta = _ruta.get()
+    for nombre, segundos in tiempos.items():
+        if nombre not in excluir and segundos is not None:
+            _sumar(ruta + (nombre,), float(segundos))
+
+
+@contextmanager
+def collect_timings(registro: Optional[Dict] = None, memoria: Optional[bool] = None) -> Iterator[Dict]:
+    """Registra los spans del bloque en `registro` (uno nuevo si es None) y lo entrega.
+
+    `memoria` activa el perfil de memoria por etapa (por defecto, PERFIL_MEMORIA).
+    """
+    registro = {} if registro is None else registro
+    memoria = _mem.PERFIL_MEMORIA if memoria is None else memoria
+    token = _registro.set(registro)
+    token_ruta = _ruta.set(())
+    token_mem = _memoria.set(memoria)
+    try:
+        if memoria:
+            with _mem.tracing():
+                yield registro
+        else:
+            yield registro
+    finally:
+        _memoria.reset(token_mem)
+        _ruta.reset(token_ruta)
+        _registro.reset(token)
+
+
+def timings_table(registro: Optional[Dict]) -> pd.DataFrame:
+    """Registro como tabla (Etapa, Segundos, Llamadas, Pct) en orden jerárquico.
+
+    Pct es la fracción del total de las etapas de primer nivel. Con perfil de
+    memoria se agregan Pico_MB y RSS_Max_MB.
+    """
+    if not registro:
+        return pd.DataFrame(columns=["Etapa", "Segundos", "Llamadas", "Pct"])
+    total = sum(v["segundos"] for k, v in registro.items() if "/" not in k) or 1.0
+    df = pd.DataFrame([
+        {"Etapa": k, "Segundos": v["segundos"], "Llamadas": v["llamadas"], "Pct": v["segundos"] / total}
+        for k, v in sorted(registro.items())
+    ])
+    df["Pct"] = df["Pct"].round(4)
+    if any("pico_mb" in v for v in registro.values()):
+        df["Pico_MB"] = [registro[k].get("pico_mb") for k in df["Etapa"]]
+        df["RSS_Max_MB"] = [registro[k].get("rss_max_mb") for k in df["Etapa"]]
+    return df
+
+
+def format_timings(registro: Optional[Dict]) -> str:
+    """Resumen de una línea con las etapas de primer nivel, para el log."""
+    if not registro:
+        return "sin tiempos"
+    partes = [
+        f"{k}={v['segundos']:.2f}s" + (f"×{v['llamadas']}" if v["llamadas"] > 1 else "")
+        for k, v in registro.items() if "/" not in k
+    ]
+    return " · ".join(partes)
@@ -4,10 +4,11 @@ Componentes de visualización para Streamlit
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from typing import Optional
 
+from ..utils.timing import timings_table, format_timings
+from ..utils.lazy import LazyDict
+
 
 def render_header():
     """Renderiza encabezado de la aplicación"""
@@ -166,6 +167,8 @@ def render_asignaciones_table(df_asignaciones):
 
 def render_capacidad_chart(df_util):
     """Renderiza gráfico de utilización de capacidad"""
+    import plotly.express as px
+
     st.header("📈 Utilización de Capacidad")
     
     if df_util.empty:
@@ -202,6 +205,8 @@ def render_capacidad_chart(df_util):
 
 def render_demanda_vs_asignacion(df_summary):
     """Renderiza comparación demanda vs asignación"""
+    import plotly.graph_objects as go
+
     st.header("🎯 Demanda vs Asignación por Grupo")
     
     if df_summary.empty:
@@ -228,6 +233,83 @@ def render_demanda_vs_asignacion(df_summary):
     st.plotly_chart(fig, use_container_width=True)
 
 
+def render_precios_sombra(df_precios, key: str = "precios_sombra"):
+    """Renderiza precios sombra de cupos (calidad marginal por cupo adicional)"""
+    if df_precios is None or df_precios.empty:
+        return
+    with st.expander("💰 Precios sombra de cupos"):
+        st.caption(
+            "Calidad (score) que se ganaría con un cupo más en cada IPS, según los duales "
+            "de la LP del modelo. Cupos con precio 0 no limitan la solución actual."
+        )
+        solo_activos = st.checkbox("Solo cupos con precio > 0", value=True, key=f"{key}_activos")
+        df_show = df_precios[df_precios["Precio_Sombra"] > 1e-9] if solo_activos else df_precios
+        st.dataframe(
+            df_show.round({"Precio_Sombra": 4, "Score_IPS": 4, "Holgura": 2, "Uso": 2}),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+
+def render_metricas_solver(df_metricas, df_historial=None):
+    """Renderiza las métricas de CBC de la corrida y la dificultad histórica por corrida"""
+    if df_metricas is None or df_metricas.empty:
+        return
+    with st.expander("🧮 Métricas del solver"):
+        st.caption(
+            "Extraídas del log de CBC de cada fase: cota de la relajación LP en la raíz, cota "
+            "tras los cortes de la raíz, cortes generados, nodos explorados y segundos hasta el "
+            "primer incumbente. Una brecha grande entre la cota de la raíz y el objetivo, "
+            "con muchos nodos, indica un semestre difícil."
+        )
+        st.dataframe(
+            df_metricas.drop(columns="log").round(4),
+            use_container_width=True,
+            hide_index=True,
+        )
+        if df_historial is not None and not df_historial.empty:
+            st.markdown("**Historial (fase 1, todas las corridas)**")
+            st.dataframe(df_historial, use_container_width=True, hide_index=True)
+        logs = [l for l in df_metricas["log"].dropna()]
+        if logs:
+            st.caption(f"Logs de CBC: {', '.join(logs)}")
+
+
+def render_sensibilidad_pesos(df_rangos):
+    """Renderiza el rango de cada peso en el que el plan actual sigue siendo óptimo"""
+    import plotly.graph_objects as go
+
+    if df_rangos is None or df_rangos.empty:
+        return
+    with st.expander("⚖️ Sensibilidad a las ponderaciones"):
+        st.caption(
+            "Para cada criterio del set: pesos entre los que este plan sigue siendo óptimo "
+            "(el resto de pesos se reescala para sumar 1). Un margen pequeño indica que el plan "
+            "cambia con un ajuste leve de ese peso."
+        )
+        df_plot = df_rangos.dropna(subset=["Peso_Min", "Peso_Max"])
+        if not df_plot.empty:
+            fig = go.Figure()
+            fig.add_trace(go.Bar(
+                y=df_plot["Criterio"],
+                x=df_plot["Peso_Max"] - df_plot["Peso_Min"],
+                base=df_plot["Peso_Min"],
+                orientation="h",
+                name="Rango estable",
+                marker_color="lightgreen",
+            ))
+            fig.add_trace(go.Scatter(
+                y=df_plot["Criterio"],
+                x=df_plot["Peso_Actual"],
+                mode="markers",
+                name="Peso actual",
+                marker=dict(color="darkblue", size=10, symbol="diamond"),
+            ))
+            fig.update_layout(xaxis_title="Peso", xaxis_range=[0, 1], height=80 + 35 * len(df_plot))
+            st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(df_rangos.round(4), use_container_width=True, hide_index=True)
+
+
 def render_debug_info(debug_dict):
     """Renderiza información de debug"""
     with st.expander("🔧 Información de Debug"):
@@ -235,7 +317,32 @@ def render_debug_info(debug_dict):
             st.info("No hay datos de debug disponibles")
             return
 
-        st.subheader("Resumen")
+        tiempos = debug_dict.get("tiempos")
+        if tiempos:
+            st.subheader("⏱️ Tiempos por etapa")
+            st.caption(format_timings(tiempos))
+            st.dataframe(timings_table(tiempos), use_container_width=True, hide_index=True)
+
+        memoria = debug_dict.get("memoria")
+        memoria_sesion = debug_dict.get("memoria_sesion")
+        if memoria is not None or memoria_sesion is not None:
+            st.subheader("🧠 Memoria retenida")
+            st.caption("Perfil de memoria (PERFIL_MEMORIA=1): MB que conserva cada objeto")
+            col1, col2 = st.columns(2)
+            if memoria is not None:
+                col1.markdown("**Resultado**")
+                col1.dataframe(memoria, use_container_width=True, hide_index=True)
+            if memoria_sesion is not None:
+                col2.markdown("**Sesión**")
+                col2.dataframe(memoria_sesion, use_container_width=True, hide_index=True)
+
+        # El expander se ejecuta aunque esté cerrado: las tablas diferidas solo se calculan a pedido
+        pendientes = debug_dict.pending() if isinstance(debug_dict, LazyDict) else []
+        if pendientes and not st.toggle(
+            "Calcular tablas de auditoría (scores por criterio, pesos, costos)", key="debug_auditoria"
+        ):
+            debug_dict = {k: v for k, v in debug_dict.raw_items() if k not in pendientes}
+
         resumen_keys = [
             "instituciones",
             "grupos",
@@ -247,7 +354,9 @@ def render_debug_info(debug_dict):
             "score_consistency",
         ]
         resumen = {k: debug_dict.get(k) for k in resumen_keys if k in debug_dict}
-        st.json(resumen)
+        if resumen:
+            st.subheader("Resumen")
+            st.json(resumen)
 
         if "weights_raw" in debug_dict:
             st.subheader("Ponderaciones (raw)")
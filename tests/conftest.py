@@ -0,0 +1,53 @@
+"""
+Fixtures compartidas: instancias del corpus de scripts/regresion_solver.py
+
+Los casos se construyen igual que en el arnés de regresiones (misma plantilla
+V4, plantillas sintéticas con semilla fija) y su objetivo y número de grupos
+se comparan con data/baselines/regresion_solver.json.
+"""
+
+import sys
+import json
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(RAIZ))
+
+from scripts.regresion_solver import BASELINE, CORPUS, build_instance  # noqa: E402
+
+# Casos del corpus que se resuelven al óptimo en menos de un segundo
+CASOS_RAPIDOS = [
+    "v4-s5-salud-publica",
+    "v4-s8-pediatria",
+    "v4-s9-anestesia-gineco",
+    "v4-s10-completo",
+    "sint-12ips-s5",
+    "sint-20ips-2rot-s5",
+    "sint-20ips-2rot-s9",
+]
+
+
+@pytest.fixture(scope="session")
+def linea_base():
+    """{caso: {"estado", "objetivo", "grupos", ...}} de la línea base del corpus."""
+    with open(RAIZ / BASELINE, encoding="utf-8") as f:
+        return json.load(f)["casos"]
+
+
+@pytest.fixture(scope="session")
+def instancia(tmp_path_factory):
+    """instancia(nombre) -> argumentos de GroupOptimizer.optimize para ese caso."""
+    cargadas = {}
+    tmp = str(tmp_path_factory.mktemp("corpus"))
+    por_nombre = {c["nombre"]: c for c in CORPUS}
+
+    def _instancia(nombre: str):
+        caso = por_nombre[nombre]
+        if "plantilla" in caso:
+            caso = dict(caso, plantilla=str(RAIZ / caso["plantilla"]))
+        return build_instance(caso, cargadas, tmp)
+
+    return _instancia
+
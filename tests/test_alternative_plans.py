@@ -0,0 +1,47 @@
+"""
+Planes alternativos (k-best con cortes no-good) sin alterar el modelo del plan óptimo
+"""
+
+import pytest
+
+from src.core.optimizer import GroupOptimizer
+from src.core.sensitivity import METODO_RELAJACION, METODO_ENTEROS_FIJOS
+
+
+def _usadas(df):
+    return set(zip(df["Asignatura"], df["Rotacion"], df["ID_Institucion"]))
+
+
+# Con presolve, v4-s9-anestesia-gineco queda con un único conjunto de IPS posible
+@pytest.mark.parametrize("nombre,presolve", [("sint-12ips-s5", True), ("v4-s9-anestesia-gineco", False)])
+def test_planes_distintos_en_orden_de_calidad(nombre, presolve, instancia, linea_base):
+    opt = GroupOptimizer()
+    opt.optimize(**instancia(nombre), time_limit=60, presolve=presolve)
+    planes = opt.alternative_plans(3, time_limit=60)
+
+    assert 1 < len(planes) <= 3
+    assert planes[0]["calidad"] == pytest.approx(linea_base[nombre]["objetivo"], rel=1e-6)
+    assert planes[0]["grupos"] == linea_base[nombre]["grupos"]
+    calidades = [p["calidad"] for p in planes]
+    assert calidades == sorted(calidades, reverse=True)
+    conjuntos = [frozenset(_usadas(p["resultados"])) for p in planes]
+    assert len(set(conjuntos)) == len(conjuntos)
+
+
+def test_precios_sombra_tras_planes_alternativos(instancia):
+    opt = GroupOptimizer()
+    opt.optimize(**instancia("v4-s9-anestesia-gineco"), time_limit=60, presolve=False)
+    plan = opt.results.copy()
+    objetivo = opt.get_objective_value()
+    precios = {m: opt.capacity_shadow_prices(m) for m in (METODO_RELAJACION, METODO_ENTEROS_FIJOS)}
+
+    assert len(opt.alternative_plans(3, time_limit=60)) > 1
+
+    # El modelo, el plan y el reporte siguen siendo los de optimize
+    assert opt.results.equals(plan)
+    assert opt.get_objective_value() == objetivo
+    assert not any(n.startswith(("No_good", "Uso_")) for n in opt.model.constraints)
+    for metodo, antes in precios.items():
+        despues = opt.capacity_shadow_prices(metodo)
+        assert not despues.empty
+        assert despues.equals(antes)
@@ -0,0 +1,64 @@
+"""
+Codificación JSON de resultados (servicio HTTP) y vuelta
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.utils.codec import from_jsonable, to_jsonable
+from src.utils.lazy import Lazy, LazyDict
+
+
+def _ida_y_vuelta(obj, ruta=None, diferido=None):
+    return from_jsonable(json.loads(json.dumps(to_jsonable(obj, ruta))), diferido)
+
+
+def test_ida_y_vuelta_conserva_la_estructura():
+    df = pd.DataFrame({"ID_Institucion": ["1", "2"], "Estudiantes": [6, 5], "Score": [0.9, 0.75]})
+    obj = {
+        "resultados": df,
+        "scores": {("Pediatría", "12"): 0.8, ("Pediatría", "7"): np.float64(0.5)},
+        "grupos": np.int64(4),
+        "lista": [1, (2, 3)],
+        "brecha": float("nan"),
+        "cota": np.float32(np.inf),
+    }
+    vuelta = _ida_y_vuelta(obj)
+
+    pd.testing.assert_frame_equal(vuelta["resultados"], df)
+    assert vuelta["scores"] == {("Pediatría", "12"): 0.8, ("Pediatría", "7"): 0.5}
+    assert vuelta["grupos"] == 4 and type(vuelta["grupos"]) is int
+    assert vuelta["lista"] == [1, (2, 3)]
+    assert vuelta["brecha"] is None and vuelta["cota"] is None
+
+
+def _traer(origen, ruta):
+    d = origen
+    for k in ruta:
+        d = d[k]
+    return d
+
+
+def test_lazydict_viaja_sin_evaluar_sus_diferidos():
+    llamadas = []
+
+    def _caro(x):
+        llamadas.append(x)
+        return x * 2
+
+    debug = LazyDict({"listo": 1, "caro": Lazy(_caro, 21)})
+    codificado = to_jsonable({"debug": debug}, ruta=[])
+    assert not llamadas
+    assert codificado["debug"]["__lazydict__"]["caro"] == {"__diferido__": ["debug", "caro"]}
+
+    vuelta = from_jsonable(json.loads(json.dumps(codificado)), lambda ruta: _traer({"debug": debug}, ruta))
+    assert isinstance(vuelta["debug"], LazyDict)
+    assert vuelta["debug"].pending() == ["caro"]
+    assert vuelta["debug"]["caro"] == 42
+    assert llamadas == [21]
+
+    # Sin ruta o sin `diferido` los pendientes se evalúan o quedan en None
+    assert _ida_y_vuelta({"debug": LazyDict({"caro": Lazy(_caro, 1)})})["debug"] == {"caro": 2}
+    assert _ida_y_vuelta({"debug": LazyDict({"caro": Lazy(_caro, 1)})}, ruta=[])["debug"]["caro"] is None
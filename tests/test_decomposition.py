@@ -0,0 +1,30 @@
+"""
+Modo por descomposición: mismo objetivo y grupos que el MILP monolítico
+"""
+
+import pytest
+
+from conftest import CASOS_RAPIDOS
+from src.core.decomposition import candidate_size_vectors
+from src.core.optimizer import GroupOptimizer
+from src.core.solve_report import ESTADO_OPTIMO
+
+
+def test_vectores_de_tamano_ordenados_y_acotados():
+    todos = candidate_size_vectors(24, 5, 8)
+    assert all(sum(v) == 24 and all(5 <= s <= 8 for s in v) for v in todos)
+    assert len(set(todos)) == len(todos)
+    # Primero menos grupos y, a igual número, el reparto más parejo
+    claves = [(len(v), max(v) - min(v)) for v in todos]
+    assert claves == sorted(claves)
+    assert todos[0] == (8, 8, 8)
+    assert candidate_size_vectors(24, 5, 8, limit=3) == todos[:3]
+
+
+@pytest.mark.parametrize("nombre", CASOS_RAPIDOS)
+def test_descomposicion_igual_al_monolitico(nombre, instancia, linea_base):
+    opt = GroupOptimizer()
+    res = opt.optimize(**instancia(nombre), time_limit=60, mode="descomposicion", max_candidates=None)
+    assert opt.get_solve_report()["estado"] == ESTADO_OPTIMO
+    assert opt.get_objective_value() == pytest.approx(linea_base[nombre]["objetivo"], rel=1e-6)
+    assert res["Grupo"].nunique() == linea_base[nombre]["grupos"]
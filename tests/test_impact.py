@@ -0,0 +1,37 @@
+"""
+Impacto de perder una IPS: cota de cobertura y re-optimización sin ella
+"""
+
+import pytest
+
+from src.core.impact import ESTADO_SIN_USO, coverage_without, leave_one_ips_out
+from src.core.optimizer import GroupOptimizer
+from src.core.solve_report import ESTADO_INFACTIBLE
+
+
+def test_cobertura_sin_ips_es_el_minimo_por_rotacion():
+    cap = {("A", "R1", "j1"): 9, ("A", "R1", "j2"): 6, ("A", "R2", "j1"): 12}
+    ar = {"A": ["R1", "R2"]}
+    assert coverage_without(cap, ar, "j2", 12, 5, 6) == 6
+    # R2 se queda sin IPS
+    assert coverage_without(cap, ar, "j1", 12, 5, 6) == 0
+
+
+def test_leave_one_out_sobre_el_plan_base(instancia):
+    kw = instancia("sint-12ips-s5")
+    opt = GroupOptimizer()
+    plan = opt.optimize(**kw, time_limit=60)
+    calidad = opt.get_objective_value()
+    df = leave_one_ips_out(**kw, plan_base=plan, calidad_base=calidad, time_limit=60, workers=1)
+
+    assert len(df) == len({j for (_, _, j) in kw["cap_dict"]})
+    sin_uso = df[~df["En_Plan_Base"]]
+    assert (sin_uso["Estado"] == ESTADO_SIN_USO).all()
+    assert (sin_uso["Perdida_Calidad"] == 0).all()
+    assert (df["Perdida_Cobertura"] >= 0).all()
+    # La cobertura sin una IPS nunca supera la del plan completo
+    assert (df["Estudiantes_Alojables"] <= kw["n_estudiantes"]).all()
+    # Sin la IPS el óptimo no puede mejorar al del plan completo
+    assert (df["Perdida_Calidad"].dropna() >= -1e-6).all()
+    assert (df["En_Plan_Base"] & (df["Perdida_Cobertura"] == 0)).any()
+    assert (df.loc[df["Perdida_Cobertura"] > 0, "Estado"] == ESTADO_INFACTIBLE).all()
@@ -0,0 +1,45 @@
+"""
+GroupOptimizer monolítico sobre el corpus: objetivo, grupos y reporte anytime
+"""
+
+import time
+
+import pytest
+
+from conftest import CASOS_RAPIDOS
+from src.core.optimizer import GroupOptimizer
+from src.core.solve_report import ESTADO_OPTIMO, ESTADO_LIMITE
+
+
+@pytest.mark.parametrize("nombre", CASOS_RAPIDOS)
+def test_objetivo_y_grupos_de_la_linea_base(nombre, instancia, linea_base):
+    base = linea_base[nombre]
+    kwargs = instancia(nombre)
+    opt = GroupOptimizer()
+    res = opt.optimize(**kwargs, time_limit=60)
+    rep = opt.get_solve_report()
+
+    assert rep["estado"] == ESTADO_OPTIMO
+    assert rep["optimo_probado"]
+    assert rep["estado_fase1"] == rep["estado_fase2"] == ESTADO_OPTIMO
+    assert opt.get_objective_value() == pytest.approx(base["objetivo"], rel=1e-6)
+    assert res["Grupo"].nunique() == base["grupos"]
+    # Cada rotación aloja a todos los estudiantes
+    por_rotacion = res.groupby(["Asignatura", "Rotacion"])["Estudiantes"].sum()
+    assert (por_rotacion == kwargs["n_estudiantes"]).all()
+
+
+def test_presupuesto_compartido_entre_fases(instancia):
+    # v4-s7 tarda varios segundos en probar el óptimo: con 2 s se corta
+    opt = GroupOptimizer()
+    t0 = time.perf_counter()
+    res = opt.optimize(**instancia("v4-s7-medicina-interna"), time_limit=2)
+    transcurrido = time.perf_counter() - t0
+    rep = opt.get_solve_report()
+
+    # CBC respeta el límite con un margen de arranque y lectura de la solución
+    assert transcurrido < 2 + 3
+    assert rep["estado"] in (ESTADO_OPTIMO, ESTADO_LIMITE)
+    assert rep["optimo_probado"] == (rep["estado"] == ESTADO_OPTIMO)
+    if not res.empty and rep["cota"] is not None:
+        assert rep["objetivo"] <= rep["cota"] + 1e-6
@@ -0,0 +1,67 @@
+"""
+Chequeo de factibilidad por rotación (suma de subconjuntos) y reducciones de presolve
+"""
+
+import pytest
+
+from conftest import CASOS_RAPIDOS
+from src.core.optimizer import GroupOptimizer
+from src.core.presolve import check_feasibility, max_alojable, reduce_problem
+from src.core.solve_report import ESTADO_INFACTIBLE
+
+
+def test_max_alojable_grupos_completos():
+    # Grupos de 5 a 6: 11 y 16 no se forman; un cupo de 9 solo aloja 5 o 6
+    assert max_alojable([9], 12, 5, 6) == 6
+    assert max_alojable([9, 9], 12, 5, 6) == 12
+    assert max_alojable([4, 4, 4], 12, 5, 6) == 0
+    assert max_alojable([30], 12, 5, 6) == 12
+
+
+def test_chequeo_infactible_sin_llamar_al_solver():
+    cap = {("A", "R1", "ips1"): 9, ("A", "R1", "ips2"): 4, ("A", "R2", "ips3"): 20}
+    ar = {"A": ["R1", "R2"]}
+    chequeo = check_feasibility(cap, ar, 12, 5, 6)
+    assert not chequeo["factible"]
+    assert chequeo["cuello_botella"]["Rotacion"] == "R1"
+    assert chequeo["cuello_botella"]["Max_Alojable"] == 6
+
+    opt = GroupOptimizer()
+    res = opt.optimize({}, cap, ar, 12, 5, 6, time_limit=10)
+    rep = opt.get_solve_report()
+    assert res.empty
+    assert rep["estado"] == ESTADO_INFACTIBLE
+    assert not rep["fases"]
+
+
+@pytest.mark.parametrize("nombre", CASOS_RAPIDOS)
+def test_chequeo_no_descarta_casos_factibles(nombre, instancia):
+    kw = instancia(nombre)
+    chequeo = check_feasibility(
+        kw["cap_dict"], kw["asignaturas_rotaciones"], kw["n_estudiantes"], kw["min_group"], kw["max_group"],
+    )
+    assert chequeo["factible"]
+
+
+def test_dominancia_conserva_la_mejor_ips_completa():
+    scores = {"j1": 0.9, "j2": 0.5, "j3": 0.95}
+    cap = {("A", "R", "j1"): 20, ("A", "R", "j2"): 20, ("A", "R", "j3"): 6}
+    reducido, rep = reduce_problem(cap, lambda a, j: scores[j], 12, 5, 6)
+    # j2 queda dominada por j1 (aloja a todos con mejor score); j3 tiene mejor score
+    assert set(reducido) == {("A", "R", "j1"), ("A", "R", "j3")}
+    assert rep["dominadas"] == 1
+    # Cupos recortados a la mayor carga alcanzable (≤ n)
+    assert reducido[("A", "R", "j1")] == 12
+
+
+# Sin presolve v4-s10 y los sintéticos de dos rotaciones tardan de segundos a
+# más de un minuto en probar el óptimo; estos cuatro siguen en menos de uno
+@pytest.mark.parametrize("nombre", [
+    "v4-s5-salud-publica", "v4-s8-pediatria", "v4-s9-anestesia-gineco", "sint-12ips-s5",
+])
+def test_presolve_no_cambia_objetivo_ni_grupos(nombre, instancia, linea_base):
+    kw = instancia(nombre)
+    opt = GroupOptimizer()
+    res = opt.optimize(**kw, time_limit=60, presolve=False)
+    assert opt.get_objective_value() == pytest.approx(linea_base[nombre]["objetivo"], rel=1e-6)
+    assert res["Grupo"].nunique() == linea_base[nombre]["grupos"]
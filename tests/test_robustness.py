@@ -0,0 +1,51 @@
+"""
+Robustez Monte Carlo: muestreo de pesos y cupos, y modos de resolución por muestra
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.robustness import robustness_analysis, sample_capacities, sample_weights
+
+
+def test_pesos_suman_uno_y_conservan_ceros():
+    pesos = sample_weights({"a": 0.5, "b": 0.0, "c": 0.5}, 50, 50.0, np.random.default_rng(0))
+    assert pesos.shape == (50, 3)
+    assert np.allclose(pesos.sum(axis=1), 1.0)
+    assert (pesos[:, 1] == 0).all()
+
+
+def test_cupos_dentro_de_la_variacion():
+    cap = {("A", "R", "j1"): 10, ("A", "R", "j2"): 3}
+    for muestra in sample_capacities(cap, 50, 0.2, np.random.default_rng(0)):
+        assert set(muestra) <= set(cap)
+        for k, c in muestra.items():
+            assert round(cap[k] * 0.8) <= c <= round(cap[k] * 1.2)
+
+
+def test_descomposicion_igual_al_monolitico_por_muestra(instancia):
+    kw = instancia("sint-12ips-s5")
+    ips = sorted({j for (_, _, j) in kw["cap_dict"]})
+    rng = np.random.default_rng(1)
+    criterios = pd.DataFrame(rng.uniform(size=(len(ips), 3)), index=ips, columns=["c1", "c2", "c3"])
+    args = dict(
+        criterios=criterios,
+        weights_by_set={"S": {"c1": 0.5, "c2": 0.3, "c3": 0.2}},
+        set_by_asig={a: "S" for a in kw["asignaturas_rotaciones"]},
+        cap_dict=kw["cap_dict"],
+        asignaturas_rotaciones=kw["asignaturas_rotaciones"],
+        n_estudiantes=kw["n_estudiantes"],
+        min_group=kw["min_group"],
+        max_group=kw["max_group"],
+        n_muestras=4,
+        time_limit=60,
+        workers=1,
+        seed=0,
+    )
+    mono = robustness_analysis(**args, mode="monolitico")
+    desc = robustness_analysis(**args, mode="descomposicion")
+
+    assert mono["resumen"]["con_solucion"] == desc["resumen"]["con_solucion"] == 4
+    assert desc["muestras"]["calidad"].tolist() == pytest.approx(mono["muestras"]["calidad"].tolist(), rel=1e-6)
+    assert ((desc["frecuencias"]["Frecuencia"] > 0) & (desc["frecuencias"]["Frecuencia"] <= 1)).all()
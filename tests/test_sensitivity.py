@@ -0,0 +1,70 @@
+"""
+Precios sombra de cupos (duales de la LP derivada del modelo)
+"""
+
+import pytest
+from pulp import PULP_CBC_CMD, LpProblem, LpMaximize, LpVariable, PulpSolverError
+
+from src.core.optimizer import GroupOptimizer
+from src.core.sensitivity import (
+    METODO_RELAJACION, METODO_ENTEROS_FIJOS, capacity_duals, lp_copy, weight_ranges,
+)
+
+
+@pytest.mark.parametrize("metodo", [METODO_RELAJACION, METODO_ENTEROS_FIJOS])
+@pytest.mark.parametrize("nombre", ["v4-s5-salud-publica", "v4-s9-anestesia-gineco", "sint-20ips-2rot-s5"])
+def test_precios_sombra_acotados_por_el_score(nombre, metodo, instancia):
+    opt = GroupOptimizer()
+    opt.optimize(**instancia(nombre), time_limit=60)
+    precios = opt.capacity_shadow_prices(metodo)
+
+    assert len(precios) == len(opt._modelo["caps"])
+    assert (precios["Uso"] <= precios["Cupo"]).all()
+    # Un cupo más en j permite, a lo sumo, mover un estudiante a j: gana ≤ score de j
+    assert (precios["Precio_Sombra"] >= -1e-9).all()
+    assert (precios["Precio_Sombra"] <= precios["Score_IPS"] + 1e-6).all()
+
+
+def test_lp_copy_no_copia_columnas_huerfanas():
+    model = LpProblem("m", LpMaximize)
+    a, b, c = LpVariable("a", 0, 4), LpVariable("b", 0, 4), LpVariable("c", 0, 4)
+    model += a + b + c
+    model += a + b <= 5, "Cap_1"
+    model += c <= 2, "Lex_piso_1"
+
+    lp = lp_copy(model, a + 2 * b, descartar=("Lex_piso",))
+    assert {v.name for v in lp.variables()} == {"a", "b"}
+    assert set(lp.constraints) == {"Cap_1"}
+    # El original no cambia
+    assert set(model.constraints) == {"Cap_1", "Lex_piso_1"}
+
+    duales = capacity_duals(model, a + 2 * b, {"cap": "Cap_1"}, descartar=("Lex_piso",))
+    assert duales["cap"]["precio_sombra"] == pytest.approx(1.0)
+
+
+def test_fallo_del_solver_deja_tabla_vacia(instancia, monkeypatch):
+    opt = GroupOptimizer()
+    opt.optimize(**instancia("v4-s5-salud-publica"), time_limit=60)
+
+    def _falla(self, *args, **kwargs):
+        raise PulpSolverError("Pulp: Error while executing")
+
+    monkeypatch.setattr(LpProblem, "solve", _falla)
+    assert opt.capacity_shadow_prices().empty
+
+
+def test_rango_de_pesos_en_lp_pequena():
+    # max 0.6·x1 + 0.4·x2 con x1 + x2 = 1: gana x1 mientras w_k1 ≥ w_k2
+    # (los extremos incluyen la tolerancia de costos reducidos)
+    model = LpProblem("m", LpMaximize)
+    x1, x2 = LpVariable("x1", 0, 1), LpVariable("x2", 0, 1)
+    model += 0.6 * x1 + 0.4 * x2
+    model += x1 + x2 == 1, "Asigna"
+    model.solve(PULP_CBC_CMD(msg=False))
+    assert x1.varValue == pytest.approx(1.0)
+
+    criterios = {"x1": {"k1": 1.0}, "x2": {"k2": 1.0}}
+    rangos = {r["Criterio"]: r for r in weight_ranges(model, criterios, {"k1": 0.6, "k2": 0.4})}
+    assert rangos["k1"]["Peso_Actual"] == 0.6
+    assert (rangos["k1"]["Peso_Min"], rangos["k1"]["Peso_Max"]) == pytest.approx((0.5, 1.0), abs=1e-5)
+    assert (rangos["k2"]["Peso_Min"], rangos["k2"]["Peso_Max"]) == pytest.approx((0.0, 0.5), abs=1e-5)
@@ -0,0 +1,41 @@
+"""
+Tiempos por etapa: spans anidados, decorador y registro de los optimizadores
+"""
+
+from src.core.optimizer import GroupOptimizer
+from src.utils.timing import collect_timings, span, timed, timings_table
+
+
+@timed("cargar")
+def _cargar(x):
+    return x + 1
+
+
+def test_spans_anidados_y_decorador():
+    with collect_timings(memoria=False) as registro:
+        with span("a"):
+            with span("b"):
+                pass
+            assert _cargar(1) == 2
+        assert _cargar(2) == 3
+
+    assert set(registro) == {"a", "a/b", "a/cargar", "cargar"}
+    assert registro["cargar"]["llamadas"] == 1
+    assert all(v["segundos"] >= 0 for v in registro.values())
+    assert timings_table(registro)["Etapa"].tolist() == ["a", "a/b", "a/cargar", "cargar"]
+
+
+def test_fuera_de_un_registro_no_se_guarda_nada():
+    with collect_timings(memoria=False) as registro:
+        pass
+    with span("a"):
+        assert _cargar(0) == 1
+    assert registro == {}
+
+
+def test_optimizador_registra_sus_fases(instancia):
+    with collect_timings(memoria=False) as registro:
+        GroupOptimizer().optimize(**instancia("sint-12ips-s5"), time_limit=60)
+    assert registro["modelo_grupos"]["llamadas"] == 1
+    assert "modelo_grupos/fase1" in registro
+    assert registro["modelo_grupos/fase1"]["segundos"] <= registro["modelo_grupos"]["segundos"]
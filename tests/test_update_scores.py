@@ -0,0 +1,40 @@
+"""
+Re-optimización con otros scores sobre el modelo ya construido
+"""
+
+import numpy as np
+import pytest
+
+from src.core.optimizer import GroupOptimizer
+from src.core.solve_report import ESTADO_OPTIMO
+
+
+def test_mismos_scores_mismo_objetivo(instancia, linea_base):
+    kw = instancia("sint-12ips-s5")
+    opt = GroupOptimizer()
+    opt.optimize(**kw, time_limit=60, presolve=False)
+    res = opt.update_scores(kw["scores"], time_limit=60)
+    assert opt.get_solve_report()["estado"] == ESTADO_OPTIMO
+    assert opt.get_objective_value() == pytest.approx(linea_base["sint-12ips-s5"]["objetivo"], rel=1e-6)
+    assert res["Grupo"].nunique() == linea_base["sint-12ips-s5"]["grupos"]
+
+
+def test_scores_perturbados_igual_a_optimizar_de_cero(instancia):
+    kw = instancia("sint-12ips-s5")
+    rng = np.random.default_rng(0)
+    otros = {k: round(s * rng.uniform(0.5, 1.5), 4) for k, s in kw["scores"].items()}
+
+    opt = GroupOptimizer()
+    opt.optimize(**kw, time_limit=60, presolve=False)
+    res = opt.update_scores(otros, time_limit=60)
+
+    fresco = GroupOptimizer()
+    res_fresco = fresco.optimize(**{**kw, "scores": otros}, time_limit=60, presolve=False)
+    assert opt.get_solve_report()["estado"] == ESTADO_OPTIMO
+    assert opt.get_objective_value() == pytest.approx(fresco.get_objective_value(), rel=1e-6)
+    assert res["Grupo"].nunique() == res_fresco["Grupo"].nunique()
+
+
+def test_sin_corrida_previa():
+    with pytest.raises(ValueError):
+        GroupOptimizer().update_scores({})